@@ -0,0 +1,190 @@
+# api/catalog_endpoints.py
+import asyncio
+import hashlib
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+import config
+from database import catalog
+from database.catalog import InvalidQuery
+from database.playback_cache import playback_cache
+
+router = APIRouter()
+
+# Ключ кэша -> загрузка из БД: одновременные промахи по одному ключу
+# (например, сразу после сброса записей аниме) дают один запрос
+_playback_loading = {}
+
+
+def etag_response(request: Request, payload):
+    """
+    Отдает JSON с ETag (хэш тела ответа). Если клиент прислал тот же
+    ETag в If-None-Match, возвращается пустой 304.
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return body_response(request, body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+
+def body_response(request: Request, body, etag):
+    """Готовое JSON-тело с ETag; 304 при совпадении If-None-Match."""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(',')):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+@router.get("/anime")
+def list_anime(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[int] = Query(None, description="id последнего аниме предыдущей страницы"),
+    year: Optional[int] = None,
+    genre: Optional[str] = None,
+    status: Optional[str] = None,
+    type: Optional[str] = Query(None, description="Тип контента: TV, Movie, OVA..."),
+    fields: Optional[str] = Query(None, description="Список полей через запятую"),
+):
+    """
+    Список аниме с keyset-пагинацией (курсор `after` из `next_cursor`),
+    фильтрами по году, жанру, статусу и типу и выборкой полей.
+    """
+    try:
+        selected = catalog.parse_fields(fields, catalog.ANIME_COLUMNS + catalog.ANIME_RELATIONS,
+                                        catalog.ANIME_DEFAULT_FIELDS)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items, next_cursor = catalog.list_anime(selected, limit, after=after, year=year, genre=genre,
+                                            status=status, content_type=type)
+    return etag_response(request, {"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/anime/{slug}")
+def get_anime(request: Request, slug: str, fields: Optional[str] = None):
+    """Одно аниме по slug."""
+    try:
+        selected = catalog.parse_fields(fields, catalog.ANIME_COLUMNS + catalog.ANIME_RELATIONS,
+                                        catalog.ANIME_COLUMNS + catalog.ANIME_RELATIONS)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    item = catalog.get_anime(slug, selected)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"Аниме '{slug}' не найдено.")
+    return etag_response(request, item)
+
+
+@router.get("/anime/{slug}/seasons")
+def list_seasons(request: Request, slug: str):
+    """Сезоны аниме с количеством эпизодов."""
+    seasons = catalog.list_seasons(slug)
+    if seasons is None:
+        raise HTTPException(status_code=404, detail=f"Аниме '{slug}' не найдено.")
+    return etag_response(request, {"items": seasons})
+
+
+@router.get("/anime/{slug}/episodes")
+def list_episodes(
+    request: Request,
+    slug: str,
+    season: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    fields: Optional[str] = Query(None, description="Список полей через запятую"),
+):
+    """Эпизоды аниме в порядке сезонов и номеров, с keyset-пагинацией."""
+    try:
+        selected = catalog.parse_fields(fields, catalog.EPISODE_COLUMNS + catalog.EPISODE_RELATIONS,
+                                        catalog.EPISODE_DEFAULT_FIELDS)
+        result = catalog.list_episodes(slug, selected, limit, after=after, season=season)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Аниме '{slug}' не найдено.")
+    items, next_cursor = result
+    return etag_response(request, {"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/search")
+def search_anime(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос (слова ищутся по префиксу)"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Полнотекстовый поиск аниме по названиям и описанию, с ранжированием."""
+    return etag_response(request, {"items": catalog.search_anime(q, limit)})
+
+
+@router.get("/genres")
+def list_genres(request: Request):
+    """Все жанры с количеством аниме."""
+    return etag_response(request, {"items": catalog.list_genres()})
+
+
+async def _load_playback(key, load, args):
+    version = playback_cache.version
+    result = await run_in_threadpool(load, *args)
+    if result is None:
+        return None
+    anime_id, payload = result
+    return playback_cache.put(key, anime_id, payload, version)
+
+
+async def cached_playback(key, load, *args):
+    """
+    Запись кэша воспроизведения по ключу; при промахе `load(*args)`
+    (возвращает (id аниме, данные) или None) выполняется в пуле потоков.
+    """
+    entry = playback_cache.get(key)
+    if entry is not None:
+        return entry
+    task = _playback_loading.get(key)
+    if task is None:
+        task = _playback_loading[key] = asyncio.ensure_future(_load_playback(key, load, args))
+        task.add_done_callback(lambda _: _playback_loading.pop(key, None))
+    # Отключение одного клиента не должно отменять загрузку для остальных
+    return await asyncio.shield(task)
+
+
+def _next_playback(slug, episode_number, count, season):
+    result = catalog.list_next_playback(slug, episode_number, count, season)
+    return (result[0], {"items": result[1]}) if result else None
+
+
+@router.get("/playback")
+async def get_playback_by_url(request: Request, url: str = Query(..., max_length=512, description="URL эпизода на jut.su")):
+    """Метаданные воспроизведения эпизода по его URL."""
+    entry = await cached_playback(('url', url), catalog.get_playback_by_url, url)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Эпизод не найден.")
+    return body_response(request, entry.body, entry.etag)
+
+
+@router.get("/playback/{slug}/{episode_number}")
+async def get_playback(request: Request, slug: str, episode_number: int, season: Optional[int] = None):
+    """
+    Метаданные воспроизведения эпизода для плеера: длительность, отметки
+    опенинга и эндинга (opening_*/ending_*, сек) и URL следующей серии.
+    Без `season` берется первый сезон, где есть эпизод с таким номером.
+    """
+    entry = await cached_playback(('episode', slug, season, episode_number),
+                                  catalog.get_playback, slug, episode_number, season)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Эпизод {episode_number} аниме '{slug}' не найден.")
+    return body_response(request, entry.body, entry.etag)
+
+
+@router.get("/playback/{slug}/{episode_number}/next")
+async def get_next_playback(
+    request: Request,
+    slug: str,
+    episode_number: int,
+    season: Optional[int] = None,
+    count: int = Query(5, ge=1, le=config.PLAYBACK_PREFETCH_MAX),
+):
+    """Метаданные `count` следующих за указанным эпизодов (с переходом в следующий сезон) — для предзагрузки."""
+    entry = await cached_playback(('next', slug, season, episode_number, count),
+                                  _next_playback, slug, episode_number, count, season)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Эпизод {episode_number} аниме '{slug}' не найден.")
+    return body_response(request, entry.body, entry.etag)
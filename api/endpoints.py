@@ -1,64 +1,179 @@
 # api/endpoints.py
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+import config
 from core.scraping_manager import ScrapingManager
+from core.job_runner import JobRunner
+from core.profiler import profiler
+from database.async_db import async_db
+from database import jobs, leases
+from database.playback_cache import playback_cache
 
 router = APIRouter()
 manager = ScrapingManager()
+job_runner = JobRunner(manager)
 
 class AnimeRequest(BaseModel):
     anime_slug: str
 
 @router.post("/scrape/specific", status_code=202)
-async def scrape_specific_anime(request: AnimeRequest, background_tasks: BackgroundTasks):
+async def scrape_specific_anime(request: AnimeRequest, priority: Optional[int] = None):
     """
     Эндпоинт для добавления одного конкретного аниме по его slug.
-    Запускается в фоновом режиме.
+    Ставит задачу в очередь; прогресс — GET /jobs/{job_id}.
     """
-    background_tasks.add_task(manager.add_specific_anime, request.anime_slug)
-    return {"message": f"Процесс добавления аниме '{request.anime_slug}' запущен в фоновом режиме."}
+    job_id = await job_runner.submit("specific", {"anime_slug": request.anime_slug}, priority)
+    return {"message": f"Задача добавления аниме '{request.anime_slug}' поставлена в очередь.", "job_id": job_id}
 
 @router.post("/scrape/bulk/{limit}", status_code=202)
-async def scrape_bulk_anime(limit: int, background_tasks: BackgroundTasks):
+async def scrape_bulk_anime(
+    limit: int = Path(..., ge=1),
+    concurrency: Optional[int] = Query(None, ge=1, le=config.MAX_SCRAPING_CONCURRENCY),
+    priority: Optional[int] = None,
+):
     """
     Эндпоинт для массового добавления аниме.
     `limit` - максимальное количество новых аниме для добавления.
+    `concurrency` - количество параллельных воркеров (по умолчанию из config).
     """
-    if limit <= 0:
-        raise HTTPException(status_code=400, detail="Лимит должен быть больше нуля.")
-    background_tasks.add_task(manager.add_bulk_anime, limit)
-    return {"message": f"Процесс добавления {limit} новых аниме запущен в фоновом режиме."}
+    job_id = await job_runner.submit("bulk", {"limit": limit, "concurrency": concurrency}, priority)
+    return {"message": f"Задача добавления {limit} новых аниме поставлена в очередь.", "job_id": job_id}
 
-# Глобальная переменная для отслеживания состояния задачи
-continuous_task_running = False
+@router.post("/scrape/incremental", status_code=202)
+async def scrape_incremental(
+    limit: Optional[int] = Query(None, ge=1),
+    concurrency: Optional[int] = Query(None, ge=1, le=config.MAX_SCRAPING_CONCURRENCY),
+    priority: Optional[int] = None,
+):
+    """
+    Проверяет уже добавленные аниме на новые эпизоды и скачивает только их.
+    Онгоинги проверяются чаще завершенных.
+    """
+    job_id = await job_runner.submit("incremental", {"limit": limit, "concurrency": concurrency}, priority)
+    return {"message": "Задача проверки новых эпизодов поставлена в очередь.", "job_id": job_id}
+
+@router.get("/stats/connections")
+async def get_connection_stats():
+    """
+    Показывает счетчики HTTP-соединений скраперов (создано / переиспользовано).
+    """
+    return manager.get_connection_stats()
+
+@router.get("/stats/page-load")
+async def get_page_load_stats():
+    """
+    Показывает среднее время и трафик на страницу эпизода
+    в обычном и быстром (EPISODE_FAST_MODE) режимах.
+    """
+    return manager.get_page_load_stats()
+
+@router.get("/stats/browser")
+async def get_browser_stats():
+    """
+    Состояние пула браузера: контексты (всего/свободных), открытые
+    страницы, перезапуски браузера и пересоздания контекстов.
+    """
+    return manager.get_browser_stats()
+
+@router.get("/stats/hosts")
+async def get_host_stats():
+    """
+    Адаптивные ограничители внешних хостов: текущее окно параллельных
+    запросов, задержка, доля ошибок, пауза после 429/503 и счетчики исходов.
+    """
+    return manager.get_host_stats()
+
+@router.get("/stats/leases")
+async def get_lease_stats():
+    """
+    Аренды работы в общей БД: этот процесс (держит/потерял) и действующие
+    аренды всех узлов по типам (anime, episode, job; *_done — недавно выполненные).
+    """
+    return {"this_node": manager.leases.get_stats(), "nodes": await async_db.read(leases.get_lease_stats)}
+
+@router.get("/stats/playback-cache")
+async def get_playback_cache_stats():
+    """Кэш метаданных воспроизведения: попадания, промахи, вытеснения, сбросы по записи эпизодов, размер."""
+    return playback_cache.get_stats()
+
+@router.post("/profiler/start")
+async def start_profiler(interval_ms: int = Query(10, ge=1, le=1000)):
+    """
+    Включает семплирующий профилировщик потока event loop без перезапуска.
+    Предыдущие семплы сбрасываются.
+    """
+    if not profiler.start(interval_ms):
+        raise HTTPException(status_code=409, detail="Профилировщик уже запущен.")
+    return profiler.status()
+
+@router.post("/profiler/stop")
+async def stop_profiler():
+    """Выключает профилировщик; собранные семплы остаются доступны в отчете."""
+    profiler.stop()
+    return profiler.status()
+
+@router.get("/profiler/report")
+async def get_profiler_report(format: str = Query("top", pattern="^(top|collapsed)$"), limit: int = Query(30, ge=1, le=500)):
+    """
+    Отчет профилировщика: `top` — функции по доле семплов (JSON),
+    `collapsed` — стеки для flamegraph.pl / speedscope (текст).
+    """
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return {**profiler.status(), "top": profiler.top(limit)}
 
 @router.post("/scrape/continuous/start", status_code=200)
-async def start_continuous_scraping(background_tasks: BackgroundTasks):
+async def start_continuous_scraping():
     """
-    Запускает бесконечный процесс скрапинга.
+    Запускает бесконечный процесс скрапинга (как задачу в очереди) на этом
+    узле. Узлы с общей БД делят каталог через аренды, поэтому для роста
+    производительности скрапинг запускается на каждом узле.
     """
-    global continuous_task_running
-    if continuous_task_running:
-        raise HTTPException(status_code=409, detail="Непрерывный скрапинг уже запущен.")
-    
-    continuous_task_running = True
-    background_tasks.add_task(manager.run_continuous_scraping)
-    return {"message": "Непрерывный скрапинг успешно запущен."}
+    if await job_runner.get_active_job_ids("continuous", this_node_only=True):
+        raise HTTPException(status_code=409, detail="Непрерывный скрапинг уже запущен на этом узле.")
+    job_id = await job_runner.submit("continuous", {}, pin_to_node=True)
+    return {"message": "Непрерывный скрапинг успешно запущен.", "job_id": job_id}
 
-# Этот эндпоинт в реальности не остановит фоновую задачу,
-# он просто сбросит флаг. Для реальной остановки нужны более сложные механизмы (например, Celery).
 @router.post("/scrape/continuous/stop", status_code=200)
 async def stop_continuous_scraping():
     """
-    Останавливает запуск новых циклов непрерывного скрапинга.
-    (Текущий цикл завершится).
+    Останавливает непрерывный скрапинг этого узла: задача прерывается в ближайшей
+    точке проверки (между аниме, порциями эпизодов или во время паузы).
     """
-    global continuous_task_running
-    if not continuous_task_running:
-        raise HTTPException(status_code=409, detail="Непрерывный скрапинг не был запущен.")
-    
-    continuous_task_running = False # Предотвратит запуск новых циклов в логике run_continuous_scraping
-    return {"message": "Отправлен сигнал остановки. Текущий цикл будет завершен."}
+    job_ids = await job_runner.get_active_job_ids("continuous", this_node_only=True)
+    if not job_ids:
+        raise HTTPException(status_code=409, detail="Непрерывный скрапинг не был запущен на этом узле.")
+    for job_id in job_ids:
+        await job_runner.cancel(job_id)
+    return {"message": "Отправлен сигнал остановки.", "job_ids": job_ids}
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """Последние задачи скрапинга (опционально с фильтром по статусу)."""
+    return {"items": await async_db.read(jobs.list_jobs, status, limit)}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    """
+    Прогресс задачи: статус, чекпоинт каталога, счетчики аниме по статусам
+    и эпизоды аниме, обрабатываемых прямо сейчас.
+    """
+    progress = await async_db.read(jobs.get_job_progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Задача #{job_id} не найдена.")
+    return progress
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: int):
+    """Отменяет задачу: из очереди — сразу, выполняющуюся — кооперативно."""
+    status = await job_runner.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Задача #{job_id} не найдена.")
+    if status not in ("cancelled", "cancelling"):
+        raise HTTPException(status_code=409, detail=f"Задача #{job_id} уже завершена ({status}).")
+    return {"job_id": job_id, "status": status}
 
 
 
@@ -72,17 +187,20 @@ async def stop_continuous_scraping():
 
 # api/endpoints.py
 import sqlite3
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.exc import OperationalError
+from database import export
 
 
 db_url = "sqlite:///./test.db"
 db_path = "./test.db"  # для sqlite3 нужен путь без 'sqlite:///'
 
 @router.get("/db/tables")
-async def list_tables():
+def list_tables():
     """
     Показывает список таблиц в БД.
+    Обычная (не async) функция: FastAPI выполнит ее в пуле потоков,
+    и синхронный sqlite3 не заблокирует event loop.
     """
     try:
         conn = sqlite3.connect(db_path)
@@ -95,7 +213,7 @@ async def list_tables():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/db/table/{table_name}")
-async def get_table_data(table_name: str):
+def get_table_data(table_name: str):
     """
     Показывает содержимое указанной таблицы.
     """
@@ -120,3 +238,33 @@ async def get_table_data(table_name: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/db/table/{table_name}/export")
+def export_table(
+    table_name: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Потоково выгружает таблицу в NDJSON или CSV (опционально со сжатием gzip).
+    Строки читаются пачками по первичному ключу, поэтому память не зависит
+    от размера таблицы. Работает и с MySQL, и с SQLite.
+    """
+    table = export.get_table(table_name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена.")
+
+    rows = export.iter_table_rows(table, chunk_size)
+    if format == "csv":
+        chunks = export.csv_chunks(rows, [column.name for column in table.columns])
+    else:
+        chunks = export.ndjson_chunks(rows)
+
+    headers = {"Content-Disposition": f'attachment; filename="{table_name}.{format}"'}
+    if gzip:
+        chunks = export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    # Синхронный генератор Starlette выполняет в пуле потоков, не блокируя event loop
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,253 @@
+# benchmarks/bench_e2e.py
+"""
+Сквозной офлайн-бенчмарк скрапинга: add_bulk_anime целиком (каталог,
+страницы аниме и эпизодов, Jikan, постеры, запись в БД) против
+локальной подмены jut.su и Jikan (benchmarks/standin_site.py).
+
+Подмена запускается в отдельном процессе, поэтому пиковая память
+относится только к скраперу (и его браузерам). БД, кэш Jikan и постеры
+создаются во временном каталоге. Результат пишется в JSON, а с
+--baseline сравнивается с предыдущим прогоном.
+
+Запуск из корня репозитория (нужен установленный Chromium для Playwright):
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --anime 30 --episodes 24 --fetch-mode http --output e2e.json
+    python -m benchmarks.bench_e2e --baseline e2e_main.json --max-regression 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import config
+from scrapers.browser_pool import process_tree_rss_kb
+from .standin_site import serve
+
+# Метрики, по которым сравниваются прогоны: (ключ, больше — лучше)
+COMPARED_METRICS = [
+    ('episodes_per_sec', True),
+    ('episode_latency_p50_sec', False),
+    ('episode_latency_p99_sec', False),
+    ('peak_rss_mb', False),
+    ('db_write_sec', False),
+]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_server(base_url, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1).read()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def percentile(values, pct):
+    """Перцентиль по ближайшему рангу."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class TreeRssSampler:
+    """Фоновый поток, запоминающий пиковый суммарный RSS процесса и браузеров."""
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_kb = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            rss = process_tree_rss_kb(os.getpid())
+            if rss is not None:
+                self.peak_kb = max(self.peak_kb or 0, rss)
+            self._stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def _run_scraper(args, expected_episodes):
+    # Импорты после настройки config: модули читают его при создании синглтонов
+    from core.metrics import STAGE_SECONDS
+    from core.scraping_manager import ScrapingManager
+    from database.db_manager import db_manager
+    from database.models import Episode
+
+    manager = ScrapingManager()
+    episode_latencies = []
+    parse_episode_page = manager.jutsu_scraper.parse_episode_page
+
+    async def timed_parse_episode_page(*call_args, **call_kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await parse_episode_page(*call_args, **call_kwargs)
+        finally:
+            episode_latencies.append(time.perf_counter() - started_at)
+
+    manager.jutsu_scraper.parse_episode_page = timed_parse_episode_page
+
+    await manager.start()
+    try:
+        with TreeRssSampler() as sampler:
+            started_at = time.perf_counter()
+            stats = await manager.add_bulk_anime(args.anime, args.concurrency)
+            elapsed = time.perf_counter() - started_at
+    finally:
+        await manager.close()
+
+    with db_manager.session_scope() as session:
+        episodes_saved = session.query(Episode).count()
+
+    stages = STAGE_SECONDS.snapshot()
+    db_write = [s for s in stages if s['scraper'] == 'db' and s['stage'] == 'db_commit']
+    return {
+        'elapsed_sec': round(elapsed, 3),
+        'anime_added': stats.get('added_count', 0),
+        'errors': stats.get('error_count', 0),
+        'episodes_expected': expected_episodes,
+        'episodes_saved': episodes_saved,
+        'episodes_parsed': len(episode_latencies),
+        'episodes_per_sec': round(episodes_saved / elapsed, 2) if elapsed else None,
+        'episode_latency_p50_sec': round(percentile(episode_latencies, 50) or 0, 4),
+        'episode_latency_p99_sec': round(percentile(episode_latencies, 99) or 0, 4),
+        # ru_maxrss в Linux — в килобайтах; браузеры — отдельные процессы, их учитывает sampler
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_rss_with_browsers_mb': round(sampler.peak_kb / 1024, 1) if sampler.peak_kb else None,
+        'db_write_sec': round(sum(s['sum'] for s in db_write), 4),
+        'db_writes': sum(s['count'] for s in db_write),
+        'stages': [{**s, 'sum': round(s['sum'], 4)} for s in stages],
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Печатает изменения относительно прошлого прогона; возвращает список регрессий."""
+    regressions = []
+    print(f"\n{'метрика':<28}{'было':>12}{'стало':>12}{'изменение':>12}")
+    for key, higher_is_better in COMPARED_METRICS:
+        old, new = baseline['results'].get(key), results.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        mark = '  [!]' if worse > max_regression else ''
+        print(f"{key:<28}{old:>12}{new:>12}{change:>+11.1f}%{mark}")
+        if worse > max_regression:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--anime', type=int, default=10, help='сколько аниме добавить (и сколько их в каталоге)')
+    parser.add_argument('--seasons', type=int, default=2)
+    parser.add_argument('--episodes', type=int, default=12, help='эпизодов в сезоне')
+    parser.add_argument('--latency-ms', type=int, default=20, help='искусственная задержка ответа подмены')
+    parser.add_argument('--concurrency', type=int, default=config.SCRAPING_CONCURRENCY)
+    parser.add_argument('--fetch-mode', choices=('playwright', 'http'), default=config.JUTSU_FETCH_MODE)
+    parser.add_argument('--fast-mode', action='store_true', help='EPISODE_FAST_MODE для страниц эпизодов')
+    parser.add_argument('--extractor', default=config.HTML_EXTRACTOR)
+    parser.add_argument('--output', default='bench_e2e.json', help='JSON-файл с результатами')
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--max-regression', type=float, default=10.0, help='допустимое ухудшение, %%')
+    args = parser.parse_args()
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    site_options = dict(anime_count=args.anime, seasons=args.seasons, episodes=args.episodes,
+                        latency_ms=args.latency_ms)
+    server = multiprocessing.get_context('spawn').Process(target=serve, args=(port,), kwargs=site_options, daemon=True)
+    server.start()
+    if not _wait_for_server(base_url):
+        print("[ERROR] Подмена сайта не запустилась.")
+        server.terminate()
+        return 1
+
+    output_path = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    os.chdir(workdir)
+    config.JUTSU_BASE_URL = base_url
+    config.JIKAN_API_URL = f"{base_url}/jikan/v4"
+    config.DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    config.JIKAN_CACHE_PATH = os.path.join(workdir, 'jikan_cache.sqlite3')
+    config.POSTERS_OUTPUT_DIR = os.path.join(workdir, 'posters')
+    config.JUTSU_FETCH_MODE = args.fetch_mode
+    config.EPISODE_FAST_MODE = args.fast_mode
+    config.HTML_EXTRACTOR = args.extractor
+
+    expected_episodes = args.anime * args.seasons * args.episodes
+    print(f"[START] Бенчмарк: {args.anime} аниме x {args.seasons} сезона x {args.episodes} эпизодов, "
+          f"режим {args.fetch_mode}{' (fast)' if args.fast_mode else ''}, воркеров: {args.concurrency}")
+    try:
+        results = asyncio.run(_run_scraper(args, expected_episodes))
+    finally:
+        server.terminate()
+        server.join()
+
+    print(f"\n[*] Эпизодов сохранено: {results['episodes_saved']}/{expected_episodes} "
+          f"за {results['elapsed_sec']} сек ({results['episodes_per_sec']} эп/сек)")
+    print(f"[*] Латентность эпизода: p50 {results['episode_latency_p50_sec']} сек, "
+          f"p99 {results['episode_latency_p99_sec']} сек")
+    print(f"[*] Пиковый RSS: {results['peak_rss_mb']} МБ (с браузерами: {results['peak_rss_with_browsers_mb']} МБ)")
+    print(f"[*] Запись в БД: {results['db_write_sec']} сек за {results['db_writes']} транзакций")
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'params': {**vars(args), 'output': None, 'baseline': None},
+        'results': results,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"[+] Результаты записаны в {output_path}")
+
+    exit_code = 0
+    if results['episodes_saved'] != expected_episodes:
+        print("[!] Сохранены не все эпизоды — результаты не сопоставимы с прошлыми прогонами.")
+        exit_code = 1
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"[!] Регрессия больше {args.max_regression}%: {', '.join(regressions)}")
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
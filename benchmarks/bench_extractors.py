@@ -0,0 +1,138 @@
+# benchmarks/bench_extractors.py
+"""
+Микробенчмарк бэкендов извлечения HTML (scrapers/extractors.py).
+
+Прогоняет сохраненные страницы каталога, аниме и эпизодов через каждый
+бэкенд, проверяет, что результат совпадает с эталонным BeautifulSoup,
+и печатает страниц/сек и пиковую память.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_extractors
+    python -m benchmarks.bench_extractors --fixtures path/to/pages --iterations 200 --json result.json
+
+Имена файлов определяют тип страницы: catalog_*.html, anime_*.html, episode_*.html.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import config
+from scrapers.extractors import EXTRACTORS, get_extractor
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'jutsu')
+PAGE_KINDS = ('catalog', 'anime', 'episode')
+
+
+def load_fixtures(fixtures_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+        kind = os.path.basename(path).split('_', 1)[0]
+        if kind in PAGE_KINDS:
+            with open(path, encoding='utf-8') as f:
+                pages.append((kind, os.path.basename(path), f.read()))
+    return pages
+
+
+def extract(extractor, kind, html_content):
+    if kind == 'catalog':
+        return extractor.catalog_slugs(html_content)
+    if kind == 'anime':
+        return extractor.episode_links(html_content, config.JUTSU_BASE_URL)
+    return extractor.episode_fields(html_content)
+
+
+def _run_backend(name, pages, iterations, result_queue):
+    """Выполняется в отдельном процессе, чтобы пиковая память не смешивалась между бэкендами."""
+    extractor = get_extractor(name)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        for kind, _, html_content in pages:
+            extract(extractor, kind, html_content)
+    elapsed = time.perf_counter() - started_at
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # tracemalloc сильно замедляет разбор, поэтому память кучи Python
+    # меряется отдельным проходом по набору страниц
+    tracemalloc.start()
+    for kind, _, html_content in pages:
+        extract(extractor, kind, html_content)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result_queue.put({
+        'backend': name,
+        'pages': iterations * len(pages),
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(iterations * len(pages) / elapsed, 1),
+        # ru_maxrss в Linux — в килобайтах
+        'peak_rss_growth_mb': round((rss_after - rss_before) / 1024, 1),
+        'python_heap_peak_mb': round(traced_peak / 1024 / 1024, 1),
+    })
+
+
+def check_identical(backends, pages):
+    """Сравнивает вывод каждого бэкенда с эталонным bs4. Возвращает список расхождений."""
+    reference = get_extractor('bs4')
+    mismatches = []
+    for name in backends:
+        extractor = get_extractor(name)
+        for kind, filename, html_content in pages:
+            expected = extract(reference, kind, html_content)
+            actual = extract(extractor, kind, html_content)
+            if actual != expected:
+                mismatches.append({'backend': name, 'page': filename, 'expected': expected, 'actual': actual})
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='каталог с сохраненными страницами')
+    parser.add_argument('--iterations', type=int, default=50, help='сколько раз прогнать весь набор страниц')
+    parser.add_argument('--backends', nargs='+', default=list(EXTRACTORS), choices=list(EXTRACTORS))
+    parser.add_argument('--json', help='записать результаты в JSON-файл')
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        print(f"[!] В {args.fixtures} нет страниц catalog_*/anime_*/episode_*.html")
+        return 1
+    print(f"[*] Страниц в наборе: {len(pages)}, итераций: {args.iterations}")
+
+    mismatches = check_identical(args.backends, pages)
+    for mismatch in mismatches:
+        print(f"  [!] {mismatch['backend']}: результат для {mismatch['page']} отличается от bs4")
+    if mismatches:
+        return 1
+    print("  [+] Все бэкенды дают одинаковый результат.")
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for name in args.backends:
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=_run_backend, args=(name, pages, args.iterations, result_queue))
+        process.start()
+        results.append(result_queue.get())
+        process.join()
+
+    baseline = next((r for r in results if r['backend'] == 'bs4'), None)
+    print(f"\n{'бэкенд':<8}{'стр/сек':>12}{'ускорение':>12}{'RSS, МБ':>10}{'heap, МБ':>10}")
+    for result in results:
+        speedup = result['pages_per_sec'] / baseline['pages_per_sec'] if baseline else 1.0
+        result['speedup_vs_bs4'] = round(speedup, 2)
+        print(f"{result['backend']:<8}{result['pages_per_sec']:>12}{speedup:>11.2f}x"
+              f"{result['peak_rss_growth_mb']:>10}{result['python_heap_peak_mb']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'fixtures': args.fixtures, 'iterations': args.iterations, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# benchmarks/standin_site.py
+"""
+Локальная подмена jut.su и Jikan API для офлайн-бенчмарков.
+
+Страницы собираются из сохраненных страниц в fixtures/jutsu: разметка
+остается настоящей, а меняются только слаги, названия, ссылки на
+эпизоды, window-переменные и URL постеров. Jikan отвечает заготовленным
+JSON по пути /jikan/v4/anime. Каталог заканчивается так же, как на
+сайте: запрос страницы за последней перенаправляет на главную.
+
+Запуск отдельно (например, чтобы направить на него работающее API):
+    python -m benchmarks.standin_site --port 8765 --anime 50
+и в config.py: JUTSU_BASE_URL = "http://127.0.0.1:8765",
+JIKAN_API_URL = "http://127.0.0.1:8765/jikan/v4".
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+import re
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'jutsu')
+CATALOG_ENTRY_RE = re.compile(r'<div class="all_anime_global">.*?</a></div>\n?', re.S)
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Fantasy', 'Shounen']
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _poster_bytes():
+    """Небольшой настоящий JPEG, чтобы работали миниатюры постеров."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b'\xff\xd8\xff\xe0' + os.urandom(2048) + b'\xff\xd9'
+    buffer = io.BytesIO()
+    Image.new('RGB', (350, 500), (180, 60, 60)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class StandinSite:
+    """
+    Генерирует каталог из `anime_count` аниме, у каждого `seasons` сезонов
+    по `episodes` эпизодов. `latency_ms` — искусственная задержка ответа
+    (с разбросом ±50%), чтобы имитировать сеть.
+    """
+    def __init__(self, anime_count=20, seasons=2, episodes=12, catalog_page_size=30, latency_ms=0):
+        self.anime_count = anime_count
+        self.seasons = seasons
+        self.episodes = episodes
+        self.catalog_page_size = catalog_page_size
+        self.latency_ms = latency_ms
+        self.slugs = [f"bench-anime-{i}" for i in range(anime_count)]
+        self.requests = 0
+
+        catalog = _read_fixture('catalog_page.html')
+        entries = list(CATALOG_ENTRY_RE.finditer(catalog))
+        self._catalog_head = catalog[:entries[0].start()]
+        self._catalog_tail = catalog[entries[-1].end():]
+        self._catalog_entry = entries[0].group(0).replace('anime-slug-0', '{slug}')
+
+        anime_page = _read_fixture('anime_page_seasons.html')
+        self._anime_head = anime_page[:anime_page.index('<div class="the_season_tabs">')]
+        self._anime_tail = anime_page[anime_page.index('<div class="comments_block">'):]
+
+        self._episode_page = _read_fixture('episode_page.html')
+        self._poster = _poster_bytes()
+        self._poster_etag = '"' + hashlib.sha1(self._poster).hexdigest() + '"'
+
+    @staticmethod
+    def title(slug):
+        return f"Тестовое аниме {slug.rsplit('-', 1)[1]}"
+
+    def episode_path(self, slug, season, episode):
+        if self.seasons == 1:
+            return f"/{slug}/episode-{episode}.html"
+        return f"/{slug}/season-{season}/episode-{episode}.html"
+
+    @property
+    def total_episodes(self):
+        return self.anime_count * self.seasons * self.episodes
+
+    def catalog_html(self, page_num):
+        start = (page_num - 1) * self.catalog_page_size
+        page_slugs = self.slugs[start:start + self.catalog_page_size]
+        if not page_slugs:
+            return None
+        return self._catalog_head + ''.join(self._catalog_entry.format(slug=slug) for slug in page_slugs) + self._catalog_tail
+
+    def anime_html(self, slug):
+        def links(season):
+            return ' '.join(
+                f'<a href="{self.episode_path(slug, season, e)}" class="short-btn green video the_hildi"><i>{e} серия</i></a>'
+                for e in range(1, self.episodes + 1)
+            )
+
+        if self.seasons == 1:
+            body = f'<div class="sezons">{links(1)} </div>'
+        else:
+            tabs = ''.join(f'<a href="#season_{s}">{s} сезон</a>' for s in range(1, self.seasons + 1))
+            blocks = ''.join(
+                f'<div id="season_{s}" class="season_block"><h2 class="b-b-title the-anime-season">{s} сезон</h2>{links(s)} </div>'
+                for s in range(1, self.seasons + 1)
+            )
+            body = f'<div class="the_season_tabs">{tabs}</div><div class="sezons">{blocks}</div>'
+        return self._anime_head + body + self._anime_tail
+
+    def episode_html(self, base_url, slug, season, episode):
+        title = self.title(slug)
+        if episode < self.episodes:
+            next_link = self.episode_path(slug, season, episode + 1).replace('/', '\\/')
+        else:
+            next_link = ''
+        duration = 1380 + episode
+        html_content = self._episode_page
+        html_content = html_content.replace('Смотреть Наруто 5 серия', f'Смотреть {title} {episode} серия')
+        html_content = html_content.replace('<span>Ты провалил!</span> Конец задания Какаши', f'Серия {episode} сезона {season}')
+        html_content = html_content.replace('https://gen.jut.su/uploads/preview/1/0/5/5_1591297468.jpg',
+                                            f'{base_url}/posters/{slug}.jpg')
+        html_content = html_content.replace('var video_duration = 1389; var this_video_duration = 1389;',
+                                            f'var video_duration = {duration}; var this_video_duration = {duration};')
+        html_content = html_content.replace('var video_outro_start = 1300; var video_outro_end = 1389;',
+                                            f'var video_outro_start = {duration - 89}; var video_outro_end = {duration};')
+        return html_content.replace('"\\/naruuto\\/season-1\\/episode-6.html"', f'"{next_link}"')
+
+    def jikan_anime(self, query):
+        slug_index = query.rsplit(' ', 1)[-1]
+        rng = random.Random(query)
+        return {'data': [{
+            'title': f"Bench Anime {slug_index}",
+            'title_japanese': f"ベンチ {slug_index}",
+            'synopsis': f"Описание тестового аниме {slug_index}. " * 5,
+            'images': {'jpg': {'large_image_url': None}},
+            'rating': 'PG-13 - Teens 13 or older',
+            'status': 'Finished Airing',
+            'year': 2000 + rng.randrange(25),
+            'score': round(rng.uniform(5, 9), 2),
+            'type': 'TV',
+            'genres': [{'name': name} for name in rng.sample(GENRES, 3)],
+        }]}
+
+    # Обработчики aiohttp
+
+    @web.middleware
+    async def _latency_middleware(self, request, handler):
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms * random.uniform(0.5, 1.5) / 1000)
+        return await handler(request)
+
+    def _base_url(self, request):
+        return f"{request.scheme}://{request.host}"
+
+    async def _root(self, request):
+        return web.Response(text='<html><body><h1>Jut.su</h1></body></html>', content_type='text/html')
+
+    async def _catalog(self, request):
+        page_num = int(request.match_info.get('page', 1))
+        html_content = self.catalog_html(page_num)
+        if html_content is None:
+            raise web.HTTPFound('/')
+        return web.Response(text=html_content, content_type='text/html')
+
+    async def _anime(self, request):
+        slug = request.match_info['slug']
+        if slug not in self.slugs:
+            raise web.HTTPNotFound()
+        return web.Response(text=self.anime_html(slug), content_type='text/html')
+
+    async def _episode(self, request):
+        slug = request.match_info['slug']
+        season = int(request.match_info.get('season', 1))
+        episode = int(request.match_info['episode'])
+        if slug not in self.slugs or not 1 <= episode <= self.episodes:
+            raise web.HTTPNotFound()
+        html_content = self.episode_html(self._base_url(request), slug, season, episode)
+        return web.Response(text=html_content, content_type='text/html')
+
+    async def _poster_handler(self, request):
+        if request.headers.get('If-None-Match') == self._poster_etag:
+            return web.Response(status=304, headers={'ETag': self._poster_etag})
+        return web.Response(body=self._poster, content_type='image/jpeg', headers={'ETag': self._poster_etag})
+
+    async def _jikan(self, request):
+        return web.json_response(self.jikan_anime(request.query.get('q', '')),
+                                 dumps=lambda data: json.dumps(data, ensure_ascii=False))
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._latency_middleware])
+        app.router.add_get('/', self._root)
+        app.router.add_get('/anime/', self._catalog)
+        app.router.add_get('/anime/page-{page:\\d+}/', self._catalog)
+        app.router.add_get('/jikan/v4/anime', self._jikan)
+        app.router.add_get('/posters/{name}', self._poster_handler)
+        app.router.add_get('/{slug}/', self._anime)
+        app.router.add_get('/{slug}/episode-{episode:\\d+}.html', self._episode)
+        app.router.add_get('/{slug}/season-{season:\\d+}/episode-{episode:\\d+}.html', self._episode)
+        return app
+
+
+def serve(port, host='127.0.0.1', **site_options):
+    """Запускает подмену сайта (блокирующий вызов; используется и из бенчмарка в отдельном процессе)."""
+    site = StandinSite(**site_options)
+    web.run_app(site.make_app(), host=host, port=port, print=None, handle_signals=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--anime', type=int, default=20, help='количество аниме в каталоге')
+    parser.add_argument('--seasons', type=int, default=2, help='сезонов у каждого аниме')
+    parser.add_argument('--episodes', type=int, default=12, help='эпизодов в каждом сезоне')
+    parser.add_argument('--latency-ms', type=int, default=0, help='искусственная задержка ответа')
+    args = parser.parse_args()
+    print(f"[*] Подмена jut.su/Jikan: http://{args.host}:{args.port} "
+          f"({args.anime} аниме x {args.seasons} сезона x {args.episodes} эпизодов)")
+    serve(args.port, args.host, anime_count=args.anime, seasons=args.seasons,
+          episodes=args.episodes, latency_ms=args.latency_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,19 @@ DB_HOST = "localhost"
 DB_USER = "your_db_user"  # Замените на вашего пользователя
 DB_PASSWORD = "your_db_password"  # Замените на ваш пароль
 DB_NAME = "anime_parser_db"
+# Полный URL SQLAlchemy (например, "sqlite:///./bench.db"); если задан,
+# используется вместо MySQL без попытки подключения к нему
+DATABASE_URL = None
+
+# Пул соединений SQLAlchemy (для MySQL; SQLite их не использует)
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 10
+DB_POOL_RECYCLE_SEC = 1800  # меньше wait_timeout MySQL, чтобы не получать "server has gone away"
+DB_POOL_PRE_PING = True
+# Проверка подключения при старте: таймаут одной попытки и число повторов
+DB_CONNECT_TIMEOUT_SEC = 3
+DB_CONNECT_RETRIES = 3
+DB_CONNECT_RETRY_DELAY_SEC = 1
 
 # Настройки для скрапинга
 JUTSU_BASE_URL = "https://jut.su"
@@ -14,3 +27,128 @@ JIKAN_API_URL = "https://api.jikan.moe/v4"
 # Директория для сохранения постеров
 POSTERS_OUTPUT_DIR = "downloaded_posters"
 
+
+# Количество параллельных воркеров при массовом добавлении аниме.
+# Каждый воркер работает в собственном контексте браузера.
+SCRAPING_CONCURRENCY = 3
+# Верхняя граница `concurrency` в запросах API: воркеры сверх
+# BROWSER_MAX_CONTEXTS только ждут свободный контекст.
+MAX_SCRAPING_CONCURRENCY = 16
+
+# Размер пула страниц для параллельного парсинга эпизодов одного аниме.
+EPISODE_PAGE_POOL_SIZE = 4
+
+# Пул браузера (scrapers/browser_pool.py): один Chromium на все приложение.
+# Теплые контексты создаются при старте, всего контекстов не больше BROWSER_MAX_CONTEXTS.
+BROWSER_WARM_CONTEXTS = 4
+BROWSER_MAX_CONTEXTS = 8
+# Лимит одновременно открытых страниц во всех контекстах; при нехватке
+# пул страниц эпизодов работает на меньшем числе страниц.
+BROWSER_MAX_PAGES = 16
+# Контекст пересоздается после стольких навигаций...
+BROWSER_CONTEXT_MAX_NAVIGATIONS = 500
+# ...или когда процессы браузера занимают больше стольких МБ (проверка по /proc)
+BROWSER_RECYCLE_RSS_MB = 1500
+BROWSER_MEMORY_CHECK_INTERVAL_SEC = 30
+
+# Адаптивная нагрузка на внешние хосты (scrapers/host_limiter.py): окно
+# параллельных запросов на хост растет, пока задержка и доля ошибок в норме,
+# и уменьшается в HOST_BACKOFF_FACTOR раз на 429/503, Cloudflare и таймауты.
+HOST_LIMIT_DEFAULT = {"initial": 4, "min_limit": 1, "max_limit": 8}  # в т.ч. CDN постеров
+HOST_LIMITS = {
+    "jut.su": {"initial": 6, "max_limit": 24},
+    "api.jikan.moe": {"initial": 2, "max_limit": 3},  # частоту дополнительно ограничивает JIKAN_RATE_*
+}
+HOST_BACKOFF_FACTOR = 0.5
+HOST_LATENCY_TOLERANCE = 2.0  # задержка выше "нормальной" во столько раз — признак перегрузки
+HOST_ERROR_RATE_THRESHOLD = 0.2  # при большей доле ошибок окно не растет
+# Повторы неудачных запросов: отступ base * 2^попытка со случайным разбросом, не больше max
+HOST_MAX_RETRIES = 2
+HOST_RETRY_BASE_SEC = 1
+HOST_RETRY_MAX_SEC = 60
+
+# Настройки пула HTTP-соединений (aiohttp) для постеров и Jikan API
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_DNS_CACHE_TTL = 300  # секунд
+HTTP_KEEPALIVE_TIMEOUT = 30  # секунд
+
+# Быстрый режим загрузки страниц эпизодов: перехват запросов с блокировкой
+# тяжелых ресурсов и ожидание только нужных window-переменных вместо networkidle.
+EPISODE_FAST_MODE = False
+FAST_MODE_BLOCKED_RESOURCES = ("media", "image", "font")
+# В быстром режиме каждая N-я новая вкладка грузит эпизоды в обычном режиме —
+# контрольная выборка для bytes_saved_per_page в /stats/page-load. 0 — без нее.
+EPISODE_FAST_MODE_CONTROL_EVERY = 20
+
+# Способ загрузки страниц аниме и эпизодов с jut.su:
+# "playwright" - всегда через браузер, "http" - сначала aiohttp,
+# Playwright только при проверке Cloudflare.
+JUTSU_FETCH_MODE = "playwright"
+# Сколько браузер ждет прохождения проверки Cloudflare (ответ 403/503 с cf-ray)
+CLOUDFLARE_CHALLENGE_TIMEOUT_SEC = 30
+
+# Интервалы повторной проверки уже добавленных аниме на новые эпизоды
+RECHECK_INTERVAL_AIRING_HOURS = 6
+RECHECK_INTERVAL_FINISHED_HOURS = 24 * 7
+
+# Максимальное количество строк в одном пакетном INSERT
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Работа с БД вне event loop: потоки для чтения и размер очереди записей
+DB_READ_THREADS = 4
+DB_WRITE_QUEUE_SIZE = 100
+
+# Сколько страниц каталога загружать одновременно
+CATALOG_PAGE_CONCURRENCY = 3
+
+# Бэкенд извлечения данных из HTML: "bs4" (BeautifulSoup + html.parser)
+# или "lxml" (C-парсер, требует пакеты lxml и cssselect).
+# Сравнение скорости и проверка идентичности: benchmarks/bench_extractors.py
+HTML_EXTRACTOR = "bs4"
+
+# Jikan API: постоянный кэш метаданных и ограничение частоты запросов
+JIKAN_CACHE_PATH = "jikan_cache.sqlite3"
+JIKAN_CACHE_TTL_HOURS = 24 * 7
+JIKAN_NEGATIVE_CACHE_TTL_HOURS = 24  # для ответов "не найдено"
+JIKAN_RATE_PER_SECOND = 3  # документированные лимиты Jikan
+JIKAN_RATE_PER_MINUTE = 60
+JIKAN_MAX_RETRIES = 3  # повторы при 429/503 с учетом Retry-After
+
+# Хранилище постеров: WebP-миниатюры создаются в пуле процессов.
+# POSTER_THUMBNAIL_WIDTH = 0 отключает миниатюры (они также не создаются без Pillow).
+POSTER_THUMBNAIL_WIDTH = 320
+POSTER_THUMBNAIL_QUALITY = 80
+POSTER_THUMBNAIL_PROCESSES = 2
+
+# Архив исходных страниц (scrapers/page_archive.py): HTML и window-переменные
+# каждой загруженной страницы, сжатые, только дописываются. По нему
+# `python -m core.reparse` пересобирает аниме и эпизоды без сети.
+PAGE_ARCHIVE_ENABLED = False
+PAGE_ARCHIVE_DIR = "page_archive"
+PAGE_ARCHIVE_SEGMENT_MB = 256
+PAGE_ARCHIVE_COMPRESSION_LEVEL = 6  # zlib, 1-9
+# Процессы для разбора HTML при переразборе архива (None — по числу ядер)
+REPARSE_PROCESSES = None
+
+# Кэш метаданных воспроизведения (/api/v1/playback/...) в памяти процесса.
+# Сохранение эпизодов сбрасывает записи своего аниме; TTL ограничивает
+# устаревание при записи другими узлами на общую БД.
+PLAYBACK_CACHE_MAX_ENTRIES = 100_000
+PLAYBACK_CACHE_MAX_MB = 64
+PLAYBACK_CACHE_TTL_SEC = 300
+PLAYBACK_PREFETCH_MAX = 50  # сколько следующих эпизодов можно запросить разом
+
+# Очередь задач скрапинга (хранится в БД, переживает перезапуск)
+MAX_CONCURRENT_JOBS = 2
+JOB_PRIORITIES = {"specific": 10, "incremental": 5, "bulk": 0, "continuous": -10}  # больше — раньше
+JOB_POLL_INTERVAL_SEC = 5  # как часто проверять очередь и отмену из БД
+JOB_CANCEL_GRACE_SEC = 60  # после этого задача, не остановившаяся сама, прерывается принудительно
+EPISODE_CHECKPOINT_SIZE = 25  # эпизоды сохраняются порциями; порция — единица возобновления
+
+# Совместная работа нескольких узлов на общей БД (таблица work_leases)
+NODE_ID = None  # имя узла, по умолчанию имя хоста; к нему привязывается непрерывный скрапинг
+LEASE_TTL_SEC = 90  # аренда без heartbeat истекает, и работу умершего процесса забирают другие узлы
+LEASE_HEARTBEAT_SEC = 30
+LEASE_DONE_HOLD_SEC = 600  # сколько обработанное аниме не выдается другим узлам
+LEASE_PURGE_EVERY_BEATS = 20  # просроченные аренды удаляются каждые N heartbeat'ов
@@ -0,0 +1,148 @@
+# core/job_runner.py
+import asyncio
+import config
+from database.async_db import async_db
+from database import jobs
+from .jobs import JobContext, JobCancelled
+from .leases import node_name
+
+JOB_KINDS = ('specific', 'bulk', 'incremental', 'continuous')
+
+
+class JobRunner:
+    """
+    Выполняет задачи из постоянной очереди в БД: берет самые приоритетные,
+    не больше MAX_CONCURRENT_JOBS одновременно. Отмена кооперативная —
+    скрапинг останавливается в ближайшей точке проверки; если задача не
+    остановилась за JOB_CANCEL_GRACE_SEC, она прерывается принудительно.
+    Выполняющуюся задачу держит аренда узла: при остановке приложения или
+    смерти процесса задача остается в статусе running, а без аренды
+    возвращается в очередь и продолжается с последнего чекпоинта на этом
+    или другом узле с той же БД.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        self._tasks = {}  # {job_id: asyncio.Task}
+        self._contexts = {}  # {job_id: JobContext}
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def start(self):
+        if self._dispatcher is not None and not self._dispatcher.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def close(self):
+        """Останавливает диспетчер и задачи, не меняя их статус в БД."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks.values(), return_exceptions=True)
+        self._dispatcher = None
+
+    async def submit(self, kind, params, priority=None, pin_to_node=False):
+        """Ставит задачу в очередь и возвращает ее id. pin_to_node — выполнять только на этом узле."""
+        if priority is None:
+            priority = config.JOB_PRIORITIES.get(kind, 0)
+        node = node_name() if pin_to_node else None
+        job_id = await async_db.write(jobs.create_job, kind, params, priority, node)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def cancel(self, job_id):
+        """Запрашивает отмену задачи. Возвращает ее новый статус или None, если задачи нет."""
+        status = await async_db.write(jobs.request_cancel, job_id)
+        if status == 'cancelling':
+            self._stop(job_id)
+        return status
+
+    async def get_active_job_ids(self, kind, this_node_only=False):
+        return await async_db.read(jobs.get_active_job_ids, kind, node_name() if this_node_only else None)
+
+    def _stop(self, job_id):
+        context = self._contexts.get(job_id)
+        if context is None or context.cancelled:
+            return
+        print(f"[*] Задача #{job_id}: запрошена отмена.")
+        context.cancel()
+        task = self._tasks[job_id]
+        asyncio.get_running_loop().call_later(config.JOB_CANCEL_GRACE_SEC, task.cancel)
+
+    async def _dispatch_loop(self):
+        leases = self.manager.leases
+        while True:
+            self._wakeup.clear()
+            try:
+                # Задачи остановленных или умерших узлов (в том числе этого
+                # процесса до перезапуска) возвращаются в очередь
+                resumed = await async_db.write(jobs.requeue_interrupted_jobs)
+                if resumed:
+                    print(f"[*] Прерванных задач для возобновления: {resumed}")
+                while len(self._tasks) < config.MAX_CONCURRENT_JOBS:
+                    job = await async_db.write(jobs.claim_next_job, node_name(), leases.owner, config.LEASE_TTL_SEC)
+                    if job is None:
+                        break
+                    leases.track('job', str(job['id']))
+                    if job['id'] in self._tasks:
+                        # Аренда истекла, пока задача еще шла здесь (heartbeat отстал)
+                        print(f"[!] Задача #{job['id']} уже выполняется на этом узле.")
+                        continue
+                    context = JobContext(job['id'], catalog_page=job['catalog_page'], resumed=job['resumed'])
+                    self._contexts[job['id']] = context
+                    self._tasks[job['id']] = asyncio.create_task(self._run_job(job, context))
+
+                # Отмена могла прийти напрямую через БД (например, из другого процесса)
+                statuses = await async_db.read(jobs.get_job_statuses, list(self._contexts))
+                for job_id, status in statuses.items():
+                    if status == 'cancelling':
+                        self._stop(job_id)
+            except Exception as e:
+                print(f"[ERROR] Диспетчер задач: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=config.JOB_POLL_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+    def _handler(self, kind, params, context):
+        if kind == 'specific':
+            return self.manager.add_specific_anime(params['anime_slug'], job=context)
+        if kind == 'bulk':
+            return self.manager.add_bulk_anime(params['limit'], params.get('concurrency'), job=context)
+        if kind == 'incremental':
+            return self.manager.update_existing_anime(params.get('limit'), params.get('concurrency'), job=context)
+        if kind == 'continuous':
+            return self.manager.run_continuous_scraping(job=context)
+        raise ValueError(f"Неизвестный тип задачи: {kind}")
+
+    async def _run_job(self, job, context):
+        job_id = job['id']
+        action = "Возобновление" if job['resumed'] else "Запуск"
+        print(f"[START] {action} задачи #{job_id} ({job['kind']}), параметры: {job['params']}")
+        result, error = None, None
+        try:
+            result = await self._handler(job['kind'], job['params'], context)
+            status = 'finished'
+        except JobCancelled:
+            status = 'cancelled'
+        except asyncio.CancelledError:
+            if not context.cancelled:
+                # Остановка приложения: статус running сохраняется для возобновления
+                raise
+            status = 'cancelled'
+        except Exception as e:
+            print(f"[ERROR] Задача #{job_id} завершилась с ошибкой: {e}")
+            status, error = 'failed', str(e)
+        finally:
+            self._tasks.pop(job_id, None)
+            self._contexts.pop(job_id, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+        await async_db.write(jobs.finish_job, job_id, status, result, error)
+        await self.manager.leases.release('job', [str(job_id)])
+        print(f"[INFO] Задача #{job_id}: {status}")
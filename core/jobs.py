@@ -0,0 +1,76 @@
+# core/jobs.py
+import asyncio
+from database.async_db import async_db
+from database import jobs
+
+
+class JobCancelled(Exception):
+    """Задача отменена: поднимается в точках проверки отмены."""
+
+
+class JobContext:
+    """
+    Связь выполняющейся задачи с ее записью в БД: чекпоинты прогресса
+    и флаг кооперативной отмены, который скрапинг проверяет между аниме
+    и между порциями эпизодов. Без job_id (вызов вне очереди задач)
+    чекпоинты никуда не пишутся.
+    """
+    def __init__(self, job_id=None, catalog_page=0, resumed=False):
+        self.job_id = job_id
+        self.catalog_page = catalog_page
+        self.resumed = resumed
+        self._cancel_event = asyncio.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    async def sleep(self, seconds):
+        """Пауза, которую прерывает отмена задачи."""
+        try:
+            await asyncio.wait_for(self._cancel_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return
+        raise JobCancelled()
+
+    async def get_items(self):
+        """(все slug'и задачи, незавершенные slug'и) — для возобновления."""
+        if self.job_id is None:
+            return set(), []
+        return await async_db.read(jobs.get_job_items, self.job_id)
+
+    async def add_items(self, slugs):
+        if self.job_id is not None and slugs:
+            await async_db.write(jobs.add_job_items, self.job_id, slugs)
+
+    async def catalog_page_done(self, page_num):
+        self.catalog_page = page_num
+        if self.job_id is not None:
+            await async_db.write(jobs.set_catalog_page, self.job_id, page_num)
+
+    async def start_over(self):
+        """Следующий проход — с первой страницы каталога и без элементов прошлого прохода."""
+        self.catalog_page = 0
+        if self.job_id is not None:
+            await async_db.write(jobs.reset_job_progress, self.job_id)
+
+    async def item_started(self, slug):
+        if self.job_id is not None:
+            await async_db.write(jobs.update_job_item, self.job_id, slug, status='running')
+
+    async def item_progress(self, slug, episodes_done, episodes_total):
+        if self.job_id is not None:
+            await async_db.write(jobs.update_job_item, self.job_id, slug,
+                                 episodes_done=episodes_done, episodes_total=episodes_total)
+
+    async def item_finished(self, slug, status):
+        """status — итог обработки аниме: success, updated, skipped или error."""
+        if self.job_id is not None:
+            await async_db.write(jobs.update_job_item, self.job_id, slug, status=status)
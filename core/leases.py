@@ -0,0 +1,105 @@
+# core/leases.py
+import asyncio
+import os
+import socket
+import config
+from database.async_db import async_db
+from database import leases
+
+
+def node_name():
+    """Имя узла: config.NODE_ID или имя хоста. Задачи можно привязать к узлу по нему."""
+    return config.NODE_ID or socket.gethostname()
+
+
+class LeaseLost(Exception):
+    """Аренду единицы работы перехватил другой узел (heartbeat не успел ее продлить)."""
+
+
+class LeaseManager:
+    """
+    Аренды единиц работы этого процесса в общей БД. Несколько узлов,
+    работающих с одной БД, берут аниме, эпизоды и задачи в аренду перед
+    работой, поэтому не скачивают одно и то же. Фоновый heartbeat
+    продлевает аренды каждые LEASE_HEARTBEAT_SEC; если процесс умер,
+    через LEASE_TTL_SEC его работу забирают другие узлы.
+    """
+    def __init__(self):
+        self.owner = f"{node_name()}:{os.getpid()}"
+        self._held = set()  # {(kind, work_key)}
+        self._lost = set()
+        self._heartbeat_task = None
+
+    async def start(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def close(self):
+        """Останавливает heartbeat и сразу освобождает аренды, чтобы их работу могли взять другие узлы."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        if self._held:
+            try:
+                released = await async_db.write(leases.release_all_leases, self.owner)
+                print(f"[*] Освобождено аренд: {released}")
+            except Exception as e:
+                print(f"[!] Не удалось освободить аренды ({e}), они истекут через {config.LEASE_TTL_SEC} сек.")
+            self._held.clear()
+
+    async def acquire(self, kind, keys):
+        """Берет в аренду свободные ключи; возвращает полученные в исходном порядке."""
+        owned = await async_db.write(leases.acquire_leases, kind, list(keys), self.owner, config.LEASE_TTL_SEC)
+        for key in owned:
+            self._held.add((kind, key))
+            self._lost.discard((kind, key))
+        return owned
+
+    async def acquire_one(self, kind, key):
+        return bool(await self.acquire(kind, [key]))
+
+    def track(self, kind, key):
+        """Учитывает аренду, взятую в чужой транзакции (например, при захвате задачи)."""
+        self._held.add((kind, key))
+
+    async def release(self, kind, keys, done=False):
+        """
+        Освобождает аренды. done=True — работа выполнена: единица еще
+        LEASE_DONE_HOLD_SEC не выдается другим узлам.
+        """
+        keys = [key for key in keys if (kind, key) in self._held]
+        if not keys:
+            return
+        for key in keys:
+            self._held.discard((kind, key))
+        await async_db.write(leases.release_leases, kind, keys, self.owner,
+                             config.LEASE_DONE_HOLD_SEC if done else None)
+
+    def check(self, kind, key):
+        """Поднимает LeaseLost, если аренду перехватил другой узел."""
+        if (kind, key) in self._lost:
+            raise LeaseLost(f"{kind} '{key}'")
+
+    async def _heartbeat_loop(self):
+        beats = 0
+        while True:
+            await asyncio.sleep(config.LEASE_HEARTBEAT_SEC)
+            beats += 1
+            try:
+                held_before = set(self._held)
+                if held_before:
+                    still_held = await async_db.write(leases.renew_leases, self.owner, config.LEASE_TTL_SEC)
+                    # Освобожденные за время продления — не потери
+                    lost = {item for item in held_before - still_held if item in self._held}
+                    for item in lost:
+                        print(f"[!] Аренда {item[0]} '{item[1]}' перехвачена другим узлом.")
+                        self._held.discard(item)
+                        self._lost.add(item)
+                if beats % config.LEASE_PURGE_EVERY_BEATS == 0:
+                    await async_db.write(leases.purge_expired_leases)
+            except Exception as e:
+                print(f"[!] Heartbeat аренд: {e}")
+
+    def get_stats(self):
+        return {'owner': self.owner, 'held': len(self._held), 'lost': len(self._lost)}
@@ -0,0 +1,198 @@
+# core/metrics.py
+"""
+Метрики скрапинга в формате Prometheus (text exposition 0.0.4) без
+внешних зависимостей: счетчики и гистограммы с метками. Значения
+обновляются и из event loop, и из потоков БД, поэтому под блокировкой.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+# Границы корзин гистограмм (секунды): от быстрых разборов HTML до долгих page.goto
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}  # {метки: [счетчики по корзинам, сумма, количество]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Сумма и количество наблюдений по каждому набору меток: [{метки..., 'count', 'sum'}]."""
+        with self._lock:
+            return [
+                {**dict(zip(self.labelnames, key)), 'count': count, 'sum': total}
+                for key, (_, total, count) in sorted(self._series.items())
+            ]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'scraper_stage_duration_seconds',
+    'Длительность этапов скрапинга (page.goto, page.content, разбор HTML, Jikan, запись в БД...)',
+    ('scraper', 'stage', 'outcome'),
+))
+ITEMS_TOTAL = REGISTRY.register(Counter(
+    'scraper_items_total',
+    'Обработанные объекты (аниме, эпизоды, постеры) по результату',
+    ('scraper', 'item', 'outcome'),
+))
+HOST_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'scraper_host_requests_total',
+    'Запросы к внешним хостам по результату (ok, throttled, timeout, error)',
+    ('host', 'outcome'),
+))
+HOST_CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    'scraper_host_concurrency_limit',
+    'Текущее окно параллельных запросов к хосту (адаптивный ограничитель)',
+    ('host',),
+))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StageTimer:
+    """Замер одного этапа; вызывающий код может уточнить outcome (например, 'cache_hit')."""
+    def __init__(self):
+        self.outcome = 'ok'
+
+
+def _error_outcome(error):
+    if isinstance(error, asyncio.CancelledError):
+        return 'cancelled'
+    # У Playwright свой TimeoutError, не наследник встроенного
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)) or type(error).__name__ == 'TimeoutError':
+        return 'timeout'
+    return 'error'
+
+
+@contextmanager
+def stage(scraper, name):
+    """
+    Замеряет этап: `with stage('jutsu', 'page_goto') as timer: await page.goto(...)`.
+    Исключение записывается как outcome 'error'/'timeout'/'cancelled' и пробрасывается дальше.
+    """
+    timer = StageTimer()
+    started_at = time.perf_counter()
+    try:
+        yield timer
+    except BaseException as e:
+        timer.outcome = _error_outcome(e)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started_at, scraper=scraper, stage=name, outcome=timer.outcome)
+
+
+def count(scraper, item, outcome, amount=1):
+    ITEMS_TOTAL.inc(amount, scraper=scraper, item=item, outcome=outcome)
+
+
+def render():
+    return REGISTRY.render()
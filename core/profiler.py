@@ -0,0 +1,115 @@
+# core/profiler.py
+"""
+Семплирующий профилировщик, включаемый на лету через API. Отдельный
+поток с заданным интервалом снимает стек потока event loop
+(sys._current_frames) и считает одинаковые стеки. Отчет — в формате
+collapsed stacks (для flamegraph.pl / speedscope) или топ функций.
+Накладные расходы есть только пока профилировщик включен.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_STACK_DEPTH = 64
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._stacks = Counter()
+        self.target_thread_id = None
+        self.interval = None
+        self.started_at = None
+        self.samples = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=10, thread_id=None, reset=True):
+        """Начинает семплирование потока thread_id (по умолчанию — вызывающего, т.е. event loop)."""
+        if self.running:
+            return False
+        if reset:
+            self.reset()
+        self.target_thread_id = thread_id or threading.get_ident()
+        self.interval = max(1, interval_ms) / 1000
+        self.started_at = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            with self._lock:
+                self._stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def status(self):
+        return {
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000) if self.interval else None,
+            'started_at': self.started_at,
+            'samples': self.samples,
+        }
+
+    def collapsed(self):
+        """Стеки в формате 'корень;...;лист количество' по строке на стек."""
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + '\n'
+
+    def top(self, limit=30):
+        """
+        Топ функций: self — доля семплов, где функция на вершине стека,
+        total — где она есть в стеке. Ожидание в select() event loop
+        означает простой (задачи ждут сеть).
+        """
+        self_counts, total_counts = Counter(), Counter()
+        with self._lock:
+            samples = self.samples
+            for stack, count in self._stacks.items():
+                frames = stack.split(';')
+                self_counts[frames[-1]] += count
+                for label in set(frames):
+                    total_counts[label] += count
+        if not samples:
+            return []
+        return [
+            {'function': label, 'self_pct': round(100 * self_counts[label] / samples, 2),
+             'total_pct': round(100 * total / samples, 2)}
+            for label, total in sorted(total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1]))[:limit]
+        ]
+
+
+# Синглтон экземпляр
+profiler = SamplingProfiler()
@@ -0,0 +1,228 @@
+# core/reparse.py
+"""
+Офлайн-переразбор архива страниц (scrapers/page_archive.py): строки
+Anime/Episode пересобираются из сохраненного HTML и window-переменных
+без сети — после исправления селектора или добавления нового поля.
+
+Режимы:
+  backfill — добавляет аниме и эпизоды, которых еще нет в БД (по умолчанию);
+  rebuild  — перезаписывает поля всех аниме и эпизодов, найденных в архиве.
+
+Метаданные Jikan берутся только из кэша (JIKAN_CACHE_PATH), пути постеров —
+из хранилища постеров; чего там нет, то у существующих строк не меняется.
+HTML разбирается в пуле процессов (по умолчанию бэкендом lxml), запись
+в БД идет из основного процесса.
+Новые аниме сохраняются с пустым last_checked_at, поэтому эпизоды,
+которых не было в архиве, догрузит обычная перепроверка.
+
+Запуск из корня репозитория:
+    python -m core.reparse
+    python -m core.reparse --mode rebuild --slug naruto --slug bleach
+    python -m core.reparse --reindex
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import config
+from database.db_manager import db_manager
+from scrapers.extractors import get_extractor, EXTRACTORS, HAS_LXML
+from scrapers.jikan_cache import JikanCache
+from scrapers.jutsu_scraper import JutsuScraper
+from scrapers.page_archive import PageArchive
+from scrapers.poster_store import PosterStore
+from .scraping_manager import ScrapingManager
+
+# Без установленного lxml остается BeautifulSoup
+DEFAULT_EXTRACTOR = 'lxml' if HAS_LXML else 'bs4'
+METADATA_FIELDS = ('title_orig', 'description_api', 'poster_url_api', 'age_rating', 'status', 'year', 'score')
+
+# Состояние процесса пула: архив, скрапер (только разбор) и индекс страниц эпизодов
+_worker = {}
+
+
+def _open_archive(archive_dir):
+    return PageArchive(archive_dir, config.PAGE_ARCHIVE_SEGMENT_MB, config.PAGE_ARCHIVE_COMPRESSION_LEVEL)
+
+
+def _init_worker(archive_dir, extractor, episode_locations):
+    _worker['archive'] = _open_archive(archive_dir)
+    _worker['scraper'] = JutsuScraper()
+    _worker['scraper']._extractor = get_extractor(extractor)
+    _worker['episodes'] = episode_locations
+
+
+def _parse_anime(slug, anime_location, skip_urls):
+    """
+    Разбирает страницу аниме и страницы его эпизодов из архива (в процессе
+    пула). Возвращает (slug, {сезон: [данные эпизодов]}, {url эпизода: url
+    постера}, число эпизодов, страниц которых нет в архиве).
+    """
+    archive, scraper, episodes = _worker['archive'], _worker['scraper'], _worker['episodes']
+    anime_page = archive.read(anime_location)
+    seasons_with_links = scraper.extractor.episode_links(anime_page['html'], scraper.base_url)
+    seasons, poster_urls, missing = {}, {}, 0
+    for season_num, links in seasons_with_links.items():
+        for link in links:
+            if link in skip_urls:
+                continue
+            location = episodes.get(link)
+            if location is None:
+                missing += 1
+                continue
+            page = archive.read(location)
+            data, poster_url = scraper.parse_episode_html(link, page['html'], page['window_vars'] or {})
+            seasons.setdefault(season_num, []).append(data)
+            if poster_url:
+                poster_urls[link] = poster_url
+    return slug, seasons, poster_urls, missing
+
+
+class Reparser:
+    """Запись результатов разбора в БД: метаданные из кэша Jikan, постеры из хранилища."""
+    def __init__(self, mode):
+        self.mode = mode
+        self.jikan_cache = JikanCache(
+            config.JIKAN_CACHE_PATH,
+            ttl=config.JIKAN_CACHE_TTL_HOURS * 3600,
+            negative_ttl=config.JIKAN_NEGATIVE_CACHE_TTL_HOURS * 3600
+        )
+        self.poster_store = PosterStore(config.POSTERS_OUTPUT_DIR)
+        self.stats = {'anime_added': 0, 'anime_updated': 0, 'episodes_saved': 0,
+                      'episodes_not_archived': 0, 'errors': 0}
+
+    def _split_by_poster(self, seasons, poster_urls):
+        """
+        Строки эпизодов двумя группами {сезон: [строки]}: с найденным
+        постером и без него. Во второй группе poster_local_path не
+        передается, чтобы не затереть путь, сохраненный раньше.
+        """
+        with_poster, without_poster = {}, {}
+        for season_num, episodes in seasons.items():
+            for data in episodes:
+                row = ScrapingManager._episode_row(data)
+                poster_url = poster_urls.get(data['source_url'])
+                row['poster_local_path'] = self.poster_store.local_path(poster_url) if poster_url else None
+                if row['poster_local_path'] is None:
+                    del row['poster_local_path']
+                    without_poster.setdefault(season_num, []).append(row)
+                else:
+                    with_poster.setdefault(season_num, []).append(row)
+        return with_poster, without_poster
+
+    def save(self, slug, seasons, poster_urls, anime_id):
+        """`anime_id` — id существующего аниме или None для нового."""
+        groups = [group for group in self._split_by_poster(seasons, poster_urls) if group]
+        episodes_count = sum(len(rows) for group in groups for rows in group.values())
+
+        if anime_id is not None and self.mode == 'backfill':
+            for group in groups:
+                db_manager.save_episodes(anime_id, group)
+            self.stats['anime_updated'] += 1
+            self.stats['episodes_saved'] += episodes_count
+            return
+
+        title = next((data['anime_title_rus'] for episodes in seasons.values() for data in episodes
+                      if data.get('anime_title_rus') not in (None, 'N/A')), None)
+        if anime_id is None and title is None:
+            print(f"  [!] '{slug}': в архиве нет эпизода с названием аниме, пропуск.")
+            self.stats['errors'] += 1
+            return
+
+        anime_row = {'slug': slug}
+        if title:
+            anime_row['title_rus'] = title
+        cached, metadata = self.jikan_cache.get(title) if title else (False, None)
+        content_type_name, genre_names = None, []
+        if cached:
+            anime_row.update({field: metadata.get(field) if metadata else None for field in METADATA_FIELDS})
+            content_type_name = (metadata.get('type') if metadata else 'Unknown') or 'Unknown'
+            genre_names = (metadata.get('genres') if metadata else None) or []
+        if anime_id is None:
+            for field in METADATA_FIELDS:
+                anime_row.setdefault(field, None)
+            content_type_name = content_type_name or 'Unknown'
+            anime_row['last_checked_at'] = None
+
+        anime_id_saved = db_manager.save_anime(anime_row, content_type_name, genre_names, groups[0] if groups else {})
+        for group in groups[1:]:
+            db_manager.save_episodes(anime_id_saved, group)
+        self.stats['anime_added' if anime_id is None else 'anime_updated'] += 1
+        self.stats['episodes_saved'] += episodes_count
+
+
+def reparse(mode='backfill', slugs=None, processes=None, archive_dir=None, extractor=DEFAULT_EXTRACTOR):
+    """Переразбирает архив и пишет аниме/эпизоды в БД. Возвращает статистику."""
+    archive_dir = archive_dir or config.PAGE_ARCHIVE_DIR
+    started_at = time.monotonic()
+    archive = _open_archive(archive_dir)
+    anime_locations = {}
+    for url, location in archive.latest_locations('anime').items():
+        slug = urlparse(url).path.strip('/')
+        if slug and (not slugs or slug in slugs):
+            anime_locations[slug] = location
+    episode_locations = archive.latest_locations('episode')
+    archive.close()
+    print(f"[START] Переразбор архива ({mode}): аниме {len(anime_locations)}, страниц эпизодов {len(episode_locations)}")
+
+    db_manager.initialize()
+    existing = set(db_manager.get_all_anime_slugs())
+    anime_ids, skip_urls = {}, {}
+    for slug in anime_locations.keys() & existing:
+        anime_ids[slug], known_urls = db_manager.get_episode_urls_for_anime(slug)
+        if mode == 'backfill':
+            skip_urls[slug] = known_urls
+
+    reparser = Reparser(mode)
+    # Страницы аниме — в порядке их расположения в сегментах
+    ordered = sorted(anime_locations.items(), key=lambda item: item[1])
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(archive_dir, extractor, episode_locations)) as pool:
+        futures = [pool.submit(_parse_anime, slug, location, skip_urls.get(slug, ())) for slug, location in ordered]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                slug, seasons, poster_urls, missing = future.result()
+                reparser.stats['episodes_not_archived'] += missing
+                if seasons:
+                    reparser.save(slug, seasons, poster_urls, anime_ids.get(slug))
+            except Exception as e:
+                print(f"  [!] Ошибка переразбора: {e}")
+                reparser.stats['errors'] += 1
+            if done % 100 == 0:
+                print(f"[*] Обработано аниме: {done}/{len(futures)}")
+
+    stats = {**reparser.stats, 'elapsed_sec': round(time.monotonic() - started_at, 1)}
+    print(f"[SUCCESS] Переразбор завершен: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('backfill', 'rebuild'), default='backfill')
+    parser.add_argument('--slug', action='append', dest='slugs', help='только это аниме (можно повторять)')
+    parser.add_argument('--processes', type=int, default=config.REPARSE_PROCESSES,
+                        help='процессов для разбора HTML (по умолчанию по числу ядер)')
+    parser.add_argument('--archive-dir', default=config.PAGE_ARCHIVE_DIR)
+    # lxml разбирает страницы в 14-17 раз быстрее BeautifulSoup при одинаковом
+    # результате (benchmarks/bench_extractors.py); без lxml/cssselect — bs4
+    parser.add_argument('--extractor', choices=sorted(EXTRACTORS), default=DEFAULT_EXTRACTOR)
+    parser.add_argument('--reindex', action='store_true', help='перестроить индекс архива по сегментам и выйти')
+    args = parser.parse_args()
+
+    if args.reindex:
+        archive = _open_archive(args.archive_dir)
+        print(f"[+] Индекс архива перестроен, записей: {archive.reindex()}")
+        archive.close()
+        return 0
+
+    stats = reparse(args.mode, set(args.slugs) if args.slugs else None, args.processes,
+                    args.archive_dir, args.extractor)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
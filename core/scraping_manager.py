@@ -1,28 +1,84 @@
 # core/scraping_manager.py
 import asyncio
-from playwright.async_api import async_playwright
+import time
+from contextlib import aclosing
+from datetime import timedelta
 
-from database.db_manager import db_manager
-from database.models import Anime, Season, Episode, Genre, ContentType
+from database.async_db import async_db
+from scrapers.browser_pool import BrowserPool
+from scrapers.host_limiter import hosts
 from scrapers.jutsu_scraper import JutsuScraper
 from scrapers.metadata_scraper import MetadataScraper
+from .jobs import JobContext, JobCancelled
+from .leases import LeaseManager, LeaseLost
+from .metrics import count
+import config
+
+# Итоги обработки аниме, после которых его не нужно отдавать другим узлам
+DONE_STATUSES = ('success', 'updated', 'skipped')
 
 class ScrapingManager:
     def __init__(self):
         self.jutsu_scraper = JutsuScraper()
         self.metadata_scraper = MetadataScraper()
+        self.browser_pool = BrowserPool()
+        self.leases = LeaseManager()
+
+    async def start(self):
+        """
+        Открывает долгоживущие HTTP-сессии скраперов, запускает писателя БД,
+        heartbeat аренд и прогревает пул браузера (вызывается при старте приложения).
+        """
+        await self.jutsu_scraper.start()
+        await self.metadata_scraper.start()
+        await async_db.start()
+        await self.leases.start()
+        await self.browser_pool.start()
+
+    async def close(self):
+        """
+        Закрывает браузер, HTTP-сессии скраперов, освобождает аренды и
+        дописывает очередь БД (при остановке приложения).
+        """
+        await self.browser_pool.close()
+        await self.jutsu_scraper.close()
+        await self.metadata_scraper.close()
+        await self.leases.close()
+        await async_db.close()
+
+    def get_connection_stats(self):
+        return {
+            "jutsu": self.jutsu_scraper.connection_stats.as_dict(),
+            "jikan": self.metadata_scraper.connection_stats.as_dict(),
+            "posters": self.jutsu_scraper.poster_store.stats if self.jutsu_scraper.poster_store else None,
+        }
+
+    def get_page_load_stats(self):
+        return self.jutsu_scraper.get_page_load_stats()
+
+    def get_host_stats(self):
+        return hosts.get_stats()
 
-    async def _process_single_anime(self, anime_slug, browser):
+    def get_browser_stats(self):
+        return self.browser_pool.get_stats()
+
+    async def _process_single_anime(self, anime_slug, context, incremental=False, job=None):
         """
-        Внутренний метод для полной обработки одного аниме с использованием
-        существующего экземпляра браузера.
+        Внутренний метод для полной обработки одного аниме в контексте
+        браузера из пула. Если аниме уже есть в БД и включен
+        инкрементальный режим, скачиваются только недостающие эпизоды.
+        Аниме сохраняется сразу после первого эпизода, остальные эпизоды —
+        порциями, поэтому прерванную обработку продолжает инкрементальный режим.
         """
-        if db_manager.anime_exists(anime_slug):
+        job = job or JobContext()
+        if await async_db.anime_exists(anime_slug):
+            if incremental:
+                return await self._update_existing_anime(anime_slug, context, job)
             print(f"[INFO] Аниме '{anime_slug}' уже существует в базе данных. Пропуск.")
             return {"status": "skipped", "reason": "already exists"}
 
         print(f"[START] Начало обработки аниме: {anime_slug}")
-        page = await browser.new_page()
+        page = await context.new_page()
 
         try:
             seasons_with_links = await self.jutsu_scraper.get_all_episode_links_for_anime(anime_slug, page)
@@ -38,109 +94,406 @@ class ScrapingManager:
             
             anime_title_rus = base_episode_data['anime_title_rus']
             metadata = await self.metadata_scraper.get_anime_details(anime_title_rus)
+            job.check_cancelled()
+
+            content_type_name = (metadata.get('type') if metadata else 'Unknown') or 'Unknown'
+            anime_row = {
+                'slug': anime_slug, 'title_rus': anime_title_rus,
+                'title_orig': metadata.get('title_orig') if metadata else None,
+                'description_api': metadata.get('description_api') if metadata else None,
+                'poster_url_api': metadata.get('poster_url_api') if metadata else None,
+                'age_rating': metadata.get('age_rating') if metadata else None,
+                'status': metadata.get('status') if metadata else None,
+                'year': metadata.get('year') if metadata else None,
+                'score': metadata.get('score') if metadata else None,
+                # Время проверки ставится после сохранения всех эпизодов:
+                # недокачанное аниме попадет в начало очереди перепроверки
+                'last_checked_at': None,
+            }
+            genre_names = (metadata.get('genres') if metadata else None) or []
+            anime_id = await async_db.save_anime(
+                anime_row, content_type_name, genre_names,
+                self._group_episode_rows(seasons_with_links, {first_episode_url: base_episode_data})
+            )
+
+            remaining_links = [
+                link for links in seasons_with_links.values() for link in links
+                if link != first_episode_url
+            ]
+            _, skipped = await self._fetch_and_save_episodes(anime_id, remaining_links, seasons_with_links,
+                                                             context, page, anime_slug, job, done=1)
+            if not skipped:
+                await async_db.mark_anime_checked(anime_slug)
 
-            with db_manager.session_scope() as session:
-                content_type_name = (metadata.get('type') if metadata else 'Unknown') or 'Unknown'
-                content_type_obj, _ = db_manager.get_or_create(session, ContentType, name=content_type_name)
-                
-                anime_obj = Anime(
-                    slug=anime_slug, title_rus=anime_title_rus,
-                    title_orig=metadata.get('title_orig') if metadata else None,
-                    description_api=metadata.get('description_api') if metadata else None,
-                    poster_url_api=metadata.get('poster_url_api') if metadata else None,
-                    age_rating=metadata.get('age_rating') if metadata else None,
-                    status=metadata.get('status') if metadata else None,
-                    year=metadata.get('year') if metadata else None,
-                    score=metadata.get('score') if metadata else None,
-                    content_type_id=content_type_obj.id
-                )
-                session.add(anime_obj)
-
-                if metadata and metadata.get('genres'):
-                    for genre_name in metadata['genres']:
-                        genre_obj, _ = db_manager.get_or_create(session, Genre, name=genre_name)
-                        anime_obj.genres.append(genre_obj)
-                
-                session.flush()
-                anime_id = anime_obj.id
-
-                for season_num, episode_links in seasons_with_links.items():
-                    season_obj, _ = db_manager.get_or_create(session, Season, anime_id=anime_id, season_number=season_num)
-                    session.flush()
-                    season_id = season_obj.id
-
-                    for link in episode_links:
-                        episode_data = base_episode_data if link == first_episode_url else await self.jutsu_scraper.parse_episode_page(link, page, anime_slug)
-                        if episode_data:
-                            ep = Episode(
-                                anime_id=anime_id, season_id=season_id,
-                                episode_number=episode_data.get('episode_number'),
-                                title=episode_data.get('episode_title'),
-                                source_url=episode_data.get('source_url'),
-                                poster_local_path=episode_data.get('poster_local_path'),
-                                duration_sec=episode_data.get('duration_sec'),
-                                opening_start_sec=episode_data.get('opening_start_sec'),
-                                opening_end_sec=episode_data.get('opening_end_sec'),
-                                ending_start_sec=episode_data.get('ending_start_sec'),
-                                ending_end_sec=episode_data.get('ending_end_sec'),
-                                next_episode_url=episode_data.get('next_episode_url')
-                            )
-                            session.add(ep)
-                        await asyncio.sleep(0.3)
-            
             print(f"[SUCCESS] Аниме '{anime_slug}' успешно добавлено в базу данных.")
             return {"status": "success", "slug": anime_slug}
         
         finally:
             await page.close()
 
-    async def add_specific_anime(self, anime_slug):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            result = await self._process_single_anime(anime_slug, browser)
-            await browser.close()
-        return result
+    async def _update_existing_anime(self, anime_slug, context, job):
+        """
+        Инкрементальное обновление уже добавленного аниме: перечитывает
+        список сезонов и эпизодов, сравнивает его с Episode.source_url в БД
+        и скачивает только отсутствующие эпизоды.
+        """
+        anime_id, known_urls = await async_db.get_episode_urls_for_anime(anime_slug)
+        print(f"[START] Проверка новых эпизодов: {anime_slug} (в базе: {len(known_urls)})")
+        page = await context.new_page()
 
-    async def add_bulk_anime(self, limit: int):
-        print(f"[START] Запуск массового добавления. Лимит: {limit}")
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            all_slugs_on_site = await self.jutsu_scraper.get_all_anime_slugs(page)
+        try:
+            seasons_with_links = await self.jutsu_scraper.get_all_episode_links_for_anime(anime_slug, page)
+            if not seasons_with_links:
+                return {"status": "error", "reason": "failed to get episode links"}
+
+            missing_links = [
+                link for links in seasons_with_links.values() for link in links
+                if link not in known_urls
+            ]
+            total_links = sum(len(links) for links in seasons_with_links.values())
+            added, skipped = await self._fetch_and_save_episodes(anime_id, missing_links, seasons_with_links, context,
+                                                                 page, anime_slug, job,
+                                                                 done=total_links - len(missing_links))
+
+            if not skipped:
+                await async_db.mark_anime_checked(anime_slug)
+            print(f"[SUCCESS] Аниме '{anime_slug}': добавлено новых эпизодов: {added}")
+            return {"status": "updated", "slug": anime_slug, "new_episodes": added}
+
+        finally:
             await page.close()
 
-            slugs_in_db = db_manager.get_all_anime_slugs()
-            new_slugs = [slug for slug in all_slugs_on_site if slug not in slugs_in_db]
-            
-            if not new_slugs:
-                print("[INFO] Новых аниме для добавления не найдено.")
-                await browser.close()
-                return {"status": "finished", "added_count": 0, "reason": "no new anime found"}
+    @staticmethod
+    def _episode_row(episode_data):
+        return {
+            'episode_number': episode_data.get('episode_number'),
+            'title': episode_data.get('episode_title'),
+            'source_url': episode_data.get('source_url'),
+            'poster_local_path': episode_data.get('poster_local_path'),
+            'duration_sec': episode_data.get('duration_sec'),
+            'opening_start_sec': episode_data.get('opening_start_sec'),
+            'opening_end_sec': episode_data.get('opening_end_sec'),
+            'ending_start_sec': episode_data.get('ending_start_sec'),
+            'ending_end_sec': episode_data.get('ending_end_sec'),
+            'next_episode_url': episode_data.get('next_episode_url'),
+        }
 
-            slugs_to_add = new_slugs[:limit]
-            print(f"[*] Найдено {len(new_slugs)} новых аниме. Будет обработано: {len(slugs_to_add)}")
-            
-            added_count = 0
-            for slug in slugs_to_add:
-                result = await self._process_single_anime(slug, browser)
-                if result.get('status') == 'success':
-                    added_count += 1
-            
-            await browser.close()
-        
-        return {"status": "finished", "added_count": added_count}
+    def _group_episode_rows(self, seasons_with_links, episodes_by_url):
+        """
+        Раскладывает успешно распарсенные эпизоды по сезонам в порядке
+        ссылок на странице: {номер сезона: [строки эпизодов]}.
+        """
+        seasons = {}
+        for season_num, episode_links in seasons_with_links.items():
+            rows = [self._episode_row(episodes_by_url[link]) for link in episode_links if episodes_by_url.get(link)]
+            if rows:
+                seasons[season_num] = rows
+        return seasons
+
+    async def _fetch_and_save_episodes(self, anime_id, episode_links, seasons_with_links,
+                                       context, page, anime_slug, job, done=0):
+        """
+        Скачивает эпизоды порциями по EPISODE_CHECKPOINT_SIZE и сохраняет
+        каждую порцию сразу (чекпоинт). Между порциями проверяется отмена
+        задачи и аренда аниме. Эпизоды порции берутся в аренду: те, что
+        сейчас скачивает другой узел, пропускаются (их догрузит следующая
+        проверка). Возвращает (сохранено, пропущено).
+        """
+        total = done + len(episode_links)
+        await job.item_progress(anime_slug, done, total)
+        saved = skipped = 0
+        for start in range(0, len(episode_links), config.EPISODE_CHECKPOINT_SIZE):
+            job.check_cancelled()
+            self.leases.check('anime', anime_slug)
+            chunk = episode_links[start:start + config.EPISODE_CHECKPOINT_SIZE]
+            owned = await self.leases.acquire('episode', chunk)
+            skipped += len(chunk) - len(owned)
+            try:
+                episodes_by_url = await self._fetch_episodes(owned, context, page, anime_slug)
+                saved += await async_db.save_episodes(
+                    anime_id, self._group_episode_rows(seasons_with_links, episodes_by_url)
+                )
+            finally:
+                await self.leases.release('episode', owned)
+            await job.item_progress(anime_slug, done + start + len(chunk), total)
+        return saved, skipped
+
+    async def _fetch_episodes(self, episode_links, context, first_page, anime_slug):
+        """
+        Параллельно парсит страницы эпизодов через небольшой пул
+        переиспользуемых страниц. Возвращает словарь {url: данные эпизода},
+        порядок записи в БД задается вызывающим кодом.
+        Дополнительные страницы берутся, только если не исчерпан общий
+        лимит страниц браузера, иначе работа идет на меньшем числе страниц.
+        """
+        if not episode_links:
+            return {}
 
-    async def run_continuous_scraping(self):
+        pool_size = max(1, min(config.EPISODE_PAGE_POOL_SIZE, len(episode_links)))
+        pages = [first_page]
+        while len(pages) < pool_size:
+            extra_page = await context.new_page(wait=False)
+            if extra_page is None:
+                break
+            pages.append(extra_page)
+        page_pool = asyncio.Queue()
+        for pool_page in pages:
+            page_pool.put_nowait(pool_page)
+
+        async def fetch(link):
+            pool_page = await page_pool.get()
+            try:
+                episode_data = await self.jutsu_scraper.parse_episode_page(link, pool_page, anime_slug)
+            except Exception as e:
+                print(f"    [!] Ошибка при парсинге эпизода {link}: {e}")
+                episode_data = None
+            finally:
+                page_pool.put_nowait(pool_page)
+            count('jutsu', 'episode', 'ok' if episode_data else 'error')
+            return episode_data
+
+        try:
+            results = await asyncio.gather(*(fetch(link) for link in episode_links))
+        finally:
+            # Первая страница принадлежит вызывающему коду и закрывается им.
+            for pool_page in pages[1:]:
+                await pool_page.close()
+
+        return dict(zip(episode_links, results))
+
+    async def add_specific_anime(self, anime_slug, job=None):
+        job = job or JobContext()
+        await job.add_items([anime_slug])
+        if not await self.leases.acquire_one('anime', anime_slug):
+            print(f"[INFO] Аниме '{anime_slug}' сейчас обрабатывает другой узел. Пропуск.")
+            await job.item_finished(anime_slug, 'skipped')
+            return {"status": "skipped", "reason": "leased by another node"}
+        await job.item_started(anime_slug)
+        result = {}
+        try:
+            async with self.browser_pool.context() as context:
+                # Возобновленная задача догружает эпизоды частично сохраненного аниме
+                result = await self._process_single_anime(anime_slug, context, incremental=job.resumed, job=job)
+        finally:
+            await self.leases.release('anime', [anime_slug], done=result.get('status') in DONE_STATUSES)
+        await job.item_finished(anime_slug, result.get('status'))
+        return result
+
+    async def _anime_worker(self, worker_id, queue, stats, incremental, job, in_flight):
+        """
+        Воркер пула: берет slug'и из очереди и обрабатывает каждый
+        в контексте браузера из пула (отдельные cookies и кэш). Контекст
+        возвращается в пул после каждого аниме, чтобы пул мог его пересоздать.
+        Slug'и в очереди уже взяты в аренду; после обработки аренда
+        освобождается. None в очереди — сигнал завершения; отмена задачи
+        прерывает воркер.
+        """
+        while True:
+            slug = await queue.get()
+            if slug is None:
+                break
+            if stats['time_to_first_anime_sec'] is None:
+                stats['time_to_first_anime_sec'] = round(time.monotonic() - stats['started_at'], 1)
+            job.check_cancelled()
+            status = None
+            try:
+                await job.item_started(slug)
+                async with self.browser_pool.context() as context:
+                    result = await self._process_single_anime(slug, context, incremental=incremental, job=job)
+                status = result.get('status')
+                await job.item_finished(slug, status)
+                count('jutsu', 'anime', status)
+                if status == 'success':
+                    stats['added_count'] += 1
+                elif status == 'updated':
+                    stats['updated_count'] += 1
+                    stats['new_episodes'] += result.get('new_episodes', 0)
+                elif status == 'error':
+                    stats['error_count'] += 1
+            except JobCancelled:
+                raise
+            except LeaseLost as e:
+                print(f"[!] Воркер #{worker_id}: аренда '{slug}' перехвачена другим узлом ({e}).")
+                count('jutsu', 'anime', 'lease_lost')
+                await job.item_finished(slug, 'skipped')
+            except Exception as e:
+                print(f"[ERROR] Воркер #{worker_id}: ошибка при обработке '{slug}': {e}")
+                stats['error_count'] += 1
+                count('jutsu', 'anime', 'error')
+                await job.item_finished(slug, 'error')
+            finally:
+                in_flight.discard(slug)
+                await self.leases.release('anime', [slug], done=status in DONE_STATUSES)
+
+    async def _run_worker_pool(self, slug_source, concurrency, incremental=False, job=None):
+        """
+        Обрабатывает slug'и пулом из `concurrency` параллельных воркеров.
+        `slug_source` — асинхронный итератор slug'ов, уже взятых в аренду:
+        воркеры начинают работу, как только появляется первый slug, не
+        дожидаясь конца источника. Аренды slug'ов, не дошедших до воркеров
+        (остановка, отмена), освобождаются.
+        """
+        job = job or JobContext()
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        in_flight = set()  # отданы источником, но еще не обработаны воркером
+        stats = {"added_count": 0, "updated_count": 0, "new_episodes": 0, "error_count": 0,
+                 "queued_count": 0, "time_to_first_anime_sec": None, "started_at": time.monotonic()}
+
+        async def feed():
+            stopped = False
+            try:
+                async with aclosing(slug_source):
+                    async for slug in slug_source:
+                        in_flight.add(slug)
+                        await queue.put(slug)
+                        stats['queued_count'] += 1
+            except asyncio.CancelledError:
+                # Воркеры уже остановлены, сигналы завершения не нужны
+                stopped = True
+                raise
+            finally:
+                if not stopped:
+                    for _ in range(concurrency):
+                        await queue.put(None)
+
+        workers = [
+            asyncio.create_task(self._anime_worker(i, queue, stats, incremental, job, in_flight))
+            for i in range(concurrency)
+        ]
+        feeder = asyncio.create_task(feed())
+        try:
+            await asyncio.gather(feeder, *workers)
+        finally:
+            for task in [feeder, *workers]:
+                task.cancel()
+            # Дожидаемся возврата контекстов воркеров в пул
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
+            await self.leases.release('anime', list(in_flight))
+
+        elapsed = time.monotonic() - stats.pop('started_at')
+        processed = stats['added_count'] + stats['updated_count']
+        rate = processed / elapsed * 3600 if elapsed > 0 else 0.0
+        print(f"[*] Обработка завершена за {elapsed:.0f} сек. Скорость: {rate:.1f} аниме/час")
+        return {**stats, "anime_per_hour": round(rate, 1)}
+
+    async def _iter_new_slugs(self, page, new_page, limit, job):
+        """
+        Отдает slug'и, которых еще нет в БД, по мере обхода каталога.
+        Проверка — по множеству slug'ов из БД, загруженному один раз.
+        Возобновленная задача сначала отдает свои незавершенные slug'и,
+        а обход продолжает со страницы после чекпоинта. `limit` считает
+        все slug'и задачи; None — без ограничения.
+        Slug'и страницы берутся в аренду разом: занятые другими узлами
+        пропускаются, так что узлы с общей БД делят каталог между собой.
+        """
+        slugs_in_db = set(await async_db.get_all_anime_slugs())
+        job_slugs, unfinished = await job.get_items()
+        leased = []  # взяты в аренду, но еще не отданы
+        try:
+            # Пока задача стояла, ее незавершенные slug'и могли забрать другие узлы
+            leased = await self.leases.acquire('anime', unfinished)
+            for slug in set(unfinished) - set(leased):
+                await job.item_finished(slug, 'skipped')
+            while leased:
+                yield leased.pop(0)
+            queued = len(job_slugs)
+            if limit is not None and queued >= limit:
+                return
+
+            catalog = self.jutsu_scraper.iter_anime_slugs(page, start_page=job.catalog_page + 1, new_page=new_page)
+            async with aclosing(catalog):
+                async for page_num, page_slugs in catalog:
+                    job.check_cancelled()
+                    new_slugs = [slug for slug in page_slugs if slug not in slugs_in_db and slug not in job_slugs]
+                    leased = await self.leases.acquire('anime', new_slugs)
+                    if limit is not None and len(leased) > limit - queued:
+                        await self.leases.release('anime', leased[limit - queued:])
+                        leased = leased[:limit - queued]
+                    # Чекпоинт: slug'и страницы записываются в задачу до передачи воркерам
+                    await job.add_items(leased)
+                    await job.catalog_page_done(page_num)
+                    job_slugs.update(leased)
+                    queued += len(leased)
+                    while leased:
+                        yield leased.pop(0)
+                    if limit is not None and queued >= limit:
+                        return
+        finally:
+            await self.leases.release('anime', leased)
+
+    async def _iter_leased(self, slugs, batch_size, job):
+        """Отдает slug'и, беря их в аренду порциями; занятые другими узлами пропускаются."""
+        leased = []
+        try:
+            for start in range(0, len(slugs), batch_size):
+                leased = await self.leases.acquire('anime', slugs[start:start + batch_size])
+                await job.add_items(leased)
+                while leased:
+                    yield leased.pop(0)
+        finally:
+            await self.leases.release('anime', leased)
+
+    async def add_bulk_anime(self, limit: int = None, concurrency: int = None, job=None):
+        job = job or JobContext()
+        concurrency = concurrency or config.SCRAPING_CONCURRENCY
+        print(f"[START] Запуск массового добавления. Лимит: {limit or 'нет'}, воркеров: {concurrency}")
+        # Отдельный контекст: обход каталога открывает в нем несколько вкладок
+        async with self.browser_pool.context() as catalog_context:
+            page = await catalog_context.new_page()
+            stats = await self._run_worker_pool(
+                self._iter_new_slugs(page, catalog_context.new_page, limit, job), concurrency,
+                incremental=job.resumed, job=job
+            )
+
+        if not stats['queued_count']:
+            print("[INFO] Новых аниме для добавления не найдено.")
+            return {"status": "finished", "added_count": 0, "reason": "no new anime found"}
+        return {"status": "finished", **stats}
+
+    async def update_existing_anime(self, limit: int = None, concurrency: int = None, job=None):
+        """
+        Инкрементально проверяет уже добавленные аниме на новые эпизоды.
+        Онгоинги проверяются чаще (RECHECK_INTERVAL_AIRING_HOURS),
+        завершенные — реже (RECHECK_INTERVAL_FINISHED_HOURS).
+        """
+        job = job or JobContext()
+        concurrency = concurrency or config.SCRAPING_CONCURRENCY
+        due_slugs = await async_db.get_anime_due_for_check(
+            airing_interval=timedelta(hours=config.RECHECK_INTERVAL_AIRING_HOURS),
+            finished_interval=timedelta(hours=config.RECHECK_INTERVAL_FINISHED_HOURS),
+            limit=limit
+        )
+        if not due_slugs:
+            print("[INFO] Нет аниме, которым пора проверять новые эпизоды.")
+            return {"status": "finished", "updated_count": 0, "reason": "nothing to re-check"}
+
+        print(f"[START] Инкрементальная проверка {len(due_slugs)} аниме. Воркеров: {concurrency}")
+        stats = await self._run_worker_pool(
+            self._iter_leased(due_slugs, concurrency * 2, job), min(concurrency, len(due_slugs)),
+            incremental=True, job=job
+        )
+
+        return {"status": "finished", **stats}
+
+    async def run_continuous_scraping(self, job=None):
+        """
+        Бесконечный цикл: новые аниме, затем перепроверка добавленных.
+        Останавливается отменой задачи, в том числе во время паузы.
+        """
+        job = job or JobContext()
         print("[START] Запуск непрерывного скрапинга...")
         while True:
             print("\n" + "="*50)
             print(f"[{asyncio.get_event_loop().time()}] Новая итерация непрерывного скрапинга.")
             
-            await self.add_bulk_anime(limit=10000)
+            await self.add_bulk_anime(limit=10000, job=job)
+            await self.update_existing_anime(job=job)
+            # Следующая итерация обходит каталог с первой страницы и снова
+            # берет аниме, которые в этой завершились ошибкой или были пропущены
+            await job.start_over()
             
             sleep_duration = 3600
             print(f"[*] Итерация завершена. Следующая проверка через {sleep_duration / 60:.0f} минут.")
             print("="*50 + "\n")
-            await asyncio.sleep(sleep_duration)
+            await job.sleep(sleep_duration)
 
@@ -0,0 +1,112 @@
+# database/async_db.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import config
+from core.metrics import stage
+from .db_manager import db_manager
+
+
+class AsyncDatabase:
+    """
+    Асинхронная обертка над синхронным DatabaseManager, чтобы работа с БД
+    не блокировала event loop, обслуживающий FastAPI.
+
+    Чтения выполняются в небольшом пуле потоков. Записи попадают в
+    ограниченную очередь и выполняются по одной выделенной задачей-писателем
+    в отдельном потоке: каждая запись — короткая транзакция, а очередь
+    дает обратное давление скраперам, если БД не успевает.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        self._read_executor = ThreadPoolExecutor(max_workers=config.DB_READ_THREADS, thread_name_prefix="db-read")
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._queue = None
+        self._writer_task = None
+
+    async def start(self):
+        """
+        Запускает писателя и в фоне инициализирует БД (подключение,
+        create_all), не задерживая старт приложения. Запросы, пришедшие
+        раньше, дождутся инициализации в своих потоках.
+        """
+        if self._writer_task is None or self._writer_task.done():
+            self._queue = asyncio.Queue(maxsize=config.DB_WRITE_QUEUE_SIZE)
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            init = asyncio.get_running_loop().run_in_executor(self._write_executor, self.manager.initialize)
+            init.add_done_callback(self._log_init_error)
+
+    @staticmethod
+    def _log_init_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[ERROR] Не удалось инициализировать БД: {future.exception()}")
+
+    async def close(self):
+        """Дожидается записи всех поставленных в очередь пачек и останавливает писателя."""
+        if self._writer_task is None:
+            return
+        await self._queue.join()
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_task = None
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            func, future = await self._queue.get()
+            try:
+                with stage('db', 'db_commit'):
+                    result = await loop.run_in_executor(self._write_executor, func)
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as e:
+                print(f"[!] Ошибка записи в БД: {e}")
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def read(self, func, *args, **kwargs):
+        """Выполняет читающий метод DatabaseManager в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        with stage('db', 'db_read'):
+            return await loop.run_in_executor(self._read_executor, partial(func, *args, **kwargs))
+
+    async def write(self, func, *args, **kwargs):
+        """
+        Ставит запись в очередь писателя и ждет ее фиксации.
+        Возвращает результат func (например, id аниме).
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((partial(func, *args, **kwargs), future))
+        return await future
+
+    # Обертки для методов, используемых скраперами
+
+    async def anime_exists(self, slug):
+        return await self.read(self.manager.anime_exists, slug)
+
+    async def get_all_anime_slugs(self):
+        return await self.read(self.manager.get_all_anime_slugs)
+
+    async def get_episode_urls_for_anime(self, slug):
+        return await self.read(self.manager.get_episode_urls_for_anime, slug)
+
+    async def get_anime_due_for_check(self, airing_interval, finished_interval, limit=None):
+        return await self.read(self.manager.get_anime_due_for_check, airing_interval, finished_interval, limit)
+
+    async def save_anime(self, anime_row, content_type_name, genre_names, seasons):
+        return await self.write(self.manager.save_anime, anime_row, content_type_name, genre_names, seasons)
+
+    async def save_episodes(self, anime_id, seasons):
+        return await self.write(self.manager.save_episodes, anime_id, seasons)
+
+    async def mark_anime_checked(self, slug):
+        return await self.write(self.manager.mark_anime_checked, slug)
+
+# Синглтон экземпляр
+async_db = AsyncDatabase(db_manager)
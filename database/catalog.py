@@ -0,0 +1,299 @@
+# database/catalog.py
+"""
+Запросы на чтение каталога для API: keyset-пагинация, фильтры и
+выборка только запрошенных полей. Связанные данные (жанры, тип)
+подгружаются заранее (selectinload/joinedload), без N+1 запросов.
+"""
+import re
+from decimal import Decimal
+from datetime import datetime
+from sqlalchemy import select, tuple_, func, text
+from sqlalchemy.orm import selectinload, joinedload
+from .db_manager import db_manager
+from .models import Anime, Season, Episode, Genre, ContentType, anime_genres_table
+
+ANIME_COLUMNS = ('id', 'slug', 'title_rus', 'title_orig', 'description_api', 'poster_url_api',
+                 'age_rating', 'status', 'year', 'score', 'created_at', 'updated_at')
+# Агрегаты по эпизодам берутся из anime_stats, а не считаются запросом
+ANIME_STATS_FIELDS = ('episodes_count', 'total_duration_sec', 'max_episode_number', 'last_episode_added_at')
+ANIME_RELATIONS = ('genres', 'type') + ANIME_STATS_FIELDS
+ANIME_DEFAULT_FIELDS = ('id', 'slug', 'title_rus', 'title_orig', 'year', 'status', 'score', 'type', 'genres',
+                        'episodes_count')
+
+EPISODE_COLUMNS = ('id', 'episode_number', 'title', 'source_url', 'poster_local_path', 'duration_sec',
+                   'opening_start_sec', 'opening_end_sec', 'ending_start_sec', 'ending_end_sec',
+                   'next_episode_url', 'created_at')
+EPISODE_RELATIONS = ('season_number',)
+EPISODE_DEFAULT_FIELDS = ('id', 'season_number', 'episode_number', 'title', 'duration_sec', 'source_url')
+# Поля для плеера: отметки пропуска опенинга/эндинга и переход к следующей серии
+PLAYBACK_FIELDS = ('source_url', 'duration_sec', 'opening_start_sec', 'opening_end_sec',
+                   'ending_start_sec', 'ending_end_sec', 'next_episode_url')
+
+
+class InvalidQuery(ValueError):
+    """Некорректные параметры запроса (неизвестное поле, плохой курсор)."""
+
+
+def parse_fields(fields, allowed, default):
+    """Разбирает `fields=a,b,c` и проверяет, что все поля известны."""
+    if not fields:
+        return list(default)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise InvalidQuery(f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(allowed)}")
+    return requested
+
+
+def _value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _anime_to_dict(anime, fields):
+    item = {}
+    for field in fields:
+        if field == 'genres':
+            item['genres'] = [genre.name for genre in anime.genres]
+        elif field == 'type':
+            item['type'] = anime.content_type.name if anime.content_type else None
+        elif field in ANIME_STATS_FIELDS:
+            if anime.stats is not None:
+                item[field] = _value(getattr(anime.stats, field))
+            else:
+                item[field] = None if field == 'last_episode_added_at' else 0
+        else:
+            item[field] = _value(getattr(anime, field))
+    return item
+
+
+def _anime_query(fields):
+    query = select(Anime)
+    if 'genres' in fields:
+        query = query.options(selectinload(Anime.genres))
+    if 'type' in fields:
+        query = query.options(joinedload(Anime.content_type))
+    if any(field in ANIME_STATS_FIELDS for field in fields):
+        query = query.options(joinedload(Anime.stats))
+    return query
+
+
+def list_anime(fields, limit, after=None, year=None, genre=None, status=None, content_type=None):
+    """
+    Страница списка аниме по возрастанию id. Курсор `after` — id последнего
+    элемента предыдущей страницы. Возвращает (элементы, следующий курсор).
+    """
+    query = _anime_query(fields).order_by(Anime.id).limit(limit + 1)
+    if after is not None:
+        query = query.where(Anime.id > after)
+    if year is not None:
+        query = query.where(Anime.year == year)
+    if status is not None:
+        query = query.where(Anime.status == status)
+    if genre is not None:
+        query = query.where(Anime.genres.any(Genre.name == genre))
+    if content_type is not None:
+        query = query.where(Anime.content_type.has(ContentType.name == content_type))
+
+    with db_manager.session_scope() as session:
+        rows = session.execute(query).unique().scalars().all()
+        items = [_anime_to_dict(anime, fields) for anime in rows[:limit]]
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return items, next_cursor
+
+
+def get_anime(slug, fields):
+    with db_manager.session_scope() as session:
+        anime = session.execute(_anime_query(fields).where(Anime.slug == slug)).unique().scalar_one_or_none()
+        return _anime_to_dict(anime, fields) if anime else None
+
+
+def list_seasons(slug):
+    """Сезоны аниме с количеством эпизодов. None, если аниме не найдено."""
+    with db_manager.session_scope() as session:
+        anime_id = session.execute(select(Anime.id).where(Anime.slug == slug)).scalar_one_or_none()
+        if anime_id is None:
+            return None
+        rows = session.execute(
+            select(Season.id, Season.season_number, Season.title, func.count(Episode.id))
+            .outerjoin(Episode, Episode.season_id == Season.id)
+            .where(Season.anime_id == anime_id)
+            .group_by(Season.id, Season.season_number, Season.title)
+            .order_by(Season.season_number)
+        ).all()
+    return [
+        {'id': id_, 'season_number': number, 'title': title, 'episodes_count': count}
+        for id_, number, title, count in rows
+    ]
+
+
+def encode_episode_cursor(season_number, episode_number, episode_id):
+    return f"{season_number}.{episode_number}.{episode_id}"
+
+
+def decode_episode_cursor(cursor):
+    try:
+        season_number, episode_number, episode_id = (int(part) for part in cursor.split('.'))
+    except ValueError:
+        raise InvalidQuery(f"Некорректный курсор: '{cursor}'")
+    return season_number, episode_number, episode_id
+
+
+def list_episodes(slug, fields, limit, after=None, season=None):
+    """
+    Страница эпизодов аниме в порядке (сезон, номер эпизода). Курсор —
+    строка "сезон.эпизод.id" последнего элемента. Возвращает
+    (элементы, следующий курсор) или None, если аниме не найдено.
+    """
+    columns = [getattr(Episode, field) for field in fields if field in EPISODE_COLUMNS]
+    sort_key = (Season.season_number, Episode.episode_number, Episode.id)
+    query = (
+        select(*sort_key, *columns)
+        .join(Season, Episode.season_id == Season.id)
+        .order_by(*sort_key)
+        .limit(limit + 1)
+    )
+    if season is not None:
+        query = query.where(Season.season_number == season)
+    if after:
+        query = query.where(tuple_(*sort_key) > tuple_(*decode_episode_cursor(after)))
+
+    with db_manager.session_scope() as session:
+        anime_id = session.execute(select(Anime.id).where(Anime.slug == slug)).scalar_one_or_none()
+        if anime_id is None:
+            return None
+        rows = session.execute(query.where(Episode.anime_id == anime_id)).all()
+
+    items = []
+    for row in rows[:limit]:
+        values = row._mapping
+        item = {}
+        for field in fields:
+            if field == 'season_number':
+                item[field] = values[Season.season_number]
+            else:
+                item[field] = _value(values[getattr(Episode, field)])
+        items.append(item)
+    next_cursor = encode_episode_cursor(*rows[limit - 1][:3]) if len(rows) > limit else None
+    return items, next_cursor
+
+
+def _playback_query():
+    return (
+        select(Anime.id, Anime.slug, Season.season_number, Episode.episode_number, Episode.id,
+               *(getattr(Episode, field) for field in PLAYBACK_FIELDS))
+        .join(Season, Episode.season_id == Season.id)
+        .join(Anime, Episode.anime_id == Anime.id)
+    )
+
+
+def _playback_item(row):
+    _, slug, season_number, episode_number, _, *values = row
+    return {'anime': slug, 'season': season_number, 'episode': episode_number,
+            **dict(zip(PLAYBACK_FIELDS, values))}
+
+
+def _find_episode(session, slug, episode_number, season):
+    """Строка эпизода по slug и номеру; без сезона — из первого сезона, где есть такой номер."""
+    query = _playback_query().where(Anime.slug == slug, Episode.episode_number == episode_number)
+    if season is not None:
+        query = query.where(Season.season_number == season)
+    return session.execute(query.order_by(Season.season_number, Episode.id).limit(1)).first()
+
+
+def get_playback(slug, episode_number, season=None):
+    """Метаданные воспроизведения эпизода: (id аниме, данные) или None."""
+    with db_manager.session_scope() as session:
+        row = _find_episode(session, slug, episode_number, season)
+    return (row[0], _playback_item(row)) if row else None
+
+
+def get_playback_by_url(source_url):
+    """То же по URL эпизода на jut.su."""
+    with db_manager.session_scope() as session:
+        row = session.execute(_playback_query().where(Episode.source_url == source_url)).first()
+    return (row[0], _playback_item(row)) if row else None
+
+
+def list_next_playback(slug, episode_number, count, season=None):
+    """
+    Метаданные `count` эпизодов, следующих за указанным (в порядке сезонов
+    и номеров), — для предзагрузки плеером. (id аниме, список) или None,
+    если эпизод не найден.
+    """
+    sort_key = (Season.season_number, Episode.episode_number, Episode.id)
+    with db_manager.session_scope() as session:
+        current = _find_episode(session, slug, episode_number, season)
+        if current is None:
+            return None
+        anime_id = current[0]
+        rows = session.execute(
+            _playback_query()
+            .where(Episode.anime_id == anime_id, tuple_(*sort_key) > tuple_(*current[2:5]))
+            .order_by(*sort_key)
+            .limit(count)
+        ).all()
+    return anime_id, [_playback_item(row) for row in rows]
+
+
+def list_genres():
+    """Все жанры с количеством аниме в каждом."""
+    with db_manager.session_scope() as session:
+        rows = session.execute(
+            select(Genre.id, Genre.name, func.count(anime_genres_table.c.anime_id))
+            .outerjoin(anime_genres_table, anime_genres_table.c.genre_id == Genre.id)
+            .group_by(Genre.id, Genre.name)
+            .order_by(Genre.name)
+        ).all()
+    return [{'id': id_, 'name': name, 'anime_count': count} for id_, name, count in rows]
+
+
+def _search_terms(query_text):
+    """Слова запроса (буквы/цифры любого алфавита, включая кириллицу)."""
+    return re.findall(r'\w+', query_text.casefold().replace('ё', 'е'))
+
+
+def search_anime(query_text, limit):
+    """
+    Ранжированный полнотекстовый поиск по названиям и описанию аниме.
+    Каждое слово запроса ищется как префикс, все слова обязательны.
+    Механизм зависит от БД: FTS5 (SQLite), FULLTEXT (MySQL) или LIKE.
+    """
+    terms = _search_terms(query_text)
+    if not terms:
+        return []
+    backend = db_manager.search_backend
+    columns = "a.id, a.slug, a.title_rus, a.title_orig, a.year"
+
+    if backend == 'fts5':
+        # Название весит больше описания: bm25 с весами по колонкам, меньше — лучше
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = text(
+            f"SELECT {columns}, -bm25(anime_fts, 10.0, 5.0, 1.0) AS rank "
+            "FROM anime_fts JOIN anime a ON a.id = anime_fts.rowid "
+            "WHERE anime_fts MATCH :match ORDER BY bm25(anime_fts, 10.0, 5.0, 1.0) LIMIT :limit"
+        )
+    elif backend == 'fulltext':
+        match = ' '.join(f'+{term}*' for term in terms)
+        sql = text(
+            f"SELECT {columns}, MATCH(a.title_rus, a.title_orig, a.description_api) "
+            "AGAINST (:match IN BOOLEAN MODE) AS rank FROM anime a "
+            "WHERE MATCH(a.title_rus, a.title_orig, a.description_api) AGAINST (:match IN BOOLEAN MODE) "
+            "ORDER BY rank DESC LIMIT :limit"
+        )
+    else:
+        conditions = ' AND '.join(
+            f"(lower(a.title_rus) LIKE :t{i} OR lower(a.title_orig) LIKE :t{i})" for i in range(len(terms))
+        )
+        sql = text(f"SELECT {columns}, 0 AS rank FROM anime a WHERE {conditions} ORDER BY a.id LIMIT :limit")
+        match = None
+
+    params = {'match': match, 'limit': limit}
+    if match is None:
+        params.update({f't{i}': f'%{term}%' for i, term in enumerate(terms)})
+    with db_manager.engine.connect() as conn:
+        rows = conn.execute(sql, params).mappings().all()
+    return [{**dict(row), 'rank': round(float(row['rank'] or 0), 4)} for row in rows]
@@ -1,39 +1,280 @@
 # database/db_manager.py
-from sqlalchemy import create_engine
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text, or_, and_, select, update, case, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 import config
-from .models import Base, Anime, Season, Episode, Genre, ContentType
+from .models import Base, Anime, AnimeStats, Season, Episode, Genre, ContentType, anime_genres_table
+from .playback_cache import playback_cache
 
-from sqlalchemy.exc import OperationalError, SQLAlchemyError
+# Статусы Jikan, при которых у аниме еще могут появляться новые эпизоды
+AIRING_STATUSES = ('Currently Airing', 'Not yet aired')
+
+# Колонки, добавленные после первой версии схемы: (таблица, колонка, DDL-тип)
+ADDED_COLUMNS = [
+    ('anime', 'last_checked_at', 'TIMESTAMP NULL'),
+    ('scrape_jobs', 'node', 'VARCHAR(128) NULL'),
+]
+
+# Индексы, добавленные после первой версии схемы: (таблица, имя, колонки, уникальный).
+# Для новых БД их создает create_all по моделям, для существующих — _add_missing_indexes.
+ADDED_INDEXES = [
+    ('seasons', 'uq_seasons_anime_season', ('anime_id', 'season_number'), True),
+    ('episodes', 'ix_episodes_anime_episode', ('anime_id', 'episode_number'), False),
+    ('episodes', 'ix_episodes_season_episode', ('season_id', 'episode_number'), False),
+]
+
+# Полнотекстовый индекс по названиям и описанию аниме.
+# SQLite: FTS5-таблица с rowid = anime.id, синхронизируемая триггерами
+# (срабатывают и на пакетные upsert'ы пути записи скрапера). Токенизатор
+# unicode61 приводит кириллицу к нижнему регистру, а "ё" заменяется на "е"
+# при индексации (и в запросе), так как unicode61 их не отождествляет.
+def _fts_values(row):
+    return ', '.join(
+        f"replace(replace(coalesce({row}.{column}, ''), 'ё', 'е'), 'Ё', 'Е')"
+        for column in ('title_rus', 'title_orig', 'description_api')
+    )
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS anime_fts USING fts5(
+        title_rus, title_orig, description_api,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS anime_fts_ai AFTER INSERT ON anime BEGIN
+        INSERT INTO anime_fts(rowid, title_rus, title_orig, description_api)
+        VALUES (new.id, {_fts_values('new')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS anime_fts_ad AFTER DELETE ON anime BEGIN
+        DELETE FROM anime_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS anime_fts_au AFTER UPDATE OF title_rus, title_orig, description_api ON anime BEGIN
+        DELETE FROM anime_fts WHERE rowid = old.id;
+        INSERT INTO anime_fts(rowid, title_rus, title_orig, description_api)
+        VALUES (new.id, {_fts_values('new')});
+    END""",
+]
+SQLITE_FTS_REBUILD = (
+    "INSERT INTO anime_fts(rowid, title_rus, title_orig, description_api) "
+    f"SELECT anime.id, {_fts_values('anime')} FROM anime"
+)
+# MySQL: FULLTEXT-индекс InnoDB поддерживается самим сервером
+MYSQL_FULLTEXT_INDEX = 'ft_anime_search'
+
+from sqlalchemy.exc import SQLAlchemyError
 
 class DatabaseManager:
+    """
+    Доступ к БД. Движок создается лениво — при первом обращении к БД, а не
+    при импорте модуля, поэтому импорт API и старт воркера не ждут
+    подключения к MySQL и create_all. Инициализацию можно запустить заранее
+    в фоне через initialize() (так делает AsyncDatabase.start()).
+    """
     def __init__(self):
-        try:
-            # Пытаемся подключиться к MySQL
-            db_url = f"mysql+mysqlconnector://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}/{config.DB_NAME}"
-            self.engine = create_engine(db_url, echo=False)
-            
-            # Проверка соединения
-            with self.engine.connect() as conn:
-                conn.execute("SELECT 1")
-            
+        self._engine = None
+        self._search_backend = None
+        self._init_lock = threading.Lock()
+        self.Session = sessionmaker()
+        # Кэш id справочников в процессе: {model: {name: id}}
+        self._name_id_cache = {ContentType: {}, Genre: {}}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self.initialize()
+        return self._engine
+
+    @property
+    def search_backend(self):
+        if self._engine is None:
+            self.initialize()
+        return self._search_backend
+
+    def initialize(self):
+        """Подключается к БД, создает таблицы и индексы. Повторный вызов ничего не делает."""
+        with self._init_lock:
+            if self._engine is not None:
+                return
+            started_at = time.monotonic()
+            engine = self._connect()
+            stats_is_new = AnimeStats.__tablename__ not in inspect(engine).get_table_names()
+            # Создаем таблицы
+            Base.metadata.create_all(engine)
+            self._add_missing_columns(engine)
+            self._add_missing_indexes(engine)
+            if stats_is_new:
+                self._rebuild_anime_stats(engine)
+            self._search_backend = self._ensure_search_index(engine)
+            self.Session.configure(bind=engine)
+            self._engine = engine
+            print(f"[+] БД готова ({engine.dialect.name}) за {time.monotonic() - started_at:.2f} сек")
+
+    @staticmethod
+    def _create_engine(db_url):
+        options = {'echo': False}
+        if not db_url.startswith('sqlite'):
+            options.update(
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_MAX_OVERFLOW,
+                pool_recycle=config.DB_POOL_RECYCLE_SEC,
+                pool_pre_ping=config.DB_POOL_PRE_PING,
+            )
+        if db_url.startswith('mysql+mysqlconnector'):
+            options['connect_args'] = {'connection_timeout': config.DB_CONNECT_TIMEOUT_SEC}
+        elif db_url.startswith('mysql+pymysql'):
+            options['connect_args'] = {'connect_timeout': config.DB_CONNECT_TIMEOUT_SEC}
+        return create_engine(db_url, **options)
+
+    @staticmethod
+    def _check_connection(engine):
+        """Проверка соединения с повторами; возвращает последнюю ошибку или None."""
+        error = None
+        for attempt in range(1, config.DB_CONNECT_RETRIES + 1):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                return None
+            except SQLAlchemyError as e:
+                error = e
+                print(f"[!] БД недоступна (попытка {attempt}/{config.DB_CONNECT_RETRIES}): {e.__class__.__name__}")
+                if attempt < config.DB_CONNECT_RETRIES:
+                    time.sleep(config.DB_CONNECT_RETRY_DELAY_SEC * attempt)
+        return error
+
+    def _connect(self):
+        if config.DATABASE_URL:
+            # Явно заданная БД: без запасного варианта, ошибка подключения фатальна
+            engine = self._create_engine(config.DATABASE_URL)
+            error = self._check_connection(engine)
+            if error is not None:
+                engine.dispose()
+                raise error
+            return engine
+
+        # Пытаемся подключиться к MySQL
+        db_url = f"mysql+mysqlconnector://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}/{config.DB_NAME}"
+        engine = self._create_engine(db_url)
+        error = self._check_connection(engine)
+        if error is None:
             print("✅ Подключено к MySQL")
+            return engine
 
-        except (OperationalError, SQLAlchemyError, Exception) as e:
-            # Любая ошибка подключения — переключаемся на SQLite
-            print(f"⚠️ MySQL недоступен ({e}), переключаюсь на SQLite")
-            db_url = "sqlite:///./test.db"
-            self.engine = create_engine(db_url, echo=False)
+        # MySQL недоступен — переключаемся на SQLite
+        engine.dispose()
+        print(f"⚠️ MySQL недоступен ({error}), переключаюсь на SQLite")
+        return self._create_engine("sqlite:///./test.db")
 
-        # Создаем таблицы
-        Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
+    @staticmethod
+    def _add_missing_columns(engine):
+        """Добавляет в существующие таблицы колонки, которых не знает create_all."""
+        inspector = inspect(engine)
+        with engine.begin() as conn:
+            for table, column, ddl in ADDED_COLUMNS:
+                existing = {col['name'] for col in inspector.get_columns(table)}
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
 
+    @staticmethod
+    def _add_missing_indexes(engine):
+        """
+        Создает индексы из ADDED_INDEXES, которых нет в существующих таблицах.
+        CREATE [UNIQUE] INDEX одинаково работает в MySQL и SQLite.
+        """
+        inspector = inspect(engine)
+        for table, name, columns, unique in ADDED_INDEXES:
+            existing = {index['name'] for index in inspector.get_indexes(table)}
+            existing |= {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+            if name in existing:
+                continue
+            ddl = f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"
+            try:
+                with engine.begin() as conn:
+                    if name == 'uq_seasons_anime_season':
+                        DatabaseManager._merge_duplicate_seasons(conn)
+                    conn.execute(text(ddl))
+                print(f"[+] Создан индекс {name} ({table})")
+            except SQLAlchemyError as e:
+                print(f"⚠️ Не удалось создать индекс {name}: {e}")
+
+    @staticmethod
+    def _merge_duplicate_seasons(conn):
+        """
+        Сливает дубли сезонов (одинаковые anime_id и season_number) из
+        старых БД перед созданием уникального индекса: эпизоды переносятся
+        в сезон с наименьшим id, остальные строки удаляются. Без индекса
+        upsert сезонов в SQLite не работает, а в MySQL плодил бы дубли.
+        """
+        duplicates = conn.execute(
+            select(Season.anime_id, Season.season_number, func.min(Season.id))
+            .group_by(Season.anime_id, Season.season_number)
+            .having(func.count() > 1)
+        ).all()
+        for anime_id, season_number, keep_id in duplicates:
+            extra_ids = list(conn.execute(
+                select(Season.id).where(Season.anime_id == anime_id, Season.season_number == season_number,
+                                        Season.id != keep_id)
+            ).scalars())
+            conn.execute(update(Episode.__table__).where(Episode.season_id.in_(extra_ids)).values(season_id=keep_id))
+            conn.execute(Season.__table__.delete().where(Season.id.in_(extra_ids)))
+        if duplicates:
+            print(f"[*] Объединены дубли сезонов: {len(duplicates)}")
+
+    @staticmethod
+    def _rebuild_anime_stats(engine):
+        """Пересчитывает anime_stats целиком по таблице episodes (при появлении таблицы)."""
+        stats = AnimeStats.__table__
+        aggregates = (
+            select(Episode.anime_id, func.count(), func.coalesce(func.sum(Episode.duration_sec), 0),
+                   func.coalesce(func.max(Episode.episode_number), 0), func.max(Episode.created_at))
+            .group_by(Episode.anime_id)
+        )
+        with engine.begin() as conn:
+            conn.execute(stats.delete())
+            conn.execute(stats.insert().from_select(
+                ['anime_id', 'episodes_count', 'total_duration_sec', 'max_episode_number', 'last_episode_added_at'],
+                aggregates
+            ))
+
+    @staticmethod
+    def _ensure_search_index(engine):
+        """
+        Создает полнотекстовый индекс для текущего диалекта и возвращает
+        используемый механизм поиска: 'fts5', 'fulltext' или 'like'
+        (если индекс создать не удалось).
+        """
+        dialect = engine.dialect.name
+        try:
+            if dialect == 'sqlite':
+                inspector = inspect(engine)
+                is_new = 'anime_fts' not in inspector.get_table_names()
+                with engine.begin() as conn:
+                    for ddl in SQLITE_FTS_DDL:
+                        conn.execute(text(ddl))
+                    if is_new:
+                        # Индексируем уже существующие строки
+                        conn.execute(text(SQLITE_FTS_REBUILD))
+                return 'fts5'
+            if dialect == 'mysql':
+                indexes = {index['name'] for index in inspect(engine).get_indexes('anime')}
+                if MYSQL_FULLTEXT_INDEX not in indexes:
+                    with engine.begin() as conn:
+                        conn.execute(text(
+                            f"ALTER TABLE anime ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} "
+                            "(title_rus, title_orig, description_api)"
+                        ))
+                return 'fulltext'
+        except SQLAlchemyError as e:
+            print(f"⚠️ Не удалось создать полнотекстовый индекс ({e}), поиск будет через LIKE")
+        return 'like'
 
     @contextmanager
     def session_scope(self):
         """Provide a transactional scope around a series of operations."""
+        if self._engine is None:
+            self.initialize()
         session = self.Session()
         try:
             yield session
@@ -68,6 +309,195 @@ class DatabaseManager:
         with self.session_scope() as session:
             return session.query(Anime).filter_by(slug=slug).count() > 0
 
+    def get_episode_urls_for_anime(self, slug):
+        """Возвращает (anime_id, множество source_url уже сохраненных эпизодов)."""
+        with self.session_scope() as session:
+            anime_id = session.query(Anime.id).filter_by(slug=slug).scalar()
+            urls = session.query(Episode.source_url).filter_by(anime_id=anime_id).all()
+            return anime_id, {url[0] for url in urls}
+
+    def mark_anime_checked(self, slug):
+        """Запоминает время последней проверки аниме на новые эпизоды."""
+        with self.session_scope() as session:
+            session.query(Anime).filter_by(slug=slug).update(
+                {Anime.last_checked_at: datetime.utcnow()}, synchronize_session=False
+            )
+
+    def get_anime_due_for_check(self, airing_interval, finished_interval, limit=None):
+        """
+        Возвращает slug'и аниме, которым пора проверять новые эпизоды:
+        онгоинги — раз в airing_interval, остальные — раз в finished_interval.
+        Давно не проверенные идут первыми.
+        """
+        now = datetime.utcnow()
+        is_airing = Anime.status.in_(AIRING_STATUSES)
+        is_finished = or_(Anime.status.is_(None), Anime.status.notin_(AIRING_STATUSES))
+        with self.session_scope() as session:
+            query = session.query(Anime.slug).filter(or_(
+                Anime.last_checked_at.is_(None),
+                and_(is_airing, Anime.last_checked_at < now - airing_interval),
+                and_(is_finished, Anime.last_checked_at < now - finished_interval),
+            )).order_by(Anime.last_checked_at)
+            if limit:
+                query = query.limit(limit)
+            return [slug[0] for slug in query.all()]
+
+    def utc_now(self, offset_sec=0):
+        """
+        Текущее время UTC по часам сервера БД (плюс `offset_sec` секунд) как
+        SQL-выражение. Для сроков, которые сравнивают между собой разные узлы:
+        часы самих узлов могут расходиться.
+        """
+        dialect = self.engine.dialect.name
+        if dialect == 'mysql':
+            now = func.utc_timestamp()
+            return func.date_add(now, text(f"INTERVAL {int(offset_sec)} SECOND")) if offset_sec else now
+        if dialect == 'sqlite':
+            return func.datetime('now', f"{int(offset_sec):+d} seconds")
+        raise NotImplementedError(f"Время сервера БД не поддерживается для диалекта '{dialect}'")
+
+    def _upsert(self, session, table, rows, conflict_cols, update_cols=()):
+        """
+        Пакетная вставка с учетом диалекта: INSERT ... ON DUPLICATE KEY UPDATE
+        (или INSERT IGNORE) для MySQL и INSERT ... ON CONFLICT для SQLite.
+        Строки отправляются пачками по BULK_INSERT_CHUNK_SIZE.
+        """
+        dialect = self.engine.dialect.name
+        for start in range(0, len(rows), config.BULK_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + config.BULK_INSERT_CHUNK_SIZE]
+            if dialect == 'mysql':
+                stmt = mysql_insert(table).values(chunk)
+                if update_cols:
+                    stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_cols})
+                else:
+                    stmt = stmt.prefix_with('IGNORE')
+            elif dialect == 'sqlite':
+                stmt = sqlite_insert(table).values(chunk)
+                if update_cols:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=conflict_cols,
+                        set_={col: stmt.excluded[col] for col in update_cols}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=conflict_cols)
+            else:
+                raise NotImplementedError(f"Пакетная вставка не поддерживается для диалекта '{dialect}'")
+            session.execute(stmt)
+
+    def resolve_name_ids(self, model, names):
+        """
+        Возвращает {name: id} для справочника (ContentType или Genre).
+        Известные id берутся из кэша, недостающие создаются одним INSERT
+        и читаются одним SELECT в отдельной короткой транзакции, чтобы
+        в кэш не попали id из откаченной транзакции.
+        """
+        cache = self._name_id_cache[model]
+        missing = sorted({name for name in names if name not in cache})
+        if missing:
+            with self.session_scope() as session:
+                self._upsert(session, model.__table__, [{'name': name} for name in missing], ['name'])
+                rows = session.execute(select(model.id, model.name).where(model.name.in_(missing))).all()
+                cache.update({name: id_ for id_, name in rows})
+        return {name: cache[name] for name in names}
+
+    def _save_seasons_and_episodes(self, session, anime_id, seasons):
+        """
+        Сохраняет сезоны и эпизоды аниме пачками.
+        `seasons` — {номер сезона: [строки эпизодов без anime_id/season_id]}.
+        """
+        existing = dict(session.execute(
+            select(Season.season_number, Season.id).where(Season.anime_id == anime_id)
+        ).all())
+        new_seasons = [{'anime_id': anime_id, 'season_number': num} for num in seasons if num not in existing]
+        if new_seasons:
+            # Сезон мог успеть добавить параллельный писатель (другой узел, переразбор)
+            self._upsert(session, Season.__table__, new_seasons, ['anime_id', 'season_number'])
+            existing = dict(session.execute(
+                select(Season.season_number, Season.id).where(Season.anime_id == anime_id)
+            ).all())
+
+        episode_rows = [
+            {**row, 'anime_id': anime_id, 'season_id': existing[season_num]}
+            for season_num, rows in seasons.items() for row in rows
+        ]
+        if episode_rows:
+            self._update_anime_stats(session, anime_id, episode_rows)
+            update_cols = [col for col in episode_rows[0] if col != 'source_url']
+            self._upsert(session, Episode.__table__, episode_rows, ['source_url'], update_cols)
+        return len(episode_rows)
+
+    def _update_anime_stats(self, session, anime_id, episode_rows):
+        """
+        Инкрементально обновляет anime_stats по эпизодам, которые сейчас
+        будут сохранены (вызывается до их upsert'а): новые эпизоды
+        увеличивают счетчики, у перезаписываемых учитывается только
+        изменение длительности.
+        """
+        rows_by_url = {row['source_url']: row for row in episode_rows}
+        urls = list(rows_by_url)
+        known_durations = {}
+        for start in range(0, len(urls), config.BULK_INSERT_CHUNK_SIZE):
+            known_durations.update(session.execute(
+                select(Episode.source_url, Episode.duration_sec)
+                .where(Episode.source_url.in_(urls[start:start + config.BULK_INSERT_CHUNK_SIZE]))
+            ).all())
+
+        new_count = sum(1 for url in urls if url not in known_durations)
+        duration_delta = sum(
+            (row.get('duration_sec') or 0) - (known_durations.get(url) or 0) for url, row in rows_by_url.items()
+        )
+        max_number = max((row.get('episode_number') or 0) for row in episode_rows)
+
+        self._upsert(session, AnimeStats.__table__,
+                     [{'anime_id': anime_id, 'episodes_count': 0, 'total_duration_sec': 0, 'max_episode_number': 0}],
+                     ['anime_id'])
+        values = {
+            AnimeStats.episodes_count: AnimeStats.episodes_count + new_count,
+            AnimeStats.total_duration_sec: AnimeStats.total_duration_sec + duration_delta,
+            AnimeStats.max_episode_number: case(
+                (AnimeStats.max_episode_number < max_number, max_number), else_=AnimeStats.max_episode_number
+            ),
+        }
+        if new_count:
+            values[AnimeStats.last_episode_added_at] = datetime.utcnow()
+        session.execute(
+            update(AnimeStats).where(AnimeStats.anime_id == anime_id).values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def save_anime(self, anime_row, content_type_name, genre_names, seasons):
+        """
+        Сохраняет аниме целиком (аниме, жанры, сезоны, эпизоды) несколькими
+        пакетными запросами в одной транзакции. Возвращает id аниме.
+        content_type_name=None оставляет тип существующего аниме как есть.
+        """
+        row = dict(anime_row)
+        if content_type_name is not None:
+            row['content_type_id'] = self.resolve_name_ids(ContentType, [content_type_name])[content_type_name]
+        genre_ids = self.resolve_name_ids(Genre, genre_names) if genre_names else {}
+
+        with self.session_scope() as session:
+            update_cols = [col for col in row if col != 'slug']
+            self._upsert(session, Anime.__table__, [row], ['slug'], update_cols)
+            anime_id = session.execute(select(Anime.id).where(Anime.slug == row['slug'])).scalar_one()
+
+            if genre_ids:
+                self._upsert(session, anime_genres_table,
+                             [{'anime_id': anime_id, 'genre_id': gid} for gid in genre_ids.values()],
+                             ['anime_id', 'genre_id'])
+
+            self._save_seasons_and_episodes(session, anime_id, seasons)
+        # После коммита: иначе кэш успеет заново заполниться старыми данными
+        playback_cache.invalidate_anime(anime_id)
+        return anime_id
+
+    def save_episodes(self, anime_id, seasons):
+        """Пакетно добавляет (или обновляет) эпизоды существующего аниме."""
+        with self.session_scope() as session:
+            saved = self._save_seasons_and_episodes(session, anime_id, seasons)
+        playback_cache.invalidate_anime(anime_id)
+        return saved
+
 # Синглтон экземпляр
 db_manager = DatabaseManager()
 
@@ -0,0 +1,80 @@
+# database/export.py
+"""
+Потоковая выгрузка таблиц БД. Строки читаются пачками по первичному
+ключу (keyset: WHERE pk > последний ORDER BY pk LIMIT n), поэтому
+память не растет с размером таблицы, а каждая пачка — отдельный
+короткий запрос. Работает одинаково на MySQL и SQLite.
+"""
+import csv
+import io
+import json
+import zlib
+from decimal import Decimal
+from datetime import date, datetime
+from sqlalchemy import select, tuple_
+from .db_manager import db_manager
+from .models import Base
+
+
+def get_table(table_name):
+    """Таблица из метаданных моделей или None (защищает от произвольного SQL в имени)."""
+    return Base.metadata.tables.get(table_name)
+
+
+def iter_table_rows(table, chunk_size):
+    """Генератор строк таблицы (dict) пачками по chunk_size."""
+    pk_columns = list(table.primary_key.columns)
+    last_key = None
+    while True:
+        query = select(table).order_by(*pk_columns).limit(chunk_size)
+        if last_key is not None:
+            query = query.where(tuple_(*pk_columns) > tuple_(*last_key))
+        with db_manager.engine.connect() as conn:
+            rows = conn.execute(query).mappings().all()
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last_key = [rows[-1][column.name] for column in pk_columns]
+        if len(rows) < chunk_size:
+            return
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_chunks(rows):
+    """По одной JSON-строке на запись."""
+    for row in rows:
+        yield (json.dumps(dict(row), ensure_ascii=False, default=_json_default) + '\n').encode('utf-8')
+
+
+def csv_chunks(rows, columns, rows_per_chunk=500):
+    """CSV с заголовком; строки буферизуются небольшими порциями."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    """Потоковое gzip-сжатие без накопления всего ответа в памяти."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 — формат gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
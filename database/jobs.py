@@ -0,0 +1,235 @@
+# database/jobs.py
+"""
+Постоянная очередь задач скрапинга. Задача (ScrapeJob) хранит статус,
+приоритет, параметры и чекпоинт обхода каталога; элементы задачи
+(ScrapeJobItem) — по одному на slug, с числом сохраненных эпизодов.
+
+Статусы задачи: queued → running → finished | failed | cancelled;
+running → cancelling → cancelled при отмене. Выполняющую задачу держит
+аренда ('job', id) ее узла (database/leases.py); задачи в running без
+живой аренды (узел остановлен или умер) возвращаются в очередь.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import select, update, delete, func, or_
+from .db_manager import db_manager
+from .models import ScrapeJob, ScrapeJobItem, WorkLease
+
+ACTIVE_STATUSES = ('queued', 'running', 'cancelling')
+UNFINISHED_ITEM_STATUSES = ('pending', 'running')
+
+
+def _job_to_dict(job):
+    return {
+        'id': job.id, 'kind': job.kind, 'status': job.status, 'priority': job.priority,
+        'params': json.loads(job.params) if job.params else {},
+        'catalog_page': job.catalog_page,
+        'node': job.node,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def create_job(kind, params, priority, node=None):
+    """`node` привязывает задачу к узлу; None — ее возьмет любой узел."""
+    with db_manager.session_scope() as session:
+        job = ScrapeJob(kind=kind, status='queued', priority=priority, node=node,
+                        params=json.dumps(params, ensure_ascii=False))
+        session.add(job)
+        session.flush()
+        return job.id
+
+
+def claim_next_job(node, owner, ttl_sec):
+    """
+    Переводит в running самую приоритетную задачу из очереди (общую или
+    привязанную к узлу `node`) и в той же транзакции берет ее аренду для
+    `owner`. Возвращает задачу (dict с признаком `resumed`, если она уже
+    запускалась) или None.
+    """
+    with db_manager.session_scope() as session:
+        query = (select(ScrapeJob)
+                 .where(ScrapeJob.status == 'queued', or_(ScrapeJob.node.is_(None), ScrapeJob.node == node))
+                 .order_by(ScrapeJob.priority.desc(), ScrapeJob.id).limit(1))
+        job = session.execute(query).scalar_one_or_none()
+        if job is None:
+            return None
+        # До UPDATE: синхронизация сессии обновит started_at у объекта
+        resumed = job.started_at is not None
+        claimed = session.execute(
+            update(ScrapeJob).where(ScrapeJob.id == job.id, ScrapeJob.status == 'queued')
+            .values(status='running', started_at=func.coalesce(ScrapeJob.started_at, datetime.utcnow()))
+        ).rowcount
+        if not claimed:
+            return None
+        db_manager._upsert(session, WorkLease.__table__, [{
+            'kind': 'job', 'work_key': str(job.id), 'owner': owner, 'status': 'active',
+            'expires_at': db_manager.utc_now(ttl_sec), 'acquired_at': db_manager.utc_now(), 'attempts': 1,
+        }], ['kind', 'work_key'], ['owner', 'status', 'expires_at', 'acquired_at'])
+        session.refresh(job)
+        return {**_job_to_dict(job), 'resumed': resumed}
+
+
+def finish_job(job_id, status, result=None, error=None):
+    with db_manager.session_scope() as session:
+        session.execute(
+            update(ScrapeJob).where(ScrapeJob.id == job_id).values(
+                status=status, finished_at=datetime.utcnow(), error=error,
+                result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+            )
+        )
+
+
+def request_cancel(job_id):
+    """
+    Запрашивает отмену: задача из очереди отменяется сразу, выполняющаяся
+    переходит в cancelling. Возвращает новый статус или None, если задачи нет.
+    """
+    with db_manager.session_scope() as session:
+        job = session.get(ScrapeJob, job_id)
+        if job is None:
+            return None
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+        elif job.status == 'running':
+            job.status = 'cancelling'
+        return job.status
+
+
+def requeue_interrupted_jobs():
+    """
+    Вызывается диспетчером каждого узла периодически: задачи без живой
+    аренды (их узел остановился или умер) возвращаются в очередь и
+    продолжатся с чекпоинта, а не успевшие отмениться — помечаются
+    отмененными. Возвращает число возобновляемых.
+    """
+    with db_manager.session_scope() as session:
+        # Сначала задачи, потом аренды: задача, взятая между двумя чтениями,
+        # в первый список не попадет и не будет ошибочно возвращена
+        interrupted = session.execute(
+            select(ScrapeJob.id, ScrapeJob.status).where(ScrapeJob.status.in_(('running', 'cancelling')))
+        ).all()
+        if not interrupted:
+            return 0
+        live = set(session.execute(
+            select(WorkLease.work_key).where(WorkLease.kind == 'job', WorkLease.expires_at >= db_manager.utc_now())
+        ).scalars())
+        orphaned = {status: [job_id for job_id, s in interrupted if s == status and str(job_id) not in live]
+                    for status in ('running', 'cancelling')}
+        if orphaned['cancelling']:
+            session.execute(
+                update(ScrapeJob).where(ScrapeJob.id.in_(orphaned['cancelling']), ScrapeJob.status == 'cancelling')
+                .values(status='cancelled', finished_at=datetime.utcnow())
+            )
+        if not orphaned['running']:
+            return 0
+        return session.execute(
+            update(ScrapeJob).where(ScrapeJob.id.in_(orphaned['running']), ScrapeJob.status == 'running')
+            .values(status='queued')
+        ).rowcount
+
+
+def get_job_statuses(job_ids):
+    if not job_ids:
+        return {}
+    with db_manager.session_scope() as session:
+        return dict(session.execute(
+            select(ScrapeJob.id, ScrapeJob.status).where(ScrapeJob.id.in_(job_ids))
+        ).all())
+
+
+def get_active_job_ids(kind, node=None):
+    with db_manager.session_scope() as session:
+        query = select(ScrapeJob.id).where(ScrapeJob.kind == kind, ScrapeJob.status.in_(ACTIVE_STATUSES))
+        if node is not None:
+            query = query.where(ScrapeJob.node == node)
+        return list(session.execute(query.order_by(ScrapeJob.id)).scalars())
+
+
+def list_jobs(status=None, limit=50):
+    with db_manager.session_scope() as session:
+        query = select(ScrapeJob).order_by(ScrapeJob.id.desc()).limit(limit)
+        if status:
+            query = query.where(ScrapeJob.status == status)
+        return [_job_to_dict(job) for job in session.execute(query).scalars()]
+
+
+def get_job_progress(job_id):
+    """Задача с прогрессом: счетчики элементов по статусам и эпизоды в работе."""
+    with db_manager.session_scope() as session:
+        job = session.get(ScrapeJob, job_id)
+        if job is None:
+            return None
+        counts = dict(session.execute(
+            select(ScrapeJobItem.status, func.count()).where(ScrapeJobItem.job_id == job_id)
+            .group_by(ScrapeJobItem.status)
+        ).all())
+        episodes_done, episodes_total = session.execute(
+            select(func.coalesce(func.sum(ScrapeJobItem.episodes_done), 0),
+                   func.coalesce(func.sum(ScrapeJobItem.episodes_total), 0))
+            .where(ScrapeJobItem.job_id == job_id)
+        ).one()
+        in_progress = session.execute(
+            select(ScrapeJobItem.slug, ScrapeJobItem.episodes_done, ScrapeJobItem.episodes_total)
+            .where(ScrapeJobItem.job_id == job_id, ScrapeJobItem.status == 'running')
+        ).all()
+        return {
+            **_job_to_dict(job),
+            'items': {'total': sum(counts.values()), **counts},
+            'episodes': {'done': int(episodes_done), 'total': int(episodes_total)},
+            'in_progress': [
+                {'slug': slug, 'episodes_done': done, 'episodes_total': total}
+                for slug, done, total in in_progress
+            ],
+        }
+
+
+def set_catalog_page(job_id, page_num):
+    with db_manager.session_scope() as session:
+        session.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(catalog_page=page_num))
+
+
+def reset_job_progress(job_id):
+    """
+    Начинает задачу заново: чекпоинт каталога — на первую страницу, элементы
+    удаляются (для непрерывного скрапинга между итерациями: аниме, которые
+    не удалось добавить или которые были заняты другим узлом, будут
+    взяты снова).
+    """
+    with db_manager.session_scope() as session:
+        session.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(catalog_page=0))
+        session.execute(delete(ScrapeJobItem).where(ScrapeJobItem.job_id == job_id))
+
+
+def add_job_items(job_id, slugs):
+    """Добавляет slug'и в задачу; уже добавленные не меняются."""
+    if not slugs:
+        return
+    with db_manager.session_scope() as session:
+        db_manager._upsert(session, ScrapeJobItem.__table__,
+                           [{'job_id': job_id, 'slug': slug, 'status': 'pending',
+                             'episodes_total': 0, 'episodes_done': 0} for slug in slugs],
+                           ['job_id', 'slug'])
+
+
+def get_job_items(job_id):
+    """Возвращает (все slug'и задачи, незавершенные slug'и в порядке добавления)."""
+    with db_manager.session_scope() as session:
+        rows = session.execute(
+            select(ScrapeJobItem.slug, ScrapeJobItem.status)
+            .where(ScrapeJobItem.job_id == job_id).order_by(ScrapeJobItem.id)
+        ).all()
+    return {slug for slug, _ in rows}, [slug for slug, status in rows if status in UNFINISHED_ITEM_STATUSES]
+
+
+def update_job_item(job_id, slug, **values):
+    with db_manager.session_scope() as session:
+        session.execute(
+            update(ScrapeJobItem)
+            .where(ScrapeJobItem.job_id == job_id, ScrapeJobItem.slug == slug)
+            .values(**values)
+        )
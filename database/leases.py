@@ -0,0 +1,118 @@
+# database/leases.py
+"""
+Аренда единиц работы для нескольких узлов на общей БД. Единица работы —
+пара (kind, work_key): ('anime', slug), ('episode', URL эпизода),
+('job', id задачи). Взять можно единицу без аренды или с просроченной
+арендой (ее владелец перестал слать heartbeat — процесс умер).
+
+Захват атомарен на уровне БД: условный UPDATE просроченных строк и
+INSERT IGNORE новых, после чего узел читает, какие строки ему достались.
+Сроки аренд задаются и проверяются по часам сервера БД (db_manager.utc_now),
+так что расхождение часов узлов не влияет на то, чья аренда истекла.
+"""
+from sqlalchemy import select, update, delete
+import config
+from .db_manager import db_manager
+from .models import WorkLease
+
+
+def _chunks(items):
+    for start in range(0, len(items), config.BULK_INSERT_CHUNK_SIZE):
+        yield items[start:start + config.BULK_INSERT_CHUNK_SIZE]
+
+
+def acquire_leases(kind, keys, owner, ttl_sec):
+    """Берет в аренду свободные ключи; возвращает полученные в исходном порядке (свои живые — тоже)."""
+    if not keys:
+        return []
+    now = db_manager.utc_now()
+    expires_at = db_manager.utc_now(ttl_sec)
+    owned = set()
+    with db_manager.session_scope() as session:
+        for chunk in _chunks(list(dict.fromkeys(keys))):
+            session.execute(
+                update(WorkLease)
+                .where(WorkLease.kind == kind, WorkLease.work_key.in_(chunk), WorkLease.expires_at < now)
+                .values(owner=owner, status='active', expires_at=expires_at, acquired_at=now,
+                        attempts=WorkLease.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            db_manager._upsert(session, WorkLease.__table__, [
+                {'kind': kind, 'work_key': key, 'owner': owner, 'status': 'active',
+                 'expires_at': expires_at, 'acquired_at': now, 'attempts': 1}
+                for key in chunk
+            ], ['kind', 'work_key'])
+            owned.update(session.execute(
+                select(WorkLease.work_key).where(
+                    WorkLease.kind == kind, WorkLease.work_key.in_(chunk),
+                    WorkLease.owner == owner, WorkLease.status == 'active'
+                )
+            ).scalars())
+    return [key for key in keys if key in owned]
+
+
+def renew_leases(owner, ttl_sec):
+    """Heartbeat: продлевает все активные аренды владельца и возвращает множество (kind, work_key)."""
+    with db_manager.session_scope() as session:
+        session.execute(
+            update(WorkLease).where(WorkLease.owner == owner, WorkLease.status == 'active')
+            .values(expires_at=db_manager.utc_now(ttl_sec)).execution_options(synchronize_session=False)
+        )
+        rows = session.execute(
+            select(WorkLease.kind, WorkLease.work_key).where(WorkLease.owner == owner, WorkLease.status == 'active')
+        ).all()
+    return {(kind, work_key) for kind, work_key in rows}
+
+
+def release_leases(kind, keys, owner, done_hold_sec=None):
+    """
+    Освобождает аренды владельца. С done_hold_sec единица помечается
+    выполненной и не выдается другим узлам еще столько секунд (их очереди
+    могли успеть ее запланировать); без него строка удаляется сразу.
+    """
+    if not keys:
+        return
+    with db_manager.session_scope() as session:
+        for chunk in _chunks(list(keys)):
+            condition = (WorkLease.kind == kind, WorkLease.work_key.in_(chunk), WorkLease.owner == owner)
+            if done_hold_sec:
+                session.execute(
+                    update(WorkLease).where(*condition)
+                    .values(status='done', expires_at=db_manager.utc_now(done_hold_sec))
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                session.execute(delete(WorkLease).where(*condition).execution_options(synchronize_session=False))
+
+
+def release_all_leases(owner):
+    """Освобождает все активные аренды владельца (при остановке процесса)."""
+    with db_manager.session_scope() as session:
+        return session.execute(
+            delete(WorkLease).where(WorkLease.owner == owner, WorkLease.status == 'active')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+
+def purge_expired_leases():
+    """Удаляет отработавшие и брошенные аренды, срок которых истек."""
+    with db_manager.session_scope() as session:
+        return session.execute(
+            delete(WorkLease).where(WorkLease.expires_at < db_manager.utc_now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+
+def get_lease_stats():
+    """Действующие аренды по узлам и типам: {owner: {kind: count}}."""
+    with db_manager.session_scope() as session:
+        rows = session.execute(
+            select(WorkLease.owner, WorkLease.kind, WorkLease.status)
+            .where(WorkLease.expires_at >= db_manager.utc_now())
+        ).all()
+    stats = {}
+    for owner, kind, status in rows:
+        counts = stats.setdefault(owner, {})
+        name = kind if status == 'active' else f"{kind}_done"
+        counts[name] = counts.get(name, 0) + 1
+    return stats
@@ -1,6 +1,6 @@
 # database/models.py
 from sqlalchemy import (create_engine, Column, Integer, String, Text, DECIMAL,
-                        ForeignKey, Table, TIMESTAMP, func)
+                        ForeignKey, Table, TIMESTAMP, UniqueConstraint, Index, func)
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -31,14 +31,26 @@ class Anime(Base):
     content_type_id = Column(Integer, ForeignKey('content_types.id'))
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    last_checked_at = Column(TIMESTAMP, nullable=True)
 
     content_type = relationship("ContentType")
     seasons = relationship("Season", back_populates="anime", cascade="all, delete-orphan")
     episodes = relationship("Episode", back_populates="anime", cascade="all, delete-orphan")
     genres = relationship("Genre", secondary=anime_genres_table, back_populates="animes")
+    stats = relationship("AnimeStats", uselist=False, cascade="all, delete-orphan")
+
+class AnimeStats(Base):
+    """Агрегаты по эпизодам аниме; поддерживаются путем записи, а не считаются в запросах каталога."""
+    __tablename__ = 'anime_stats'
+    anime_id = Column(Integer, ForeignKey('anime.id'), primary_key=True)
+    episodes_count = Column(Integer, nullable=False, default=0)
+    total_duration_sec = Column(Integer, nullable=False, default=0)
+    max_episode_number = Column(Integer, nullable=False, default=0)
+    last_episode_added_at = Column(TIMESTAMP, nullable=True)
 
 class Season(Base):
     __tablename__ = 'seasons'
+    __table_args__ = (UniqueConstraint('anime_id', 'season_number', name='uq_seasons_anime_season'),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     anime_id = Column(Integer, ForeignKey('anime.id'), nullable=False)
     season_number = Column(Integer, nullable=False)
@@ -49,6 +61,10 @@ class Season(Base):
 
 class Episode(Base):
     __tablename__ = 'episodes'
+    __table_args__ = (
+        Index('ix_episodes_anime_episode', 'anime_id', 'episode_number'),
+        Index('ix_episodes_season_episode', 'season_id', 'episode_number'),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     anime_id = Column(Integer, ForeignKey('anime.id'), nullable=False)
     season_id = Column(Integer, ForeignKey('seasons.id'))
@@ -74,3 +90,50 @@ class Genre(Base):
     
     animes = relationship("Anime", secondary=anime_genres_table, back_populates="genres")
 
+
+class ScrapeJob(Base):
+    __tablename__ = 'scrape_jobs'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(32), nullable=False)  # specific, bulk, incremental, continuous
+    status = Column(String(16), nullable=False, default='queued', index=True)
+    priority = Column(Integer, nullable=False, default=0)
+    params = Column(Text)  # JSON
+    catalog_page = Column(Integer, nullable=False, default=0)  # последняя полностью учтенная страница каталога
+    node = Column(String(128), nullable=True)  # узел, на котором должна выполняться задача; NULL — любой
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+
+    items = relationship("ScrapeJobItem", back_populates="job", cascade="all, delete-orphan")
+
+class ScrapeJobItem(Base):
+    __tablename__ = 'scrape_job_items'
+    __table_args__ = (UniqueConstraint('job_id', 'slug'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, ForeignKey('scrape_jobs.id'), nullable=False)
+    slug = Column(String(255), nullable=False)
+    status = Column(String(16), nullable=False, default='pending')  # pending, running, done, skipped, error
+    episodes_total = Column(Integer, nullable=False, default=0)
+    episodes_done = Column(Integer, nullable=False, default=0)
+
+    job = relationship("ScrapeJob", back_populates="items")
+
+
+class WorkLease(Base):
+    """
+    Аренда единицы работы (аниме, эпизод, задача) узлом, когда несколько
+    экземпляров скрапера работают с общей БД. Аренда действует до
+    expires_at и продлевается heartbeat'ом; просроченную может взять другой узел.
+    """
+    __tablename__ = 'work_leases'
+    __table_args__ = (UniqueConstraint('kind', 'work_key', name='uq_work_leases_kind_key'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(16), nullable=False)  # anime, episode, job
+    work_key = Column(String(512), nullable=False)  # slug, URL эпизода или id задачи
+    owner = Column(String(255), nullable=False, index=True)  # "<узел>:<pid>"
+    status = Column(String(8), nullable=False, default='active')  # active, done
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+    acquired_at = Column(TIMESTAMP, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)  # сколько раз единицу брали в работу
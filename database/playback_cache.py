@@ -0,0 +1,98 @@
+# database/playback_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+import config
+
+# Готовый ответ: тело и ETag считаются один раз при заполнении кэша
+PlaybackEntry = namedtuple('PlaybackEntry', 'body etag anime_id version expires_at')
+
+
+class PlaybackCache:
+    """
+    LRU-кэш ответов эндпоинтов воспроизведения в памяти процесса,
+    ограниченный числом записей и суммарным размером тел.
+
+    Запись сохранения эпизодов (db_manager) после коммита вызывает
+    invalidate_anime(): записи этого аниме становятся недействительными
+    без перебора ключей. Чтение из БД, начатое до инвалидации, в кэш не
+    попадет — для этого put() получает версию, снятую до запроса.
+    Изменения, сделанные другими узлами на общей БД, сюда не доходят,
+    поэтому у записей есть TTL.
+    """
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = 0
+        self._entries = OrderedDict()
+        self._invalidated_at = {}  # anime_id -> версия последней инвалидации
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Действующая запись по ключу или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if entry.version < self._invalidated_at.get(entry.anime_id, 0) or entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key, anime_id, payload, version):
+        """
+        Сериализует `payload` и кладет в кэш. `version` — значение
+        self.version до чтения из БД; если аниме с тех пор изменилось,
+        запись только возвращается, но не сохраняется.
+        """
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = PlaybackEntry(body, '"' + hashlib.sha1(body).hexdigest() + '"', anime_id, version,
+                              time.monotonic() + self.ttl)
+        with self._lock:
+            if version < self._invalidated_at.get(anime_id, 0):
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+        return entry
+
+    def _remove(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def invalidate_anime(self, anime_id):
+        """Делает недействительными все записи аниме (вызывать после коммита)."""
+        with self._lock:
+            self.version += 1
+            self._invalidated_at[anime_id] = self.version
+            self.stats['invalidations'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+            }
+
+
+playback_cache = PlaybackCache(
+    config.PLAYBACK_CACHE_MAX_ENTRIES,
+    config.PLAYBACK_CACHE_MAX_MB * 1024 * 1024,
+    config.PLAYBACK_CACHE_TTL_SEC
+)
@@ -1,15 +1,37 @@
 # main.py
 import uvicorn
-from fastapi import FastAPI
-from api.endpoints import router as api_router
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from api.endpoints import router as api_router, manager, job_runner
+from api.catalog_endpoints import router as catalog_router
+from core import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Общие HTTP-сессии скраперов живут столько же, сколько приложение.
+    # Очередь задач при старте возобновляет прерванные задачи.
+    await manager.start()
+    await job_runner.start()
+    try:
+        yield
+    finally:
+        await job_runner.close()
+        await manager.close()
 
 app = FastAPI(
     title="Anime Parser API",
     description="API для управления скрапингом данных об аниме с jut.su и Jikan.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(api_router, prefix="/api/v1", tags=["Scraping"])
+app.include_router(catalog_router, prefix="/api/v1", tags=["Catalog"])
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Метрики этапов скрапинга в формате Prometheus."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,264 @@
+# scrapers/browser_pool.py
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+import config
+
+
+def process_tree_rss_kb(root_pid, include_root=True):
+    """
+    Суммарный RSS процесса и всех его потомков по /proc (Linux).
+    Возвращает None, если /proc недоступен.
+    """
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                    children.setdefault(ppid, []).append(int(entry))
+                except (OSError, ValueError, IndexError):
+                    continue
+    except OSError:
+        return None
+
+    page_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+    total = 0
+    stack = [root_pid] if include_root else list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * page_kb
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class PooledContext:
+    """
+    Контекст браузера из пула. new_page() учитывает общий лимит
+    одновременно открытых страниц, а навигации страниц считаются,
+    чтобы пул мог пересоздать "износившийся" контекст.
+    """
+    def __init__(self, pool, context, generation):
+        self.pool = pool
+        self.context = context
+        self.generation = generation  # номер запуска браузера, в котором создан контекст
+        self.navigations = 0
+        self.created_at = time.monotonic()
+        self._pages = set()
+
+    async def new_page(self, wait=True):
+        """
+        Открывает страницу в контексте. С wait=False не ждет свободного
+        места под лимитом BROWSER_MAX_PAGES и возвращает None.
+        """
+        if not wait and self.pool._page_slots.locked():
+            return None
+        await self.pool._page_slots.acquire()
+        try:
+            page = await self.context.new_page()
+        except BaseException:
+            self.pool._page_slots.release()
+            raise
+        self._pages.add(page)
+        self.pool._pages_open += 1
+
+        def on_navigated(frame):
+            if frame is page.main_frame:
+                self.navigations += 1
+
+        page.on('framenavigated', on_navigated)
+        page.on('close', lambda _: self._release_page(page))
+        return page
+
+    def _release_page(self, page):
+        if page in self._pages:
+            self._pages.discard(page)
+            self.pool._pages_open -= 1
+            self.pool._page_slots.release()
+
+    async def close(self):
+        await self.context.close()
+        # Событие close страниц может не прийти после закрытия контекста
+        for page in list(self._pages):
+            self._release_page(page)
+
+
+class BrowserPool:
+    """
+    Один долгоживущий Chromium на все приложение с пулом "теплых"
+    контекстов. Создается при старте FastAPI и используется всеми
+    точками входа скрапинга, так что запрос одного аниме не платит за
+    холодный запуск браузера.
+
+    - Контексты выдаются через `async with pool.context() as ctx`,
+      простаивающих держится BROWSER_WARM_CONTEXTS, всего — не больше
+      BROWSER_MAX_CONTEXTS.
+    - Число одновременно открытых страниц ограничено BROWSER_MAX_PAGES.
+    - Контекст пересоздается после BROWSER_CONTEXT_MAX_NAVIGATIONS
+      навигаций или когда процессы браузера занимают больше
+      BROWSER_RECYCLE_RSS_MB, поэтому память не растет при многодневной работе.
+    - Упавший браузер перезапускается при следующем запросе контекста.
+    """
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._idle = []
+        self._total_contexts = 0
+        self._context_available = asyncio.Condition()
+        self._page_slots = asyncio.Semaphore(config.BROWSER_MAX_PAGES)
+        self._pages_open = 0
+        self._launch_lock = asyncio.Lock()
+        self._generation = 0  # растет при каждом (пере)запуске браузера
+        self._last_memory_check = 0.0
+        self._browser_rss_kb = None
+        self._warmup = None
+        self.stats = {'launches': 0, 'contexts_created': 0,
+                      'recycled_navigations': 0, 'recycled_memory': 0, 'context_waits': 0}
+
+    async def start(self):
+        """Запускает браузер и прогревает контексты в фоне, не задерживая старт приложения."""
+        if self._warmup is None or self._warmup.done():
+            self._warmup = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        """Ошибка запуска не фатальна — повтор при первом запросе контекста."""
+        try:
+            await self._ensure_browser()
+            async with self._context_available:
+                while self._total_contexts < config.BROWSER_WARM_CONTEXTS:
+                    self._idle.append(await self._new_context())
+            print(f"[+] Пул браузера готов: контекстов {len(self._idle)}, лимит страниц {config.BROWSER_MAX_PAGES}")
+        except Exception as e:
+            print(f"[!] Не удалось запустить браузер при старте ({e}), повтор при первом запросе.")
+
+    async def close(self):
+        if self._warmup is not None:
+            # Не отменяем: прерванный запуск Playwright оставляет процесс драйвера,
+            # и остановка приложения зависает. Запуск занимает секунды.
+            await asyncio.gather(self._warmup, return_exceptions=True)
+            self._warmup = None
+        async with self._context_available:
+            for pooled in self._idle:
+                try:
+                    await pooled.close()
+                except Exception:
+                    pass
+            self._idle.clear()
+            self._total_contexts = 0
+            self._generation += 1
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                print("[!] Браузер отключился, перезапуск.")
+            from playwright.async_api import async_playwright
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            browser = await self._playwright.chromium.launch(headless=True)
+            async with self._context_available:
+                # Контексты упавшего браузера больше не считаются: выданные сейчас
+                # не уменьшат счетчик при возврате (другое поколение)
+                self._browser = browser
+                self._generation += 1
+                self._idle.clear()
+                self._total_contexts = 0
+                self._context_available.notify_all()
+            self.stats['launches'] += 1
+            return browser
+
+    async def _new_context(self):
+        """
+        Вызывается под _context_available после _ensure_browser: перезапуск
+        браузера здесь взял бы ту же блокировку, а поколение под ней не меняется.
+        """
+        if self._browser is None:
+            raise RuntimeError("Браузер не запущен")
+        pooled = PooledContext(self, await self._browser.new_context(), self._generation)
+        self._total_contexts += 1
+        self.stats['contexts_created'] += 1
+        return pooled
+
+    async def _acquire(self):
+        await self._ensure_browser()
+        async with self._context_available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._total_contexts < config.BROWSER_MAX_CONTEXTS:
+                    return await self._new_context()
+                self.stats['context_waits'] += 1
+                await self._context_available.wait()
+
+    def _recycle_reason(self, pooled):
+        if pooled.navigations >= config.BROWSER_CONTEXT_MAX_NAVIGATIONS:
+            return 'recycled_navigations'
+        now = time.monotonic()
+        if now - self._last_memory_check >= config.BROWSER_MEMORY_CHECK_INTERVAL_SEC:
+            self._last_memory_check = now
+            # Потомки нашего процесса — драйвер Playwright и процессы Chromium
+            self._browser_rss_kb = process_tree_rss_kb(os.getpid(), include_root=False)
+        if self._browser_rss_kb and self._browser_rss_kb > config.BROWSER_RECYCLE_RSS_MB * 1024:
+            # Пересчитаем память после пересоздания этого контекста
+            self._last_memory_check = 0.0
+            return 'recycled_memory'
+        return None
+
+    async def _release(self, pooled):
+        reason = self._recycle_reason(pooled)
+        async with self._context_available:
+            current = pooled.generation == self._generation
+            alive = current and self._browser is not None and self._browser.is_connected()
+            if reason or not alive or len(self._idle) >= config.BROWSER_WARM_CONTEXTS:
+                if current:
+                    self._total_contexts -= 1
+                if reason:
+                    self.stats[reason] += 1
+                    print(f"[*] Контекст браузера пересоздается ({reason}, навигаций: {pooled.navigations}).")
+                try:
+                    await pooled.close()
+                except Exception as e:
+                    print(f"[!] Ошибка при закрытии контекста: {e}")
+            else:
+                self._idle.append(pooled)
+            self._context_available.notify()
+
+    @asynccontextmanager
+    async def context(self):
+        """Выдает контекст из пула на время блока; страницы, не закрытые в блоке, закрываются."""
+        pooled = await self._acquire()
+        try:
+            yield pooled
+        finally:
+            for page in list(pooled._pages):
+                try:
+                    await page.close()
+                except Exception:
+                    pooled._release_page(page)
+            await self._release(pooled)
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'connected': bool(self._browser and self._browser.is_connected()),
+            'contexts_total': self._total_contexts,
+            'contexts_idle': len(self._idle),
+            'pages_open': self._pages_open,
+            'browser_rss_mb': round(self._browser_rss_kb / 1024, 1) if self._browser_rss_kb else None,
+        }
@@ -0,0 +1,168 @@
+# scrapers/extractors.py
+import re
+from importlib.util import find_spec
+from urllib.parse import urljoin
+import config
+
+# Парсеры импортируются при создании бэкенда, а не при импорте модуля,
+# чтобы не замедлять старт приложения. lxml/cssselect — необязательные зависимости.
+HAS_LXML = find_spec('lxml') is not None and find_spec('cssselect') is not None
+
+
+class HtmlExtractor:
+    """
+    Извлекает из HTML страниц jut.su только нужные скраперу данные.
+    Логика разбора общая, а наследники реализуют лишь примитивы парсера
+    (_parse, _select, _select_one, _find_by_id, _text, _attr), поэтому
+    все бэкенды дают одинаковый результат.
+    """
+    name = None
+
+    def _parse(self, html_content):
+        raise NotImplementedError
+
+    def _select(self, root, selector):
+        raise NotImplementedError
+
+    def _select_one(self, root, selector):
+        found = self._select(root, selector)
+        return found[0] if found else None
+
+    def _find_by_id(self, root, element_id):
+        raise NotImplementedError
+
+    def _text(self, element):
+        raise NotImplementedError
+
+    def _attr(self, element, name):
+        raise NotImplementedError
+
+    def catalog_slugs(self, html_content):
+        """Слаги аниме на странице каталога в порядке появления (без повторов)."""
+        root = self._parse(html_content)
+        page_slugs = {}  # dict как упорядоченное множество
+        for link in self._select(root, 'div.all_anime_global > a'):
+            href = self._attr(link, 'href')
+            if href and href.startswith('/') and not href.startswith(('/user/', '/news/')):
+                slug = href.strip('/').split('/')[-1]
+                page_slugs[slug] = None
+        return list(page_slugs)
+
+    def episode_links(self, html_content, base_url):
+        """Ссылки на эпизоды со страницы аниме: {номер сезона: [ссылки]}."""
+        root = self._parse(html_content)
+        seasons = {}
+
+        season_tabs = self._select(root, '.the_season_tabs a')
+        if season_tabs:
+            for tab in season_tabs:
+                season_title = self._text(tab)
+                season_match = re.search(r'(\d+)\s*сезон', season_title, re.IGNORECASE)
+                season_number = int(season_match.group(1)) if season_match else 1
+
+                season_content_id = self._attr(tab, 'href').replace('#', '')
+                season_content = self._find_by_id(root, season_content_id)
+                if season_content is not None:
+                    episode_links = [urljoin(base_url, self._attr(a, 'href')) for a in self._select(season_content, 'a[href*="episode-"]')]
+                    seasons[season_number] = sorted(episode_links, key=_episode_sort_key)
+        else:
+            episode_links = [urljoin(base_url, self._attr(a, 'href')) for a in self._select(root, 'a[href*="episode-"]')]
+            if episode_links:
+                seasons[1] = sorted(episode_links, key=_episode_sort_key)
+        return seasons
+
+    def episode_fields(self, html_content):
+        """Название аниме, название эпизода и URL постера со страницы эпизода."""
+        root = self._parse(html_content)
+
+        h1_title = self._select_one(root, 'h1.header_video')
+        episode_h2 = self._select_one(root, 'h2.video_plate_title')
+        og_image = self._select_one(root, 'meta[property="og:image"]')
+        return {
+            'anime_title_rus': self._text(h1_title).replace('Смотреть ', '').rsplit(' ', 2)[0] if h1_title is not None else "N/A",
+            'episode_title': self._text(episode_h2) if episode_h2 is not None else "N/A",
+            'poster_url': self._attr(og_image, 'content') if og_image is not None else None,
+        }
+
+
+def _episode_sort_key(link):
+    return int(re.search(r'episode-(\d+)', link).group(1))
+
+
+class BeautifulSoupExtractor(HtmlExtractor):
+    """Исходный бэкенд: BeautifulSoup с чисто питоновским html.parser."""
+    name = 'bs4'
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def _parse(self, html_content):
+        return self._soup(html_content, 'html.parser')
+
+    def _select(self, root, selector):
+        return root.select(selector)
+
+    def _select_one(self, root, selector):
+        return root.select_one(selector)
+
+    def _find_by_id(self, root, element_id):
+        return root.find(id=element_id)
+
+    def _text(self, element):
+        return element.get_text(strip=True)
+
+    def _attr(self, element, name):
+        return element.get(name)
+
+
+class LxmlExtractor(HtmlExtractor):
+    """Быстрый бэкенд на C-парсере libxml2 (lxml + cssselect)."""
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._document_fromstring = lxml.html.document_fromstring
+        self._css_selector = CSSSelector
+        # Скомпилированные CSS-селекторы переиспользуются между страницами
+        self._selectors = {}
+
+    def _parse(self, html_content):
+        return self._document_fromstring(html_content)
+
+    def _select(self, root, selector):
+        compiled = self._selectors.get(selector)
+        if compiled is None:
+            compiled = self._selectors[selector] = self._css_selector(selector)
+        return compiled(root)
+
+    def _find_by_id(self, root, element_id):
+        found = root.xpath('//*[@id=$id]', id=element_id)
+        return found[0] if found else None
+
+    def _text(self, element):
+        return ''.join(text.strip() for text in element.itertext())
+
+    def _attr(self, element, name):
+        return element.get(name)
+
+
+EXTRACTORS = {
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name=None):
+    """
+    Возвращает бэкенд извлечения по имени (по умолчанию config.HTML_EXTRACTOR).
+    Если lxml не установлен, используется BeautifulSoup.
+    """
+    name = name or config.HTML_EXTRACTOR
+    if name not in EXTRACTORS:
+        raise ValueError(f"Неизвестный бэкенд извлечения HTML: '{name}'. Доступны: {', '.join(EXTRACTORS)}")
+    if name == LxmlExtractor.name and not HAS_LXML:
+        print("[!] lxml/cssselect не установлены, используется BeautifulSoup.")
+        name = BeautifulSoupExtractor.name
+    return EXTRACTORS[name]()
@@ -0,0 +1,226 @@
+# scrapers/host_limiter.py
+"""
+Адаптивное ограничение нагрузки на внешние хосты (jut.su, Jikan, CDN
+постеров). Для каждого хоста держится окно параллельных запросов по
+схеме AIMD, как окно перегрузки в TCP: пока задержка и доля ошибок в
+норме, окно растет на один запрос за "круг" успешных ответов; на
+429/503, проверку Cloudflare или таймаут оно уменьшается в
+HOST_BACKOFF_FACTOR раз, а хост ставится на паузу (Retry-After или
+экспоненциальный отступ со случайным разбросом). Неудачные запросы
+повторяются с тем же отступом.
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import config
+from core.metrics import HOST_REQUESTS_TOTAL, HOST_CONCURRENCY_LIMIT
+
+THROTTLE_STATUSES = (429, 503)
+
+LATENCY_ALPHA = 0.2  # сглаживание текущей задержки
+BASELINE_ALPHA = 0.02  # сглаживание "нормальной" задержки: меняется медленно
+ERROR_ALPHA = 0.1  # сглаживание доли неудач
+LATENCY_DECREASE_FACTOR = 0.9  # мягкое уменьшение окна при росте задержки
+
+
+class HostThrottled(Exception):
+    """Хост просит снизить нагрузку: 429/503 или проверка Cloudflare."""
+    def __init__(self, reason, retry_after=None, retriable=True):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.retriable = retriable
+
+
+def parse_retry_after(value):
+    """Retry-After в секундах (число или HTTP-дата); None, если заголовка нет или он не разобран."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_status(status, headers):
+    """Поднимает HostThrottled на 429/503. `headers` — заголовки ответа aiohttp или Playwright."""
+    if status in THROTTLE_STATUSES:
+        raise HostThrottled(f"http_{status}", parse_retry_after(headers.get('retry-after')))
+
+
+def backoff_delay(attempt):
+    """Экспоненциальный отступ с разбросом: половина окна base * 2^attempt плюс случайная доля второй половины."""
+    window = min(config.HOST_RETRY_MAX_SEC, config.HOST_RETRY_BASE_SEC * 2 ** attempt)
+    return window / 2 + random.uniform(0, window / 2)
+
+
+def _is_timeout(error):
+    # У Playwright свой TimeoutError, не наследник встроенного
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError)) or type(error).__name__ == 'TimeoutError'
+
+
+def _is_client_error(error):
+    """4xx (кроме 408/429) повторять бессмысленно: хост здоров, ошибка в запросе."""
+    status = getattr(error, 'status', None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+class AdaptiveHostLimiter:
+    """Окно параллельных запросов к одному хосту, подстраивающееся по ответам (AIMD)."""
+    def __init__(self, host, initial, min_limit, max_limit):
+        self.host = host
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.latency = None  # сглаженная задержка успешных запросов, сек
+        self.baseline = None  # "нормальная" задержка хоста
+        self.error_rate = 0.0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._throttle_streak = 0
+        self._slot_freed = asyncio.Condition()
+        self.stats = {'ok': 0, 'throttled': 0, 'timeout': 0, 'error': 0, 'retries': 0, 'decreases': 0}
+        HOST_CONCURRENCY_LIMIT.set(self.limit, host=host)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Место в окне хоста на время запроса. Отдает признак того, что окно
+        заполнено: расти окну имеет смысл, только когда его не хватает.
+        """
+        async with self._slot_freed:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    break
+                # Таймаут — страховка от пропущенного notify и выход из паузы
+                try:
+                    await asyncio.wait_for(self._slot_freed.wait(), min(pause, 1.0) if pause > 0 else 1.0)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            saturated = self.in_flight >= int(self.limit)
+        try:
+            yield saturated
+        finally:
+            self.in_flight -= 1
+            async with self._slot_freed:
+                self._slot_freed.notify_all()
+
+    def record(self, outcome, latency=None, saturated=False, retry_after=None):
+        """Учитывает исход запроса: 'ok', 'throttled', 'timeout' или 'error'."""
+        now = time.monotonic()
+        self.stats[outcome] += 1
+        HOST_REQUESTS_TOTAL.inc(host=self.host, outcome=outcome)
+        self.error_rate += ERROR_ALPHA * ((outcome != 'ok') - self.error_rate)
+
+        if outcome == 'ok':
+            self._throttle_streak = 0
+            self._observe_latency(latency)
+            if self.latency > self.baseline * config.HOST_LATENCY_TOLERANCE:
+                self._decrease(now, LATENCY_DECREASE_FACTOR)
+            elif saturated and self.error_rate < config.HOST_ERROR_RATE_THRESHOLD:
+                # +1 запрос за окно успешных ответов
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif outcome in ('throttled', 'timeout'):
+            self._throttle_streak += 1
+            self._decrease(now, config.HOST_BACKOFF_FACTOR)
+            pause = retry_after if retry_after is not None else backoff_delay(self._throttle_streak - 1)
+            self._resume_at = max(self._resume_at, now + pause)
+        elif self.error_rate >= config.HOST_ERROR_RATE_THRESHOLD:
+            self._decrease(now, config.HOST_BACKOFF_FACTOR)
+        HOST_CONCURRENCY_LIMIT.set(round(self.limit, 2), host=self.host)
+
+    def _observe_latency(self, latency):
+        if self.latency is None:
+            self.latency = self.baseline = latency
+            return
+        self.latency += LATENCY_ALPHA * (latency - self.latency)
+        self.baseline += BASELINE_ALPHA * (latency - self.baseline)
+
+    def _decrease(self, now, factor):
+        # Пачка ошибок от одновременных запросов — один сигнал перегрузки за
+        # время ответа (как в TCP: не больше одного уменьшения за RTT)
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.stats['decreases'] += 1
+
+    def get_stats(self):
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+            'baseline_ms': round(self.baseline * 1000) if self.baseline is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'paused_sec': round(max(0.0, self._resume_at - time.monotonic()), 1),
+            **self.stats,
+        }
+
+
+class HostLimiters:
+    """
+    Ограничители по именам хостов, общие для всех скраперов и воркеров.
+    Настройки — HOST_LIMIT_DEFAULT, дополненные HOST_LIMITS[хост].
+    """
+    def __init__(self):
+        self._limiters = {}
+
+    def for_url(self, url):
+        host = urlparse(url).hostname or ''
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            settings = {**config.HOST_LIMIT_DEFAULT, **config.HOST_LIMITS.get(host, {})}
+            limiter = self._limiters[host] = AdaptiveHostLimiter(host, **settings)
+        return limiter
+
+    async def call(self, url, attempt, retries=None):
+        """
+        Выполняет `await attempt()` в окне хоста `url` и повторяет при
+        перегрузке, таймауте или сетевой ошибке — до `retries` раз
+        (по умолчанию HOST_MAX_RETRIES) с отступом. Последняя ошибка
+        пробрасывается вызывающему коду.
+        """
+        limiter = self.for_url(url)
+        retries = config.HOST_MAX_RETRIES if retries is None else retries
+        for n in range(retries + 1):
+            retry_after = None
+            # Исход учитывается до освобождения места: пауза хоста должна
+            # начаться раньше, чем место займет следующий запрос
+            async with limiter.slot() as saturated:
+                started_at = time.monotonic()
+                try:
+                    result = await attempt()
+                except HostThrottled as e:
+                    outcome, error, retry_after = 'throttled', e, e.retry_after
+                except Exception as e:
+                    if _is_client_error(e):
+                        raise
+                    outcome, error = ('timeout' if _is_timeout(e) else 'error'), e
+                else:
+                    limiter.record('ok', time.monotonic() - started_at, saturated)
+                    return result
+                limiter.record(outcome, retry_after=retry_after)
+            if n == retries or not getattr(error, 'retriable', True):
+                raise error
+            limiter.stats['retries'] += 1
+            delay = max(retry_after or 0.0, backoff_delay(n))
+            print(f"    [!] {limiter.host}: {outcome} ({error}), повтор {n + 1}/{retries} через {delay:.1f} сек.")
+            await asyncio.sleep(delay)
+
+    def get_stats(self):
+        return {host: limiter.get_stats() for host, limiter in self._limiters.items()}
+
+
+hosts = HostLimiters()
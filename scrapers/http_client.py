@@ -0,0 +1,97 @@
+# scrapers/http_client.py
+import aiohttp
+import config
+
+
+class ConnectionStats:
+    """
+    Счетчики соединений aiohttp-сессии. Позволяют убедиться, что
+    соединения переиспользуются, а не открываются заново на каждый запрос.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def as_dict(self):
+        reuse_ratio = self.connections_reused / self.requests if self.requests else 0.0
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(reuse_ratio, 3),
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+        }
+
+
+def _build_trace_config(stats):
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        stats.requests += 1
+
+    async def on_connection_create_end(session, ctx, params):
+        stats.connections_created += 1
+
+    async def on_connection_reuseconn(session, ctx, params):
+        stats.connections_reused += 1
+
+    async def on_dns_cache_hit(session, ctx, params):
+        stats.dns_cache_hits += 1
+
+    async def on_dns_cache_miss(session, ctx, params):
+        stats.dns_cache_misses += 1
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+    return trace_config
+
+
+def create_client_session(stats, headers=None):
+    """
+    Создает долгоживущую aiohttp-сессию с keep-alive коннектором,
+    лимитами соединений на хост и кэшированием DNS.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        trace_configs=[_build_trace_config(stats)],
+    )
+
+
+class SessionOwner:
+    """
+    Примесь для скраперов, владеющих одной aiohttp-сессией на все время
+    жизни приложения. Сессия открывается в start() (lifespan FastAPI)
+    или лениво при первом запросе и закрывается в close().
+    """
+    session_headers = None
+
+    def _init_session(self):
+        self._session = None
+        self.connection_stats = ConnectionStats()
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = create_client_session(self.connection_stats, headers=self.session_headers)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self):
+        await self.start()
+        return self._session
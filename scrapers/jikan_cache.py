@@ -0,0 +1,55 @@
+# scrapers/jikan_cache.py
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_title(title):
+    """Ключ кэша: регистр, ё/е, пунктуация и лишние пробелы не различаются."""
+    title = title.casefold().replace('ё', 'е')
+    title = re.sub(r'[^\w\s]', ' ', title)
+    return ' '.join(title.split())
+
+
+class JikanCache:
+    """
+    Постоянный кэш ответов Jikan API в файле SQLite, ключ — нормализованное
+    название. Найденные аниме хранятся `ttl` секунд, отрицательные ответы
+    ("не найдено") — `negative_ttl` секунд. Ошибки API не кэшируются.
+    """
+    def __init__(self, path, ttl, negative_ttl):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jikan_cache ("
+            " key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, title):
+        """Возвращает (найдено_в_кэше, значение). Значение None — закэшированное "не найдено"."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM jikan_cache WHERE key = ?", (normalize_title(title),)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return False, None
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def set(self, title, value):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jikan_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (normalize_title(title), json.dumps(value, ensure_ascii=False) if value is not None else None,
+                 time.time() + ttl)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,100 +1,159 @@
 # scrapers/jutsu_scraper.py
 import asyncio
 import re
-import os
-from urllib.parse import urljoin
-from bs4 import BeautifulSoup
-import aiohttp
+import time
+import weakref
+from http.cookies import SimpleCookie
+from urllib.parse import urljoin, urlparse
 import config
+from core.metrics import stage, count
+from .extractors import get_extractor
+from .host_limiter import hosts, check_status, HostThrottled
+from .http_client import SessionOwner
+from .page_archive import PageArchive
+from .poster_store import PosterStore
 
-class JutsuScraper:
+# Присваивания window-переменных эпизода в inline-скриптах, например
+# `var video_intro_start = 90;` или `next_episode_link = "/slug/episode-2.html";`
+WINDOW_VAR_RE = re.compile(
+    r'\b(video_duration|this_video_duration|video_intro_start|video_intro_end|'
+    r'video_outro_start|video_outro_end|next_episode_link)\s*=\s*'
+    r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|-?\d+(?:\.\d+)?|true|false|null)'
+)
+
+# Признаки страницы проверки Cloudflare
+CLOUDFLARE_MARKERS = ('cf-browser-verification', 'challenge-platform', 'cf_chl_opt', '<title>Just a moment...</title>')
+
+class JutsuScraper(SessionOwner):
     """
-    Скрапер для jut.su. Использует Playwright для всех взаимодействий,
-    чтобы избежать блокировок по IP и обходить защиту Cloudflare.
+    Скрапер для jut.su. По умолчанию использует Playwright для всех взаимодействий,
+    чтобы избежать блокировок по IP и обходить защиту Cloudflare. В режиме
+    JUTSU_FETCH_MODE = "http" страницы аниме и эпизодов сначала загружаются
+    через aiohttp, а Playwright используется только как запасной путь.
     """
     def __init__(self):
         self.base_url = config.JUTSU_BASE_URL
         self.output_dir = config.POSTERS_OUTPUT_DIR
+        self.fast_mode = config.EPISODE_FAST_MODE
+        self.fetch_mode = config.JUTSU_FETCH_MODE
+        self._extractor = None  # создается при первом разборе страницы
+        self.poster_store = None  # создается при первом постере
+        self.page_archive = None  # создается при первой странице, если включен PAGE_ARCHIVE_ENABLED
+        self._browser_user_agent = None
+        self._init_session()
+        # Трафик по каждой странице: {page: {'bytes': ..., 'blocked': ...}}
+        self._page_traffic = weakref.WeakKeyDictionary()
+        self._pages_tracked = 0
+        self.page_load_stats = {
+            mode: {'pages': 0, 'total_time': 0.0, 'total_bytes': 0, 'blocked_requests': 0}
+            for mode in ('normal', 'fast')
+        }
+
+    @property
+    def extractor(self):
+        if self._extractor is None:
+            self._extractor = get_extractor()
+        return self._extractor
 
     async def get_all_anime_slugs(self, page):
         """
         Собирает слaги всех аниме с сайта, проходя по всем страницам каталога
         с использованием Playwright.
         """
-        all_slugs = set()
-        page_num = 1
-        while True:
-            catalog_url = f"{self.base_url}/anime/"
-            if page_num > 1:
-                catalog_url = f"{self.base_url}/anime/page-{page_num}/"
-            
-            print(f"[*] Анализ каталога: {catalog_url}")
-            try:
-                await page.goto(catalog_url, timeout=30000, wait_until='domcontentloaded')
-                
-                # Проверяем, не перенаправило ли нас на главную (признак конца страниц)
-                if page_num > 1 and "page" not in page.url:
-                    print(f"[*] Достигнут конец каталога (перенаправление на главную).")
-                    break
+        all_slugs = []
+        async for _, page_slugs in self.iter_anime_slugs(page):
+            all_slugs.extend(page_slugs)
+        return all_slugs
 
-                html_content = await page.content()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # Используем более надежный селектор
-                links = soup.select('div.all_anime_global > a')
-                if not links:
-                    print(f"[*] На странице {page_num} не найдено ссылок на аниме. Завершение.")
+    async def iter_anime_slugs(self, page, concurrency=None, start_page=1, new_page=None):
+        """
+        Асинхронный генератор: отдает пары (номер страницы, новые слаги)
+        по мере загрузки каталога, начиная со страницы `start_page`
+        (для продолжения прерванного обхода). Страницы каталога грузятся
+        окнами по `concurrency` штук на отдельных вкладках того же контекста,
+        но отдаются строго по порядку номеров. `new_page` открывает вкладки
+        (например, через пул браузера с лимитом страниц).
+        """
+        concurrency = concurrency or config.CATALOG_PAGE_CONCURRENCY
+        new_page = new_page or page.context.new_page
+        pages = [page] + [await new_page() for _ in range(concurrency - 1)]
+        seen = set()
+        page_num = start_page
+        try:
+            while True:
+                tasks = [
+                    asyncio.create_task(self._fetch_catalog_page(page_num + i, tab))
+                    for i, tab in enumerate(pages)
+                ]
+                finished = False
+                try:
+                    for i, task in enumerate(tasks):
+                        page_slugs = await task
+                        if page_slugs is None:
+                            finished = True
+                            break
+                        new_slugs = [slug for slug in page_slugs if slug not in seen]
+                        seen.update(new_slugs)
+                        print(f"  [+] Найдено {len(page_slugs)} аниме. Всего уникальных: {len(seen)}")
+                        yield page_num + i, new_slugs
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                if finished:
                     break
+                page_num += len(pages)
+        finally:
+            # Первая вкладка принадлежит вызывающему коду и закрывается им.
+            for tab in pages[1:]:
+                await tab.close()
 
-                page_slugs = set()
-                for link in links:
-                    href = link.get('href')
-                    if href and href.startswith('/') and not href.startswith(('/user/', '/news/')):
-                        slug = href.strip('/').split('/')[-1]
-                        page_slugs.add(slug)
-                
-                if not page_slugs:
-                    print(f"[*] На странице {page_num} не найдено подходящих слагов. Завершение.")
-                    break
-                
-                all_slugs.update(page_slugs)
-                print(f"  [+] Найдено {len(page_slugs)} аниме. Всего уникальных: {len(all_slugs)}")
-                page_num += 1
-                await asyncio.sleep(1) # Задержка между страницами
-
-            except Exception as e:
-                print(f"  [!] Ошибка при доступе к каталогу {catalog_url}: {e}")
-                break
+    async def _fetch_catalog_page(self, page_num, page):
+        """
+        Загружает одну страницу каталога и возвращает список слагов на ней
+        или None, если каталог закончился (или страница недоступна).
+        """
+        catalog_url = f"{self.base_url}/anime/"
+        if page_num > 1:
+            catalog_url = f"{self.base_url}/anime/page-{page_num}/"
         
-        return list(all_slugs)
+        print(f"[*] Анализ каталога: {catalog_url}")
+        try:
+            await self._goto(page, catalog_url, timeout=30000, wait_until='domcontentloaded')
+
+            # Проверяем, не перенаправило ли нас на главную (признак конца страниц)
+            if page_num > 1 and "page" not in page.url:
+                print(f"[*] Достигнут конец каталога (перенаправление на главную).")
+                return None
+
+            with stage('jutsu', 'page_content'):
+                html_content = await page.content()
+            await self._archive_page('catalog', catalog_url, html_content)
+            with stage('jutsu', 'html_parse'):
+                page_slugs = self.extractor.catalog_slugs(html_content)
+            if not page_slugs:
+                print(f"[*] На странице {page_num} не найдено ссылок на аниме. Завершение.")
+                return None
+            return page_slugs
+
+        except Exception as e:
+            print(f"  [!] Ошибка при доступе к каталогу {catalog_url}: {e}")
+            return None
 
     async def get_all_episode_links_for_anime(self, anime_slug, page):
         """Собирает все ссылки на эпизоды и сезоны для конкретного аниме."""
         anime_page_url = f"{self.base_url}/{anime_slug}/"
         print(f"[*] Анализ страницы аниме '{anime_slug}'...")
-        seasons = {}
         try:
-            await page.goto(anime_page_url, timeout=30000, wait_until='domcontentloaded')
-            html_content = await page.content()
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            season_tabs = soup.select('.the_season_tabs a')
-            if season_tabs:
-                for tab in season_tabs:
-                    season_title = tab.get_text(strip=True)
-                    season_match = re.search(r'(\d+)\s*сезон', season_title, re.IGNORECASE)
-                    season_number = int(season_match.group(1)) if season_match else 1
-                    
-                    season_content_id = tab['href'].replace('#', '')
-                    season_content = soup.find(id=season_content_id)
-                    if season_content:
-                        episode_links = [urljoin(self.base_url, a['href']) for a in season_content.select('a[href*="episode-"]')]
-                        seasons[season_number] = sorted(episode_links, key=lambda x: int(re.search(r'episode-(\d+)', x).group(1)))
-            else:
-                episode_links = [urljoin(self.base_url, a['href']) for a in soup.select('a[href*="episode-"]')]
-                if episode_links:
-                     seasons[1] = sorted(episode_links, key=lambda x: int(re.search(r'episode-(\d+)', x).group(1)))
-            
+            html_content = await self._fetch_html(anime_page_url) if self.fetch_mode == 'http' else None
+            if html_content is None:
+                await self._goto(page, anime_page_url, timeout=30000, wait_until='domcontentloaded')
+                with stage('jutsu', 'page_content'):
+                    html_content = await page.content()
+                await self._sync_browser_session(page)
+            await self._archive_page('anime', anime_page_url, html_content)
+
+            with stage('jutsu', 'html_parse'):
+                seasons = self.extractor.episode_links(html_content, self.base_url)
             print(f"  [+] Найдено {len(seasons)} сезонов и {sum(len(v) for v in seasons.values())} эпизодов.")
             return seasons
 
@@ -103,46 +162,86 @@ class JutsuScraper:
             return {}
 
     async def parse_episode_page(self, episode_url, page, anime_slug):
-        """Парсит страницу эпизода для получения метаданных."""
+        """
+        Парсит страницу эпизода для получения метаданных. В режиме 'http'
+        сначала пробует обычный HTTP-запрос и переходит на Playwright,
+        только если ответ похож на проверку Cloudflare.
+        """
         print(f"  [*] Парсинг данных: {episode_url}")
+        if self.fetch_mode == 'http':
+            html_content = await self._fetch_html(episode_url)
+            if html_content is not None:
+                window_vars = self._extract_window_vars(html_content)
+                return await self._build_episode_data(episode_url, html_content, window_vars, anime_slug)
+
+        return await self._parse_episode_page_browser(episode_url, page, anime_slug)
+
+    async def _parse_episode_page_browser(self, episode_url, page, anime_slug):
+        """Загружает страницу эпизода через Playwright и читает window-переменные."""
+        traffic = await self._track_page(page)
+        mode = traffic['mode']
+        traffic['bytes'] = traffic['blocked'] = 0
+        started_at = time.monotonic()
         try:
-            await page.goto(episode_url, timeout=20000, wait_until='networkidle')
+            if mode == 'fast':
+                await self._goto_episode_fast(page, episode_url)
+            else:
+                await self._goto(page, episode_url, timeout=20000, wait_until='networkidle')
         except Exception as e:
             print(f"    [!] Ошибка загрузки страницы эпизода: {e}")
             return None
+        self._record_page_load(mode, time.monotonic() - started_at, traffic)
         
-        html_content = await page.content()
-        soup = BeautifulSoup(html_content, 'html.parser')
+        with stage('jutsu', 'page_content'):
+            html_content = await page.content()
+        try:
+            with stage('jutsu', 'page_evaluate'):
+                window_vars = await page.evaluate("""() => {
+                    const data = {};
+                    const keys = [
+                        'video_duration', 'this_video_duration', 
+                        'video_intro_start', 'video_intro_end',
+                        'video_outro_start', 'video_outro_end',
+                        'next_episode_link'
+                    ];
+                    keys.forEach(key => {
+                        if (typeof window[key] !== 'undefined') {
+                            data[key] = window[key];
+                        }
+                    });
+                    return data;
+                }""")
+        except Exception as e:
+            print(f"    [!] Не удалось извлечь window переменные: {e}")
+            window_vars = {}
+
+        await self._sync_browser_session(page)
+        return await self._build_episode_data(episode_url, html_content, window_vars, anime_slug)
+
+    async def _build_episode_data(self, episode_url, html_content, window_vars, anime_slug):
+        """Собирает словарь данных эпизода из HTML и window-переменных и скачивает постер."""
+        await self._archive_page('episode', episode_url, html_content, window_vars)
+        data, poster_url = self.parse_episode_html(episode_url, html_content, window_vars)
+        if poster_url:
+            poster_path = await self._download_poster(poster_url)
+            if poster_path:
+                data['poster_local_path'] = poster_path
+        return data
+
+    def parse_episode_html(self, episode_url, html_content, window_vars):
+        """
+        Разбор страницы эпизода без сети (в т.ч. из архива страниц).
+        Возвращает (данные эпизода, URL постера или None).
+        """
         data = {'source_url': episode_url}
 
         match_ep = re.search(r'episode-(\d+)', episode_url)
         data['episode_number'] = int(match_ep.group(1)) if match_ep else 0
 
-        h1_title = soup.select_one('h1.header_video')
-        data['anime_title_rus'] = h1_title.get_text(strip=True).replace('Смотреть ', '').rsplit(' ', 2)[0] if h1_title else "N/A"
-        
-        episode_h2 = soup.select_one('h2.video_plate_title')
-        data['episode_title'] = episode_h2.get_text(strip=True) if episode_h2 else "N/A"
-        
-        try:
-            window_vars = await page.evaluate("""() => {
-                const data = {};
-                const keys = [
-                    'video_duration', 'this_video_duration', 
-                    'video_intro_start', 'video_intro_end',
-                    'video_outro_start', 'video_outro_end',
-                    'next_episode_link'
-                ];
-                keys.forEach(key => {
-                    if (typeof window[key] !== 'undefined') {
-                        data[key] = window[key];
-                    }
-                });
-                return data;
-            }""")
-        except Exception as e:
-            print(f"    [!] Не удалось извлечь window переменные: {e}")
-            window_vars = {}
+        with stage('jutsu', 'html_parse'):
+            fields = self.extractor.episode_fields(html_content)
+        data['anime_title_rus'] = fields['anime_title_rus']
+        data['episode_title'] = fields['episode_title']
 
         data['duration_sec'] = window_vars.get('video_duration') or window_vars.get('this_video_duration')
         data['opening_start_sec'] = window_vars.get('video_intro_start')
@@ -151,29 +250,263 @@ class JutsuScraper:
         data['ending_end_sec'] = window_vars.get('video_outro_end')
         next_link = window_vars.get('next_episode_link')
         data['next_episode_url'] = urljoin(self.base_url, next_link) if next_link and isinstance(next_link, str) else None
+        return data, fields['poster_url']
 
-        poster_url = soup.select_one('meta[property="og:image"]')['content'] if soup.select_one('meta[property="og:image"]') else None
-        if poster_url:
-            poster_path = os.path.join(self.output_dir, anime_slug, f"episode_{data['episode_number']}_poster.jpg")
-            if await self._download_image(poster_url, poster_path):
-                data['poster_local_path'] = poster_path
+    async def _archive_page(self, kind, url, html_content, window_vars=None):
+        """Сохраняет исходную страницу в архив (PAGE_ARCHIVE_ENABLED); сжатие и запись — вне event loop."""
+        if not config.PAGE_ARCHIVE_ENABLED:
+            return
+        if self.page_archive is None:
+            self.page_archive = PageArchive(config.PAGE_ARCHIVE_DIR, config.PAGE_ARCHIVE_SEGMENT_MB,
+                                            config.PAGE_ARCHIVE_COMPRESSION_LEVEL)
+        try:
+            await asyncio.to_thread(self.page_archive.append, kind, url, html_content, window_vars)
+        except Exception as e:
+            print(f"    [!] Не удалось сохранить страницу {url} в архив: {e}")
 
-        return data
+    def _extract_window_vars(self, html_content):
+        """
+        Достает window-переменные эпизода (video_duration, video_intro_*,
+        video_outro_*, next_episode_link) из текста inline-скриптов.
+        """
+        window_vars = {}
+        for match in WINDOW_VAR_RE.finditer(html_content):
+            key, raw = match.group(1), match.group(2)
+            if key in window_vars:
+                continue
+            if raw[0] in '"\'':
+                window_vars[key] = raw[1:-1].replace('\\/', '/')
+            elif raw in ('true', 'false'):
+                window_vars[key] = raw == 'true'
+            elif raw == 'null':
+                window_vars[key] = None
+            else:
+                number = float(raw)
+                window_vars[key] = int(number) if number.is_integer() else number
+        return window_vars
+
+    async def _goto(self, page, url, **kwargs):
+        """
+        page.goto в окне адаптивного ограничителя хоста: ответы 429/503
+        уменьшают окно и повторяются с отступом. 403/503 с cf-ray — это
+        проверка Cloudflare, ее браузер проходит сам: ждем ее завершения
+        вне окна хоста, и только если она не прошла, учитываем это как
+        перегрузку хоста.
+        """
+        async def attempt():
+            with stage('jutsu', 'page_goto'):
+                response = await page.goto(url, **kwargs)
+            if response is not None and not self._is_browser_challenge(response):
+                check_status(response.status, response.headers)
+            return response
+
+        response = await hosts.call(url, attempt)
+        if response is not None and self._is_browser_challenge(response):
+            with stage('jutsu', 'cloudflare_wait') as timer:
+                if not await self._wait_cloudflare_challenge(page):
+                    timer.outcome = 'cloudflare'
+                    hosts.for_url(url).record('throttled')
+                    print(f"    [!] Проверка Cloudflare на {url} не пройдена за "
+                          f"{config.CLOUDFLARE_CHALLENGE_TIMEOUT_SEC} сек.")
+        return response
+
+    @staticmethod
+    def _is_browser_challenge(response):
+        return response.status in (403, 503) and 'cf-ray' in response.headers
+
+    @staticmethod
+    async def _wait_cloudflare_challenge(page):
+        """
+        Ждет, пока страница проверки Cloudflare сменится целевой (проверка
+        перезагружает страницу сама). False, если не дождались за
+        CLOUDFLARE_CHALLENGE_TIMEOUT_SEC.
+        """
+        deadline = time.monotonic() + config.CLOUDFLARE_CHALLENGE_TIMEOUT_SEC
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            try:
+                await page.wait_for_load_state('domcontentloaded')
+                html_content = await page.content()
+            except Exception:
+                # Контекст выполнения сменился посреди навигации — проверим снова
+                continue
+            if not any(marker in html_content for marker in CLOUDFLARE_MARKERS):
+                return True
+        return False
+
+    async def _fetch_html(self, url):
+        """
+        Загружает страницу обычным HTTP-запросом. Возвращает None, если
+        ответ похож на проверку Cloudflare или запрос не удался, — тогда
+        вызывающий код переходит на Playwright.
+        """
+        session = await self._get_session()
+        headers = {'User-Agent': self._browser_user_agent} if self._browser_user_agent else None
+
+        async def attempt():
+            with stage('jutsu', 'http_get') as timer:
+                async with session.get(url, headers=headers, timeout=15) as response:
+                    html_content = await response.text(errors='replace')
+                    challenge = self._is_cloudflare_challenge(response, html_content)
+                    if challenge:
+                        timer.outcome = 'cloudflare'
+                    else:
+                        check_status(response.status, response.headers)
+                        response.raise_for_status()
+            if challenge:
+                # Проверку пройдет браузер, но для хоста это сигнал снизить нагрузку
+                raise HostThrottled('cloudflare', retriable=False)
+            return html_content
 
-    async def _download_image(self, url, save_path):
-        """Асинхронно скачивает изображение."""
         try:
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=15) as response:
-                    response.raise_for_status()
-                    with open(save_path, 'wb') as f:
-                        while True:
-                            chunk = await response.content.read(8192)
-                            if not chunk:
-                                break
-                            f.write(chunk)
+            return await hosts.call(url, attempt)
+        except HostThrottled as e:
+            if e.reason != 'cloudflare':
+                print(f"    [!] HTTP-запрос к {url} не удался ({e}), переход на Playwright.")
+            else:
+                print(f"    [!] Cloudflare-проверка на {url}, переход на Playwright.")
+            return None
+        except Exception as e:
+            print(f"    [!] HTTP-запрос к {url} не удался ({e}), переход на Playwright.")
+            return None
+
+    @staticmethod
+    def _is_cloudflare_challenge(response, html_content):
+        if response.status in (403, 429, 503) and (
+                'cf-ray' in response.headers or 'cloudflare' in response.headers.get('Server', '').lower()):
             return True
+        return any(marker in html_content for marker in CLOUDFLARE_MARKERS)
+
+    async def _sync_browser_session(self, page):
+        """
+        Переносит cookies (в т.ч. cf_clearance) и User-Agent успешной
+        Playwright-сессии в HTTP-сессию, чтобы следующие запросы прошли без браузера.
+        """
+        if self.fetch_mode != 'http':
+            return
+        try:
+            cookies = await page.context.cookies(self.base_url)
+            if self._browser_user_agent is None:
+                self._browser_user_agent = await page.evaluate("() => navigator.userAgent")
         except Exception as e:
-            print(f"      [!] Ошибка скачивания {url}: {e}")
-            return False
+            print(f"    [!] Не удалось получить cookies браузера: {e}")
+            return
+
+        jar = SimpleCookie()
+        for cookie in cookies:
+            jar[cookie['name']] = cookie['value']
+            jar[cookie['name']]['domain'] = cookie['domain']
+            jar[cookie['name']]['path'] = cookie.get('path', '/')
+        session = await self._get_session()
+        session.cookie_jar.update_cookies(jar)
+
+    def _is_first_party(self, url):
+        host = urlparse(url).hostname or ''
+        base_host = urlparse(self.base_url).hostname or ''
+        return host == base_host or host.endswith('.' + base_host)
+
+    async def _track_page(self, page):
+        """
+        Один раз на страницу подключает учет трафика, а в быстром режиме
+        еще и перехват запросов, блокирующий медиа, картинки, шрифты
+        и сторонние хосты. Режим выбирается для вкладки один раз: в быстром
+        режиме каждая EPISODE_FAST_MODE_CONTROL_EVERY-я вкладка остается
+        обычной, чтобы в одном процессе были замеры обоих режимов.
+        """
+        traffic = self._page_traffic.get(page)
+        if traffic is not None:
+            return traffic
+
+        self._pages_tracked += 1
+        control_every = config.EPISODE_FAST_MODE_CONTROL_EVERY
+        fast = self.fast_mode and not (control_every and self._pages_tracked % control_every == 0)
+        traffic = {'bytes': 0, 'blocked': 0, 'mode': 'fast' if fast else 'normal'}
+        self._page_traffic[page] = traffic
+
+        async def on_request_finished(request):
+            try:
+                sizes = await request.sizes()
+                traffic['bytes'] += sizes['responseBodySize'] + sizes['responseHeadersSize']
+            except Exception:
+                pass
+
+        page.on('requestfinished', on_request_finished)
+
+        if fast:
+            async def route_handler(route):
+                request = route.request
+                if (request.resource_type in config.FAST_MODE_BLOCKED_RESOURCES
+                        or not self._is_first_party(request.url)):
+                    traffic['blocked'] += 1
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await page.route('**/*', route_handler)
+
+        return traffic
+
+    async def _goto_episode_fast(self, page, episode_url):
+        """
+        Загружает страницу эпизода без ожидания networkidle: ждем только
+        появления нужных window-переменных и заголовка h1.header_video.
+        """
+        await self._goto(page, episode_url, timeout=20000, wait_until='domcontentloaded')
+        await page.wait_for_selector('h1.header_video', state='attached', timeout=10000)
+        try:
+            await page.wait_for_function(
+                "() => typeof window.video_duration !== 'undefined'"
+                " || typeof window.this_video_duration !== 'undefined'",
+                timeout=5000
+            )
+        except Exception:
+            # У некоторых эпизодов переменных нет — разбираем то, что есть
+            print(f"    [!] window.video_* переменные не появились: {episode_url}")
+
+    def _record_page_load(self, mode, elapsed, traffic):
+        stats = self.page_load_stats[mode]
+        stats['pages'] += 1
+        stats['total_time'] += elapsed
+        stats['total_bytes'] += traffic['bytes']
+        stats['blocked_requests'] += traffic['blocked']
+        print(f"    [+] Страница загружена за {elapsed:.2f} сек, {traffic['bytes'] / 1024:.0f} КБ "
+              f"(режим: {mode}, заблокировано запросов: {traffic['blocked']})")
+
+    def get_page_load_stats(self):
+        """
+        Сводка по времени и трафику на страницу эпизода для обоих режимов.
+        bytes_saved_per_page считается, когда есть замеры в обоих режимах
+        (в быстром режиме обычные замеры дают контрольные вкладки).
+        """
+        report = {}
+        for mode, stats in self.page_load_stats.items():
+            pages = stats['pages']
+            report[mode] = {
+                'pages': pages,
+                'avg_time_sec': round(stats['total_time'] / pages, 3) if pages else None,
+                'avg_bytes': stats['total_bytes'] // pages if pages else None,
+                'blocked_requests': stats['blocked_requests'],
+            }
+        if report['normal']['pages'] and report['fast']['pages']:
+            report['bytes_saved_per_page'] = report['normal']['avg_bytes'] - report['fast']['avg_bytes']
+        return report
+
+    async def _download_poster(self, url):
+        """Скачивает постер в хранилище (с дедупликацией и условным GET) и возвращает путь к файлу."""
+        if self.poster_store is None:
+            self.poster_store = PosterStore(self.output_dir)
+        session = await self._get_session()
+        with stage('jutsu', 'poster_download') as timer:
+            path = await self.poster_store.fetch(session, url)
+            if path is None:
+                timer.outcome = 'error'
+        count('jutsu', 'poster', 'ok' if path else 'error')
+        return path
+
+    async def close(self):
+        await super().close()
+        if self.poster_store is not None:
+            await self.poster_store.close()
+        if self.page_archive is not None:
+            self.page_archive.close()
+            self.page_archive = None
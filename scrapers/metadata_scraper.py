@@ -1,52 +1,109 @@
 # scrapers/metadata_scraper.py
 import asyncio
-import aiohttp
 import config
+from core.metrics import stage, count
+from .host_limiter import hosts, check_status, parse_retry_after, HostThrottled
+from .http_client import SessionOwner
+from .jikan_cache import JikanCache
+from .rate_limiter import RateLimiter
 
-class MetadataScraper:
+class MetadataScraper(SessionOwner):
     """
     Получает расширенные метаданные об аниме из Jikan API.
+    Ответы кэшируются на диске, а запросы проходят через общий
+    ограничитель частоты, поэтому воркеры делят квоту Jikan между собой.
     """
     def __init__(self):
         self.api_url = config.JIKAN_API_URL
+        self._init_session()
+        self.cache = None  # файл кэша открывается при первом обращении
+        self.rate_limiter = RateLimiter(
+            (config.JIKAN_RATE_PER_SECOND, 1),
+            (config.JIKAN_RATE_PER_MINUTE, 60)
+        )
+
+    def _get_cache(self):
+        if self.cache is None:
+            self.cache = JikanCache(
+                config.JIKAN_CACHE_PATH,
+                ttl=config.JIKAN_CACHE_TTL_HOURS * 3600,
+                negative_ttl=config.JIKAN_NEGATIVE_CACHE_TTL_HOURS * 3600
+            )
+        return self.cache
+
+    async def close(self):
+        await super().close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
 
     async def get_anime_details(self, anime_title_rus):
         """
         Ищет аниме по русскому названию и возвращает детальную информацию.
         """
+        cached, details = await asyncio.to_thread(self._get_cache().get, anime_title_rus)
+        if cached:
+            print(f"[*] Метаданные для '{anime_title_rus}' взяты из кэша.")
+            count('jikan', 'lookup', 'cache_hit')
+            return details
+
+        # Время вызова включает ожидание ограничителей и повторы после 429/503
+        with stage('jikan', 'jikan_call') as timer:
+            timer.outcome, details = await self._search(anime_title_rus)
+        count('jikan', 'lookup', timer.outcome)
+        return details
+
+    async def _search(self, anime_title_rus):
+        """
+        Запрос к Jikan API. Возвращает (исход, детали): исход — 'ok',
+        'not_found', 'http_<статус>' или 'error'.
+        """
         print(f"[*] Поиск метаданных для '{anime_title_rus}' в Jikan API...")
         search_url = f"{self.api_url}/anime"
         params = {'q': anime_title_rus, 'limit': 1}
 
+        async def attempt():
+            await self.rate_limiter.acquire()
+            async with session.get(search_url, params=params, timeout=10) as response:
+                if response.status == 429:
+                    # Квота общая: ведра опустошаются до Retry-After для всех воркеров
+                    self.rate_limiter.pause(parse_retry_after(response.headers.get('Retry-After')) or 0)
+                check_status(response.status, response.headers)
+                if response.status != 200:
+                    print(f"  [!] Jikan API вернул статус {response.status}")
+                    return f"http_{response.status}", None
+                return 'ok', await response.json()
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url, params=params, timeout=10) as response:
-                    if response.status != 200:
-                        print(f"  [!] Jikan API вернул статус {response.status}")
-                        return None
-                    
-                    search_results = await response.json()
-                    if not search_results.get('data'):
-                        print(f"  [!] Аниме '{anime_title_rus}' не найдено в Jikan API.")
-                        return None
-
-                    anime_data = search_results['data'][0]
-                    print(f"  [+] Найдено: {anime_data.get('title')}")
-
-                    return {
-                        'title_orig': anime_data.get('title_japanese'),
-                        'description_api': anime_data.get('synopsis'),
-                        'poster_url_api': anime_data.get('images', {}).get('jpg', {}).get('large_image_url'),
-                        'age_rating': anime_data.get('rating'),
-                        'status': anime_data.get('status'),
-                        'year': anime_data.get('year'),
-                        'score': anime_data.get('score'),
-                        'type': anime_data.get('type'),
-                        'genres': [genre['name'] for genre in anime_data.get('genres', [])]
-                    }
+            session = await self._get_session()
+            try:
+                outcome, search_results = await hosts.call(search_url, attempt, retries=config.JIKAN_MAX_RETRIES)
+            except HostThrottled as e:
+                return e.reason, None
+            if outcome != 'ok':
+                return outcome, None
+
+            if not search_results.get('data'):
+                print(f"  [!] Аниме '{anime_title_rus}' не найдено в Jikan API.")
+                await asyncio.to_thread(self._get_cache().set, anime_title_rus, None)
+                return 'not_found', None
+
+            anime_data = search_results['data'][0]
+            print(f"  [+] Найдено: {anime_data.get('title')}")
+
+            details = {
+                'title_orig': anime_data.get('title_japanese'),
+                'description_api': anime_data.get('synopsis'),
+                'poster_url_api': anime_data.get('images', {}).get('jpg', {}).get('large_image_url'),
+                'age_rating': anime_data.get('rating'),
+                'status': anime_data.get('status'),
+                'year': anime_data.get('year'),
+                'score': anime_data.get('score'),
+                'type': anime_data.get('type'),
+                'genres': [genre['name'] for genre in anime_data.get('genres', [])]
+            }
+            await asyncio.to_thread(self._get_cache().set, anime_title_rus, details)
+            return 'ok', details
         except Exception as e:
             print(f"  [!] Ошибка при работе с Jikan API: {e}")
-            return None
-        finally:
-            await asyncio.sleep(1) # Соблюдаем rate limit Jikan API
-
+            return 'error', None
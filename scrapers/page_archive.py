@@ -0,0 +1,202 @@
+# scrapers/page_archive.py
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from datetime import datetime
+
+# Заголовок записи в сегменте: сигнатура и длина сжатого тела
+RECORD_HEADER = struct.Struct('>4sI')
+RECORD_MAGIC = b'PGA1'
+
+
+class PageArchive:
+    """
+    Архив исходных страниц jut.su (каталог, аниме, эпизоды): HTML и снимок
+    window-переменных эпизода. Записи только дописываются в сегменты
+    (segments/000001.seg, ...), каждая сжата zlib отдельно и описывает
+    себя сама; индекс по URL — в index.sqlite3 и при потере
+    восстанавливается из сегментов (reindex). Страница, не изменившаяся с
+    прошлой записи, повторно не пишется.
+    По архиву core/reparse.py пересобирает строки Anime/Episode без сети.
+    """
+    def __init__(self, root_dir, segment_size_mb=256, compression_level=6):
+        self.root_dir = root_dir
+        self.segments_dir = os.path.join(root_dir, 'segments')
+        self.segment_size = segment_size_mb * 1024 * 1024
+        self.compression_level = compression_level
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root_dir, 'index.sqlite3'), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " id INTEGER PRIMARY KEY, url TEXT NOT NULL, kind TEXT NOT NULL, fetched_at TEXT NOT NULL,"
+            " sha1 TEXT NOT NULL, segment INTEGER NOT NULL, offset INTEGER NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_url ON pages (url, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_kind ON pages (kind)")
+        self._conn.commit()
+        self._segment = None
+        self._segment_num = None
+        self.stats = {'appended': 0, 'unchanged': 0, 'bytes_raw': 0, 'bytes_stored': 0}
+
+    def _segment_path(self, num):
+        return os.path.join(self.segments_dir, f"{num:06d}.seg")
+
+    def _segment_numbers(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.segments_dir) if name.endswith('.seg'))
+
+    def _open_segment(self, size_needed):
+        """Текущий сегмент для дописывания; новый, если текущий заполнен."""
+        if self._segment is None:
+            numbers = self._segment_numbers()
+            self._segment_num = numbers[-1] if numbers else 1
+            if numbers:
+                self._trim_segment_tail()
+            self._segment = open(self._segment_path(self._segment_num), 'ab')
+        if self._segment.tell() and self._segment.tell() + size_needed > self.segment_size:
+            self._segment.close()
+            self._segment_num += 1
+            self._segment = open(self._segment_path(self._segment_num), 'ab')
+        return self._segment
+
+    def _trim_segment_tail(self):
+        """
+        Перед дописыванием в последний сегмент отрезает хвост после последней
+        проиндексированной записи (сбой посреди записи), иначе новые записи
+        окажутся за мусором. Непроиндексированный сегмент не трогается —
+        записи пойдут в новый.
+        """
+        path = self._segment_path(self._segment_num)
+        end = self._conn.execute(
+            "SELECT MAX(offset + size) FROM pages WHERE segment = ?", (self._segment_num,)
+        ).fetchone()[0]
+        if end is None:
+            if os.path.getsize(path):
+                self._segment_num += 1
+        elif os.path.getsize(path) > end + RECORD_HEADER.size:
+            print(f"[!] Архив страниц: отрезан недописанный хвост сегмента {self._segment_num}.")
+            os.truncate(path, end + RECORD_HEADER.size)
+
+    def append(self, kind, url, html_content, window_vars=None):
+        """
+        Дописывает страницу в архив. Возвращает False, если она не
+        изменилась с последней записи этого URL.
+        """
+        sha1 = hashlib.sha1(html_content.encode('utf-8')).hexdigest()
+        fetched_at = datetime.utcnow().isoformat(timespec='seconds')
+        body = zlib.compress(json.dumps({
+            'kind': kind, 'url': url, 'fetched_at': fetched_at,
+            'window_vars': window_vars, 'html': html_content,
+        }, ensure_ascii=False).encode('utf-8'), self.compression_level)
+
+        with self._lock:
+            last = self._conn.execute(
+                "SELECT sha1 FROM pages WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+            ).fetchone()
+            # window-переменные берутся из той же страницы, поэтому достаточно хэша HTML
+            if last and last[0] == sha1:
+                self.stats['unchanged'] += 1
+                return False
+            segment = self._open_segment(RECORD_HEADER.size + len(body))
+            offset = segment.tell()
+            segment.write(RECORD_HEADER.pack(RECORD_MAGIC, len(body)) + body)
+            segment.flush()
+            # Индекс пишется после данных: запись без индекса отрежет _trim_segment_tail
+            self._conn.execute(
+                "INSERT INTO pages (url, kind, fetched_at, sha1, segment, offset, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, fetched_at, sha1, self._segment_num, offset, len(body))
+            )
+            self._conn.commit()
+            self.stats['appended'] += 1
+            self.stats['bytes_raw'] += len(html_content)
+            self.stats['bytes_stored'] += RECORD_HEADER.size + len(body)
+        return True
+
+    def latest_locations(self, kind):
+        """{url: (сегмент, смещение, размер)} последних версий страниц вида `kind`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, segment, offset, size FROM pages"
+                " WHERE id IN (SELECT MAX(id) FROM pages WHERE kind = ? GROUP BY url)", (kind,)
+            ).fetchall()
+        return {url: (segment, offset, size) for url, segment, offset, size in rows}
+
+    def read(self, location):
+        """Читает запись по (сегмент, смещение, размер): dict с url, kind, fetched_at, html, window_vars."""
+        segment, offset, size = location
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            data = f.read(RECORD_HEADER.size + size)
+        magic, length = RECORD_HEADER.unpack_from(data)
+        if magic != RECORD_MAGIC or length != size:
+            raise ValueError(f"Поврежденная запись архива: сегмент {segment}, смещение {offset}")
+        return json.loads(zlib.decompress(data[RECORD_HEADER.size:]))
+
+    def get(self, url):
+        """Последняя версия страницы по URL или None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, size FROM pages WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+            ).fetchone()
+        return self.read(row) if row else None
+
+    def _scan_segment(self, num):
+        """Записи сегмента по порядку; на недописанном хвосте (сбой при записи) останавливается."""
+        with open(self._segment_path(num), 'rb') as f:
+            while True:
+                offset = f.tell()
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                magic, length = RECORD_HEADER.unpack(header)
+                body = f.read(length)
+                if magic != RECORD_MAGIC or len(body) < length:
+                    print(f"[!] Сегмент {num}: запись на смещении {offset} не дописана, остаток пропущен.")
+                    return
+                try:
+                    record = json.loads(zlib.decompress(body))
+                except (zlib.error, ValueError):
+                    print(f"[!] Сегмент {num}: поврежденная запись на смещении {offset}, пропуск.")
+                    continue
+                yield offset, length, record
+
+    def reindex(self):
+        """Заново строит индекс по содержимому сегментов. Возвращает число записей."""
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            self._conn.execute("DELETE FROM pages")
+            total = 0
+            for num in self._segment_numbers():
+                rows = [
+                    (record['url'], record['kind'], record['fetched_at'],
+                     hashlib.sha1(record['html'].encode('utf-8')).hexdigest(), num, offset, length)
+                    for offset, length, record in self._scan_segment(num)
+                ]
+                self._conn.executemany(
+                    "INSERT INTO pages (url, kind, fetched_at, sha1, segment, offset, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                total += len(rows)
+            self._conn.commit()
+        return total
+
+    def get_stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT kind, COUNT(DISTINCT url) FROM pages GROUP BY kind").fetchall())
+        return {
+            **self.stats, 'urls': counts, 'segments': len(self._segment_numbers()),
+            'disk_bytes': sum(os.path.getsize(self._segment_path(num)) for num in self._segment_numbers()),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            self._conn.close()
@@ -0,0 +1,168 @@
+# scrapers/poster_store.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import config
+from .host_limiter import hosts, check_status
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow — необязательная зависимость, без нее миниатюры не создаются
+    Image = None
+
+
+def _make_thumbnail(src_path, dst_path, width):
+    """Создает WebP-миниатюру. Выполняется в отдельном процессе."""
+    with Image.open(src_path) as image:
+        image.thumbnail((width, width * 10))
+        tmp_path = dst_path + '.tmp'
+        image.save(tmp_path, 'WEBP', quality=config.POSTER_THUMBNAIL_QUALITY)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+class PosterStore:
+    """
+    Хранилище постеров с адресацией по содержимому: файл называется по
+    sha256 своих байт, поэтому одинаковые картинки разных эпизодов
+    хранятся один раз. Для каждого URL в индексе запоминаются ETag и
+    Last-Modified, и повторная загрузка идет условным GET (304 — без тела).
+    WebP-миниатюры создаются в пуле процессов, вне event loop.
+    """
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, 'objects')
+        self.thumbs_dir = os.path.join(root_dir, 'thumbs')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.thumbs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root_dir, 'index.sqlite3'), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posters ("
+            " url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, path TEXT NOT NULL,"
+            " etag TEXT, last_modified TEXT)"
+        )
+        self._conn.commit()
+        self._executor = None
+        self._thumbnails_in_progress = {}
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'deduplicated': 0, 'thumbnails': 0}
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT sha256, path, etag, last_modified FROM posters WHERE url = ?", (url,)
+            ).fetchone()
+
+    def local_path(self, url):
+        """Путь к уже скачанному постеру по URL или None — без сети (для переразбора архива страниц)."""
+        known = self._lookup(url)
+        return known[1] if known and os.path.exists(known[1]) else None
+
+    def _remember(self, url, sha256, path, etag, last_modified):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posters (url, sha256, path, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (url, sha256, path, etag, last_modified)
+            )
+            self._conn.commit()
+
+    def _object_path(self, sha256, url):
+        ext = os.path.splitext(url.split('?', 1)[0])[1].lower()
+        if ext not in ('.jpg', '.jpeg', '.png', '.webp', '.gif'):
+            ext = '.jpg'
+        return os.path.join(self.objects_dir, sha256[:2], sha256 + ext)
+
+    def _write_object(self, path, body):
+        """Пишет файл атомарно; если такой объект уже есть — ничего не делает."""
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return True
+
+    async def fetch(self, session, url):
+        """
+        Возвращает локальный путь к постеру по URL, скачивая его только
+        при необходимости. Возвращает None при ошибке загрузки.
+        """
+        known = await asyncio.to_thread(self._lookup, url)
+        headers = {}
+        if known and os.path.exists(known[1]):
+            if known[2]:
+                headers['If-None-Match'] = known[2]
+            if known[3]:
+                headers['If-Modified-Since'] = known[3]
+
+        async def download():
+            async with session.get(url, headers=headers, timeout=15) as response:
+                if response.status == 304 and known:
+                    return None
+                check_status(response.status, response.headers)
+                response.raise_for_status()
+                return await response.read(), response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+        try:
+            downloaded = await hosts.call(url, download)
+        except Exception as e:
+            print(f"      [!] Ошибка скачивания {url}: {e}")
+            return None
+        if downloaded is None:
+            self.stats['not_modified'] += 1
+            return known[1]
+        body, etag, last_modified = downloaded
+
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = self._object_path(sha256, url)
+        if await asyncio.to_thread(self._write_object, path, body):
+            self.stats['downloaded'] += 1
+        else:
+            self.stats['deduplicated'] += 1
+        await asyncio.to_thread(self._remember, url, sha256, path, etag, last_modified)
+        self._schedule_thumbnail(path)
+        return path
+
+    def thumbnail_path(self, poster_path):
+        name = os.path.splitext(os.path.basename(poster_path))[0]
+        return os.path.join(self.thumbs_dir, f"{name}_{config.POSTER_THUMBNAIL_WIDTH}.webp")
+
+    def _schedule_thumbnail(self, poster_path):
+        """Ставит создание миниатюры в пул процессов, не дожидаясь результата."""
+        if Image is None or not config.POSTER_THUMBNAIL_WIDTH:
+            return
+        thumb_path = self.thumbnail_path(poster_path)
+        if thumb_path in self._thumbnails_in_progress or os.path.exists(thumb_path):
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=config.POSTER_THUMBNAIL_PROCESSES)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor, _make_thumbnail, poster_path, thumb_path, config.POSTER_THUMBNAIL_WIDTH
+        )
+        self._thumbnails_in_progress[thumb_path] = future
+
+        def on_done(done):
+            self._thumbnails_in_progress.pop(thumb_path, None)
+            # Отменяется при остановке цикла событий; exception() тогда сам поднимает CancelledError
+            if done.cancelled():
+                return
+            if done.exception():
+                print(f"      [!] Не удалось создать миниатюру {thumb_path}: {done.exception()}")
+            else:
+                self.stats['thumbnails'] += 1
+
+        future.add_done_callback(on_done)
+
+    async def close(self):
+        """Дожидается незавершенных миниатюр и останавливает пул процессов."""
+        if self._thumbnails_in_progress:
+            await asyncio.gather(*self._thumbnails_in_progress.values(), return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,57 @@
+# scrapers/rate_limiter.py
+import asyncio
+import time
+from collections import deque
+
+
+class SlidingWindow:
+    """
+    Скользящее окно: не больше `capacity` запросов за любые `period`
+    секунд. Хранит время последних запросов, поэтому, в отличие от ведра
+    токенов, начальный запас и восполнение вместе не превышают лимит.
+    """
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.timestamps = deque()
+        self.resume_at = 0.0
+
+    def wait_time(self):
+        """Сколько секунд ждать до следующего разрешенного запроса (0, если можно сразу)."""
+        now = time.monotonic()
+        while self.timestamps and self.timestamps[0] <= now - self.period:
+            self.timestamps.popleft()
+        delay = self.resume_at - now
+        if len(self.timestamps) >= self.capacity:
+            delay = max(delay, self.timestamps[0] + self.period - now)
+        return max(0.0, delay)
+
+    def consume(self):
+        self.timestamps.append(time.monotonic())
+
+
+class RateLimiter:
+    """
+    Ограничитель запросов из нескольких окон сразу (например, 3 в секунду
+    и 60 в минуту). Один экземпляр разделяется всеми воркерами, поэтому
+    суммарно они не превышают квоту.
+    """
+    def __init__(self, *limits):
+        self.windows = [SlidingWindow(capacity, period) for capacity, period in limits]
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                delay = max(window.wait_time() for window in self.windows)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            for window in self.windows:
+                window.consume()
+
+    def pause(self, seconds):
+        """Следующий запрос уйдет не раньше чем через `seconds` (для Retry-After)."""
+        resume_at = time.monotonic() + seconds
+        for window in self.windows:
+            window.resume_at = max(window.resume_at, resume_at)
@@ -0,0 +1,30 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Модули репозитория импортируются от корня (import config, from database import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from database.db_manager import db_manager  # noqa: E402
+
+
+def _reset_db_manager():
+    if db_manager._engine is not None:
+        db_manager._engine.dispose()
+    db_manager._engine = None
+    db_manager._search_backend = None
+    for cache in db_manager._name_id_cache.values():
+        cache.clear()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Чистая SQLite-БД во временном каталоге вместо MySQL."""
+    monkeypatch.setattr(config, 'DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    _reset_db_manager()
+    db_manager.initialize()
+    yield db_manager
+    _reset_db_manager()
@@ -0,0 +1,41 @@
+# tests/test_db_manager.py
+from sqlalchemy import text, select, inspect
+
+from database.models import Season, Episode
+
+
+def _reopen(db):
+    """Повторная инициализация, как при следующем старте приложения."""
+    db._engine.dispose()
+    db._engine = None
+    db.initialize()
+
+
+def test_duplicate_seasons_are_merged_before_unique_index(sqlite_db):
+    # Старая БД: таблица сезонов без уникального индекса и с дублями
+    with sqlite_db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE seasons"))
+        conn.execute(text("CREATE TABLE seasons (id INTEGER PRIMARY KEY, anime_id INTEGER NOT NULL,"
+                          " season_number INTEGER NOT NULL, title VARCHAR(255))"))
+        conn.execute(text("INSERT INTO anime (id, slug, title_rus) VALUES (1, 'foo', 'Фу')"))
+        conn.execute(text("INSERT INTO seasons (id, anime_id, season_number) VALUES (1, 1, 1), (2, 1, 1), (3, 1, 2)"))
+        conn.execute(Episode.__table__.insert(), [
+            {'anime_id': 1, 'season_id': 1, 'episode_number': 1, 'source_url': 'u1'},
+            {'anime_id': 1, 'season_id': 2, 'episode_number': 2, 'source_url': 'u2'},
+            {'anime_id': 1, 'season_id': 3, 'episode_number': 1, 'source_url': 'u3'},
+        ])
+
+    _reopen(sqlite_db)
+
+    indexes = {index['name'] for index in inspect(sqlite_db.engine).get_indexes('seasons')}
+    assert 'uq_seasons_anime_season' in indexes
+    with sqlite_db.session_scope() as session:
+        assert session.execute(select(Season.id, Season.season_number).order_by(Season.id)).all() == [(1, 1), (3, 2)]
+        assert dict(session.execute(select(Episode.source_url, Episode.season_id)).all()) == {
+            'u1': 1, 'u2': 1, 'u3': 3}
+
+    # Upsert сезонов опирается на уникальный индекс
+    sqlite_db.save_episodes(1, {1: [{'episode_number': 3, 'source_url': 'u4'}],
+                                3: [{'episode_number': 1, 'source_url': 'u5'}]})
+    with sqlite_db.session_scope() as session:
+        assert session.execute(select(Season.season_number).order_by(Season.season_number)).scalars().all() == [1, 2, 3]
@@ -0,0 +1,38 @@
+# tests/test_export.py
+from database import export
+from database.models import Genre, Anime, anime_genres_table
+
+
+def test_iter_table_rows_pages_by_primary_key(sqlite_db):
+    with sqlite_db.session_scope() as session:
+        session.execute(Genre.__table__.insert(), [{'name': f"genre-{i:02d}"} for i in range(10)])
+
+    rows = list(export.iter_table_rows(Genre.__table__, chunk_size=3))
+
+    assert [row['name'] for row in rows] == [f"genre-{i:02d}" for i in range(10)]
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+
+def test_iter_table_rows_exact_multiple_of_chunk(sqlite_db):
+    with sqlite_db.session_scope() as session:
+        session.execute(Genre.__table__.insert(), [{'name': f"g{i}"} for i in range(6)])
+
+    assert len(list(export.iter_table_rows(Genre.__table__, chunk_size=3))) == 6
+
+
+def test_iter_table_rows_composite_key(sqlite_db):
+    with sqlite_db.session_scope() as session:
+        session.execute(Anime.__table__.insert(), [{'slug': f"a{i}", 'title_rus': f"A{i}"} for i in range(1, 4)])
+        session.execute(Genre.__table__.insert(), [{'name': f"g{i}"} for i in range(1, 4)])
+        session.execute(anime_genres_table.insert(), [
+            {'anime_id': anime_id, 'genre_id': genre_id} for anime_id in (1, 2, 3) for genre_id in (3, 1, 2)
+        ])
+
+    rows = list(export.iter_table_rows(anime_genres_table, chunk_size=2))
+
+    keys = [(row['anime_id'], row['genre_id']) for row in rows]
+    assert keys == sorted((a, g) for a in (1, 2, 3) for g in (1, 2, 3))
+
+
+def test_iter_table_rows_empty_table(sqlite_db):
+    assert list(export.iter_table_rows(Genre.__table__, chunk_size=5)) == []
@@ -0,0 +1,127 @@
+# tests/test_host_limiter.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from scrapers import host_limiter
+from scrapers.host_limiter import (AdaptiveHostLimiter, HostLimiters, HostThrottled, check_status,
+                                   parse_retry_after)
+
+
+class ClientError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    in_30s = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(in_30s) <= 30
+
+
+def test_check_status():
+    check_status(200, {})
+    with pytest.raises(HostThrottled) as e:
+        check_status(429, {'retry-after': '7'})
+    assert (e.value.reason, e.value.retry_after) == ('http_429', 7.0)
+
+
+def test_window_grows_only_when_saturated():
+    limiter = AdaptiveHostLimiter('example.test', initial=4, min_limit=1, max_limit=5)
+    limiter.record('ok', 0.1, saturated=False)
+    assert limiter.limit == 4
+    limiter.record('ok', 0.1, saturated=True)
+    assert limiter.limit == pytest.approx(4.25)
+    for _ in range(20):
+        limiter.record('ok', 0.1, saturated=True)
+    assert limiter.limit == 5
+
+
+def test_throttle_halves_window_once_per_rtt_and_pauses():
+    limiter = AdaptiveHostLimiter('example.test', initial=8, min_limit=1, max_limit=16)
+    limiter.record('ok', 0.5, saturated=False)
+    limiter.record('throttled', retry_after=5)
+    assert limiter.limit == 4
+    assert 4 < limiter.get_stats()['paused_sec'] <= 5
+    # Пачка 429 от одновременных запросов — один сигнал за время ответа
+    limiter.record('throttled', retry_after=5)
+    assert limiter.limit == 4
+    limiter._last_decrease = 0.0
+    limiter.record('throttled', retry_after=5)
+    assert limiter.limit == 2
+    assert limiter.stats['decreases'] == 2
+
+
+def test_window_never_below_min_limit():
+    limiter = AdaptiveHostLimiter('example.test', initial=2, min_limit=1, max_limit=4)
+    for _ in range(5):
+        limiter._last_decrease = 0.0
+        limiter.record('timeout', retry_after=0)
+    assert limiter.limit == 1
+
+
+def test_latency_growth_shrinks_window_gently():
+    limiter = AdaptiveHostLimiter('example.test', initial=10, min_limit=1, max_limit=20)
+    limiter.record('ok', 0.1)
+    for _ in range(10):
+        limiter._last_decrease = 0.0
+        limiter.record('ok', 2.0)
+        if limiter.limit < 10:
+            break
+    assert limiter.limit == pytest.approx(9.0)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(host_limiter, 'backoff_delay', lambda attempt: 0.0)
+
+
+def test_call_retries_throttled_then_succeeds(no_backoff):
+    hosts = HostLimiters()
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) < 3:
+            raise HostThrottled('http_503')
+        return 'page'
+
+    assert asyncio.run(hosts.call('https://example.test/a', attempt, retries=2)) == 'page'
+    stats = hosts.get_stats()['example.test']
+    assert (stats['throttled'], stats['ok'], stats['retries']) == (2, 1, 2)
+
+
+def test_call_does_not_retry_client_errors_or_non_retriable(no_backoff):
+    hosts = HostLimiters()
+    calls = []
+
+    async def not_found():
+        calls.append('404')
+        raise ClientError(404)
+
+    async def challenge():
+        calls.append('cf')
+        raise HostThrottled('cloudflare', retriable=False)
+
+    with pytest.raises(ClientError):
+        asyncio.run(hosts.call('https://example.test/a', not_found, retries=3))
+    with pytest.raises(HostThrottled):
+        asyncio.run(hosts.call('https://example.test/b', challenge, retries=3))
+    assert calls == ['404', 'cf']
+
+
+def test_call_raises_last_error_after_retries(no_backoff):
+    hosts = HostLimiters()
+
+    async def attempt():
+        raise HostThrottled('http_429')
+
+    with pytest.raises(HostThrottled):
+        asyncio.run(hosts.call('https://example.test/a', attempt, retries=1))
+    assert hosts.get_stats()['example.test']['throttled'] == 2
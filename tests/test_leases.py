@@ -0,0 +1,45 @@
+# tests/test_leases.py
+from database import leases, jobs
+
+
+def test_acquire_skips_keys_held_by_another_owner(sqlite_db):
+    assert leases.acquire_leases('anime', ['a', 'b'], 'node-a', 60) == ['a', 'b']
+    assert leases.acquire_leases('anime', ['b', 'c', 'a'], 'node-b', 60) == ['c']
+    # Свои живые аренды возвращаются повторно
+    assert leases.acquire_leases('anime', ['a', 'c'], 'node-a', 60) == ['a']
+
+
+def test_expired_lease_is_taken_over(sqlite_db):
+    # Отрицательный TTL — аренда уже истекла по часам БД (владелец перестал слать heartbeat)
+    leases.acquire_leases('anime', ['a'], 'dead-node', -10)
+
+    assert leases.acquire_leases('anime', ['a'], 'node-b', 60) == ['a']
+    assert leases.renew_leases('dead-node', 60) == set()
+    assert leases.renew_leases('node-b', 60) == {('anime', 'a')}
+
+
+def test_done_lease_is_held_then_released(sqlite_db):
+    leases.acquire_leases('anime', ['a', 'b'], 'node-a', 60)
+    leases.release_leases('anime', ['a'], 'node-a', done_hold_sec=600)
+    leases.release_leases('anime', ['b'], 'node-a')
+
+    assert leases.acquire_leases('anime', ['a', 'b'], 'node-b', 60) == ['b']
+    assert leases.get_lease_stats() == {'node-a': {'anime_done': 1}, 'node-b': {'anime': 1}}
+
+
+def test_purge_and_release_all(sqlite_db):
+    leases.acquire_leases('anime', ['old'], 'node-a', -10)
+    leases.acquire_leases('episode', ['u1', 'u2'], 'node-a', 60)
+
+    assert leases.purge_expired_leases() == 1
+    assert leases.release_all_leases('node-a') == 2
+    assert leases.get_lease_stats() == {}
+
+
+def test_running_job_without_live_lease_is_requeued(sqlite_db):
+    job_id = jobs.create_job('bulk', {}, 0)
+    assert jobs.claim_next_job('node', 'node-a', -10)['id'] == job_id
+    assert jobs.requeue_interrupted_jobs() == 1
+
+    assert jobs.claim_next_job('node', 'node-b', 60)['resumed'] is True
+    assert jobs.requeue_interrupted_jobs() == 0
@@ -0,0 +1,74 @@
+# tests/test_page_archive.py
+import os
+
+from scrapers.page_archive import PageArchive, RECORD_HEADER
+
+
+def _segment(archive, num=1):
+    return archive._segment_path(num)
+
+
+def test_append_skips_unchanged_and_reads_latest(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    assert archive.append('episode', 'https://jut.su/a/episode-1.html', '<p>v1</p>', {'video_intro_end': 90})
+    assert not archive.append('episode', 'https://jut.su/a/episode-1.html', '<p>v1</p>', {'video_intro_end': 90})
+    assert archive.append('episode', 'https://jut.su/a/episode-1.html', '<p>v2</p>')
+    archive.append('anime', 'https://jut.su/a/', '<p>anime</p>')
+
+    page = archive.get('https://jut.su/a/episode-1.html')
+    assert (page['kind'], page['html'], page['window_vars']) == ('episode', '<p>v2</p>', None)
+    assert archive.get('https://jut.su/missing/') is None
+
+    locations = archive.latest_locations('episode')
+    assert list(locations) == ['https://jut.su/a/episode-1.html']
+    assert archive.read(locations['https://jut.su/a/episode-1.html'])['html'] == '<p>v2</p>'
+    assert archive.get_stats()['urls'] == {'anime': 1, 'episode': 1}
+    assert (archive.stats['appended'], archive.stats['unchanged']) == (3, 1)
+    archive.close()
+
+
+def test_segments_roll_over(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.segment_size = 200
+    for i in range(5):
+        archive.append('episode', f"https://jut.su/a/episode-{i}.html", os.urandom(150).hex())
+    assert archive.get_stats()['segments'] == 5
+    assert archive.get('https://jut.su/a/episode-0.html') is not None
+    archive.close()
+
+
+def test_unindexed_tail_is_trimmed_before_appending(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.append('anime', 'https://jut.su/a/', '<p>a</p>')
+    archive.close()
+    size = os.path.getsize(_segment(archive))
+    # Сбой посреди записи: заголовок и часть тела без строки в индексе
+    with open(_segment(archive), 'ab') as f:
+        f.write(RECORD_HEADER.pack(b'PGA1', 1000) + b'partial')
+
+    archive = PageArchive(str(tmp_path))
+    archive.append('anime', 'https://jut.su/b/', '<p>b</p>')
+    assert archive.get('https://jut.su/a/')['html'] == '<p>a</p>'
+    assert archive.get('https://jut.su/b/')['html'] == '<p>b</p>'
+    assert archive.latest_locations('anime')['https://jut.su/b/'][1] == size
+    archive.close()
+
+
+def test_reindex_restores_lost_index(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.append('anime', 'https://jut.su/a/', '<p>a1</p>')
+    archive.append('anime', 'https://jut.su/a/', '<p>a2</p>')
+    archive.append('episode', 'https://jut.su/a/episode-1.html', '<p>e</p>', {'video_duration': 1420})
+    archive.close()
+    os.remove(tmp_path / 'index.sqlite3')
+    # Недописанная последняя запись при reindex пропускается
+    with open(_segment(archive), 'ab') as f:
+        f.write(RECORD_HEADER.pack(b'PGA1', 50) + b'xx')
+
+    archive = PageArchive(str(tmp_path))
+    assert archive.reindex() == 3
+    assert archive.get('https://jut.su/a/')['html'] == '<p>a2</p>'
+    assert archive.get('https://jut.su/a/episode-1.html')['window_vars'] == {'video_duration': 1420}
+    # После восстановления индекса неизмененная страница снова не пишется
+    assert not archive.append('anime', 'https://jut.su/a/', '<p>a2</p>')
+    archive.close()
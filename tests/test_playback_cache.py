@@ -0,0 +1,96 @@
+# tests/test_playback_cache.py
+from database import catalog
+from database.playback_cache import PlaybackCache, playback_cache
+
+
+def _cache(**kwargs):
+    options = {'max_entries': 100, 'max_bytes': 1 << 20, 'ttl': 300, **kwargs}
+    return PlaybackCache(**options)
+
+
+def test_hit_returns_serialized_entry():
+    cache = _cache()
+    put = cache.put(('episode', 'a', None, 1), 1, {'episode': 1}, cache.version)
+    entry = cache.get(('episode', 'a', None, 1))
+    assert entry is put
+    assert entry.body == b'{"episode":1}'
+    assert entry.etag.startswith('"') and entry.etag.endswith('"')
+    assert cache.get(('episode', 'a', None, 2)) is None
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 1)
+
+
+def test_invalidate_drops_only_that_anime():
+    cache = _cache()
+    cache.put('a1', 1, {'n': 1}, cache.version)
+    cache.put('b1', 2, {'n': 1}, cache.version)
+    cache.invalidate_anime(1)
+    assert cache.get('a1') is None
+    assert cache.get('b1') is not None
+    # Записи, прочитанные после сброса, снова кэшируются
+    cache.put('a1', 1, {'n': 2}, cache.version)
+    assert cache.get('a1').body == b'{"n":2}'
+
+
+def test_read_started_before_invalidation_is_not_cached():
+    cache = _cache()
+    version = cache.version  # чтение из БД началось
+    cache.invalidate_anime(1)  # запись эпизодов закоммичена во время чтения
+    entry = cache.put('a1', 1, {'n': 'old'}, version)
+    assert entry.body == b'{"n":"old"}'
+    assert cache.get('a1') is None
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = _cache(max_entries=2)
+    cache.put('k1', 1, {}, 0)
+    cache.put('k2', 1, {}, 0)
+    cache.get('k1')
+    cache.put('k3', 1, {}, 0)
+    assert cache.get('k2') is None
+    assert cache.get('k1') is not None and cache.get('k3') is not None
+
+    cache = _cache(max_bytes=30)
+    cache.put('k1', 1, {'v': 'x' * 10}, 0)
+    cache.put('k2', 1, {'v': 'y' * 10}, 0)
+    assert cache.get('k1') is None
+    assert cache.get_stats()['bytes'] == len(cache.get('k2').body)
+    assert cache.stats['evictions'] == 1
+
+
+def test_ttl_expiry():
+    cache = _cache(ttl=0)
+    cache.put('k1', 1, {}, 0)
+    assert cache.get('k1') is None
+    assert cache.stats['expired'] == 1
+
+
+def _episode(season, number, **values):
+    return {'episode_number': number, 'title': f"Серия {number}",
+            'source_url': f"https://jut.su/foo/season-{season}/episode-{number}.html",
+            'duration_sec': 1420, 'opening_start_sec': 5, 'opening_end_sec': 95,
+            'ending_start_sec': 1300, 'ending_end_sec': 1390, 'next_episode_url': None, **values}
+
+
+def test_saving_episodes_invalidates_cached_playback(sqlite_db):
+    anime_id = sqlite_db.save_anime({'slug': 'foo', 'title_rus': 'Фу'}, 'TV', [],
+                                    {1: [_episode(1, 1), _episode(1, 2)], 2: [_episode(2, 1)]})
+    key = ('episode', 'foo', None, 1)
+    version = playback_cache.version
+    found_id, payload = catalog.get_playback('foo', 1)
+    assert (found_id, payload['season'], payload['opening_end_sec']) == (anime_id, 1, 95)
+    playback_cache.put(key, found_id, payload, version)
+
+    sqlite_db.save_episodes(anime_id, {1: [_episode(1, 1, opening_end_sec=80)]})
+
+    assert playback_cache.get(key) is None
+    assert catalog.get_playback('foo', 1)[1]['opening_end_sec'] == 80
+
+
+def test_next_playback_crosses_seasons(sqlite_db):
+    sqlite_db.save_anime({'slug': 'foo', 'title_rus': 'Фу'}, 'TV', [],
+                         {1: [_episode(1, 1), _episode(1, 2)], 2: [_episode(2, 1), _episode(2, 2)]})
+
+    _, items = catalog.list_next_playback('foo', 2, 2)
+    assert [(item['season'], item['episode']) for item in items] == [(2, 1), (2, 2)]
+    assert catalog.list_next_playback('foo', 9, 2) is None
+    assert catalog.get_playback('foo', 1, season=2)[1]['source_url'].endswith('season-2/episode-1.html')
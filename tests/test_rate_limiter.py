@@ -0,0 +1,64 @@
+# tests/test_rate_limiter.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from scrapers import rate_limiter
+from scrapers.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(rate_limiter, 'asyncio', SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep))
+    return fake
+
+
+def _acquire_times(limiter, clock, count):
+    async def run():
+        times = []
+        for _ in range(count):
+            await limiter.acquire()
+            times.append(clock.now)
+        return times
+    return asyncio.run(run())
+
+
+def test_never_more_than_limit_in_any_rolling_minute(clock):
+    limiter = RateLimiter((3, 1), (60, 60))
+    times = _acquire_times(limiter, clock, 300)
+
+    for i, started in enumerate(times):
+        in_window = sum(1 for t in times[i:] if t < started + 60)
+        assert in_window <= 60
+    assert sum(1 for t in times if t < times[0] + 60) == 60
+
+
+def test_per_second_limit(clock):
+    limiter = RateLimiter((3, 1), (60, 60))
+    times = _acquire_times(limiter, clock, 10)
+
+    for i, started in enumerate(times):
+        assert sum(1 for t in times[i:] if t < started + 1) <= 3
+
+
+def test_pause_delays_next_request(clock):
+    limiter = RateLimiter((3, 1), (60, 60))
+    _acquire_times(limiter, clock, 1)
+    limiter.pause(30)
+    started = clock.now
+    _acquire_times(limiter, clock, 1)
+    assert clock.now == pytest.approx(started + 30)